@@ -0,0 +1,376 @@
+"""Cache of final answers for repeated student questions.
+
+Entries live in SQLite, next to an in-memory TF-IDF index of the cached
+questions, so near-identical questions ("CS scholarships in Turkey for
+Tawjihi 95%" / "computer science scholarships Turkey, tawjihi 95") are
+answered without running the ReAct loop at all.
+
+A cached answer is only served when all of the following hold:
+
+* The relevant profile fields match exactly (``PROFILE_FIELDS``; others such
+  as a name are ignored).
+* The intake year matches.
+* The numbers in the question match exactly (95% must never match 85%).
+* Both questions have the same negations ("not", "without", "don't", ...)
+  and the same ``KEY_TERMS`` (test names, countries, subjects, universities,
+  degree levels): "require IELTS" never matches "do not require IELTS" or
+  "require TOEFL", however similar the rest of the wording.
+* The question text is the same after normalisation, or its TF-IDF cosine
+  similarity is at least ``threshold`` (``short_threshold`` when either
+  question has at most ``SHORT_QUESTION_TOKENS`` content words, where one
+  word carries more of the meaning).
+
+Answers expire after ``ttl`` seconds or when their intake starts (1 September
+of the intake year), whichever comes first. The table is bounded to
+``max_entries`` rows with least-recently-used eviction.
+"""
+
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+DEFAULT_ANSWER_CACHE_PATH = "answer_cache.db"
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_SHORT_THRESHOLD = 0.9
+SHORT_QUESTION_TOKENS = 4
+INTAKE_MONTH = 9
+
+# Profile fields that change the answer; everything else in a profile is ignored
+PROFILE_FIELDS = {
+    "subject",
+    "qualification",
+    "qualifications",
+    "grades",
+    "tawjihi",
+    "gpa",
+    "ielts",
+    "toefl",
+    "duolingo",
+    "target_countries",
+    "countries",
+    "budget",
+    "fee_status",
+    "level",
+    "course_type",
+}
+INTAKE_FIELDS = ("intake", "intake_year", "year_of_entry")
+
+STOPWORDS = frozenset(
+    "a an and any are as at be can could do does for from how i im in is it me my of on or "
+    "please should that the there this to what when where which who will with would you".split()
+)
+# Common abbreviations expanded so "CS" and "computer science" compare equal
+ABBREVIATIONS = {
+    "cs": ("computer", "science"),
+    "ai": ("artificial", "intelligence"),
+    "uk": ("united", "kingdom"),
+    "usa": ("united", "states"),
+    "uni": ("university",),
+    "msc": ("master",),
+    "masters": ("master",),
+    "bsc": ("bachelor",),
+}
+NEGATIONS = frozenset(
+    "not no never nor neither without except cannot".split() + ["لا", "ليس", "بدون", "غير", "لم", "لن"]
+)
+# Words that change what a question is about; one differing term means a different question
+KEY_TERMS = frozenset(
+    (
+        # English tests and school-leaving qualifications
+        "ielts toefl duolingo pte sat gre gmat tawjihi gcse ib "
+        # Countries and regions
+        "united kingdom states england scotland wales ireland turkey türkiye germany france italy spain "
+        "netherlands belgium austria switzerland sweden norway finland denmark poland hungary czech russia "
+        "canada australia zealand japan china korea india pakistan malaysia jordan egypt qatar emirates uae "
+        "saudi lebanon palestine europe asia "
+        # Subjects
+        "medicine medical dentistry pharmacy nursing engineering civil mechanical electrical software "
+        "computer data artificial intelligence cybersecurity law business economics finance accounting "
+        "marketing management architecture physics chemistry biology mathematics statistics psychology "
+        "education political politics history literature philosophy sociology journalism media design "
+        "art music agriculture veterinary physiotherapy nutrition "
+        # Universities and scholarship schemes
+        "oxford cambridge imperial ucl lse kcl edinburgh manchester glasgow metu bilkent koc sabanci "
+        "hacettepe boğaziçi harvard mit stanford toronto mcgill birzeit najah chevening daad erasmus fulbright "
+        # Degree levels
+        "bachelor master phd doctorate foundation diploma undergraduate postgraduate"
+    ).split()
+)
+WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+# "don't" / "doesn't" / "can't" -> "... not", so the negation survives tokenising
+CONTRACTED_NOT_RE = re.compile(r"n['’]t\b")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+YEAR_RE = re.compile(r"\b(20\d\d)\b")
+
+
+def _stem(word: str) -> str:
+    """Strip a plural ending (scholarships -> scholarship, universities -> university)."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+# KEY_TERMS as they appear in question_tokens
+_KEY_STEMS = frozenset(_stem(term) for term in KEY_TERMS)
+
+
+def question_tokens(question: str) -> list:
+    """Lower-cased, de-pluralised content words of ``question`` with abbreviations expanded."""
+    tokens = []
+    for word in WORD_RE.findall(CONTRACTED_NOT_RE.sub(" not", question.casefold())):
+        if word in STOPWORDS:
+            continue
+        expansion = ABBREVIATIONS.get(word)
+        if expansion is not None:
+            tokens.extend(expansion)
+        else:
+            tokens.append(_stem(word))
+    return tokens
+
+
+def normalise_question(question: str) -> str:
+    return " ".join(question_tokens(question))
+
+
+def profile_key(profile: dict = None) -> str:
+    """Canonical string of the answer-relevant profile fields."""
+    relevant = {}
+    for key, value in (profile or {}).items():
+        key = key.strip().lower().replace(" ", "_")
+        if key in PROFILE_FIELDS:
+            relevant[key] = re.sub(r"\s+", " ", str(value).strip()).casefold()
+    return json.dumps(relevant, sort_keys=True, ensure_ascii=False)
+
+
+def next_intake_year(now: float) -> int:
+    """The first intake that has not started yet at time ``now``."""
+    today = datetime.fromtimestamp(now, timezone.utc)
+    return today.year if today.month < INTAKE_MONTH else today.year + 1
+
+
+def intake_year(question: str, profile: dict = None, now: float = None) -> int:
+    """Intake year from the profile, else from the question, else the next intake."""
+    for field in INTAKE_FIELDS:
+        value = (profile or {}).get(field)
+        match = YEAR_RE.search(str(value)) if value is not None else None
+        if match:
+            return int(match.group(1))
+    match = YEAR_RE.search(question)
+    if match:
+        return int(match.group(1))
+    return next_intake_year(time.time() if now is None else now)
+
+
+def intake_start(year: int) -> float:
+    return datetime(year, INTAKE_MONTH, 1, tzinfo=timezone.utc).timestamp()
+
+
+class _Entry:
+    __slots__ = ("entry_id", "numbers", "terms", "counts", "length")
+
+    def __init__(self, entry_id: int, tokens: list):
+        self.entry_id = entry_id
+        self.numbers = frozenset(t for t in tokens if NUMBER_RE.fullmatch(t))
+        # Negations and key terms, which must match exactly like the numbers
+        self.terms = frozenset(t for t in tokens if t in _KEY_STEMS or t in NEGATIONS)
+        self.counts = Counter(tokens)
+        self.length = len(tokens)
+
+
+class AnswerCache:
+    """SQLite-backed final-answer cache with a TF-IDF similarity index, intake-aware TTLs and LRU eviction."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_ANSWER_CACHE_PATH,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        threshold: float = DEFAULT_THRESHOLD,
+        short_threshold: float = DEFAULT_SHORT_THRESHOLD,
+        clock=time.time,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.short_threshold = short_threshold
+        self.clock = clock
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # bucket (profile key + intake year) -> {entry id: _Entry}
+        self._buckets = {}
+        # token -> number of cached questions containing it (for IDF)
+        self._document_frequency = Counter()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answer_cache (
+                id INTEGER PRIMARY KEY,
+                bucket TEXT NOT NULL,
+                question_key TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                UNIQUE (bucket, question_key)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS answer_cache_last_access ON answer_cache (last_access)"
+        )
+        self._conn.commit()
+        self._load_index()
+
+    def _load_index(self) -> None:
+        self._conn.execute("DELETE FROM answer_cache WHERE expires_at <= ?", (self.clock(),))
+        self._conn.commit()
+        for entry_id, bucket, question_key in self._conn.execute(
+            "SELECT id, bucket, question_key FROM answer_cache"
+        ):
+            self._index(entry_id, bucket, question_key.split())
+
+    def _index(self, entry_id: int, bucket: str, tokens: list) -> None:
+        entry = _Entry(entry_id, tokens)
+        self._buckets.setdefault(bucket, {})[entry_id] = entry
+        self._document_frequency.update(entry.counts.keys())
+
+    def _unindex(self, entry_id: int, bucket: str) -> None:
+        entries = self._buckets.get(bucket, {})
+        entry = entries.pop(entry_id, None)
+        if entry is not None:
+            self._document_frequency.subtract(entry.counts.keys())
+        if not entries:
+            self._buckets.pop(bucket, None)
+
+    def _delete_rows(self, where: str, params: tuple) -> None:
+        rows = self._conn.execute(f"SELECT id, bucket FROM answer_cache WHERE {where}", params).fetchall()
+        for entry_id, bucket in rows:
+            self._unindex(entry_id, bucket)
+        self._conn.executemany("DELETE FROM answer_cache WHERE id = ?", [(entry_id,) for entry_id, _ in rows])
+
+    def _vector(self, counts: Counter) -> dict:
+        documents = sum(len(entries) for entries in self._buckets.values()) + 1
+        frequency = self._document_frequency
+        return {
+            token: count * (math.log((documents + 1) / (frequency[token] + 1)) + 1.0)
+            for token, count in counts.items()
+        }
+
+    def _most_similar(self, bucket: str, tokens: list):
+        """The best ``(entry id, cosine)`` in ``bucket`` with the same numbers and terms and a cosine at or
+        above the threshold for its length, or None."""
+        entries = self._buckets.get(bucket)
+        if not entries:
+            return None
+        probe = _Entry(None, tokens)
+        query = self._vector(probe.counts)
+        query_norm = math.sqrt(sum(w * w for w in query.values())) or 1.0
+        best = None
+        for entry in entries.values():
+            if entry.numbers != probe.numbers or entry.terms != probe.terms:
+                continue
+            vector = self._vector(entry.counts)
+            norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+            dot = sum(weight * vector.get(token, 0.0) for token, weight in query.items())
+            score = dot / (query_norm * norm)
+            short = min(entry.length, probe.length) <= SHORT_QUESTION_TOKENS
+            if score < (self.short_threshold if short else self.threshold):
+                continue
+            if best is None or score > best[1]:
+                best = (entry.entry_id, score)
+        return best
+
+    def _bucket(self, question: str, profile: dict, now: float):
+        year = intake_year(question, profile, now)
+        return f"{year}|{profile_key(profile)}", year
+
+    def get(self, question: str, profile: dict = None):
+        """Return a cached answer for ``question`` (exact or similar), or None."""
+        now = self.clock()
+        bucket, _ = self._bucket(question, profile, now)
+        tokens = question_tokens(question)
+        with self._lock:
+            self._delete_rows("expires_at <= ?", (now,))
+            row = self._conn.execute(
+                "SELECT id, answer FROM answer_cache WHERE bucket = ? AND question_key = ?",
+                (bucket, " ".join(tokens)),
+            ).fetchone()
+            similar = False
+            if row is None:
+                match = self._most_similar(bucket, tokens)
+                if match is not None:
+                    row = self._conn.execute(
+                        "SELECT id, answer FROM answer_cache WHERE id = ?", (match[0],)
+                    ).fetchone()
+                    similar = True
+            if row is None:
+                self.misses += 1
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE answer_cache SET last_access = ? WHERE id = ?", (now, row[0]))
+            self._conn.commit()
+            self.hits += 1
+            self.similar_hits += similar
+        return row[1]
+
+    def set(self, question: str, answer: str, profile: dict = None, ttl: float = None) -> None:
+        """Store ``answer``; it expires after ``ttl`` or when its intake starts, whichever is sooner."""
+        now = self.clock()
+        bucket, year = self._bucket(question, profile, now)
+        expires_at = min(now + (self.ttl if ttl is None else ttl), intake_start(year))
+        if expires_at <= now:
+            return  # the intake has already started; the answer would be stale immediately
+        tokens = question_tokens(question)
+        question_key = " ".join(tokens)
+        with self._lock:
+            self._delete_rows("bucket = ? AND question_key = ?", (bucket, question_key))
+            cursor = self._conn.execute(
+                "INSERT INTO answer_cache (bucket, question_key, question, answer, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (bucket, question_key, question, answer, expires_at, now),
+            )
+            self._index(cursor.lastrowid, bucket, tokens)
+            self._delete_rows("expires_at <= ?", (now,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM answer_cache").fetchone()
+            if count > self.max_entries:
+                self._delete_rows(
+                    "id IN (SELECT id FROM answer_cache ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Return hit (of which similar-question hits), miss and entry counts."""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM answer_cache").fetchone()
+        return {
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "entries": entries,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answer_cache")
+            self._conn.commit()
+            self._buckets.clear()
+            self._document_frequency.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
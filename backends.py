@@ -0,0 +1,299 @@
+"""Pluggable model and search backends for offline and load-test runs.
+
+``Agent.execute`` reaches the model through ``client.chat.completions.create``,
+and ``search_tavily`` reaches Tavily through ``tavily_client.search``, so any
+object with those methods can stand in for the SDK clients (pass it as
+``Agent(client=...)`` or ``Runtime(client=..., tavily_client=...)``). This
+module provides:
+
+* record mode: ``RecordingOpenAI`` and ``RecordingTavilyClient`` wrap live
+  clients and append every exchange, with how long it took, to a JSONL
+  ``Recording``
+* replay mode: ``RecordedOpenAI`` and ``RecordedTavilyClient`` serve a
+  recording back. Model replies are matched on the conversation so far, and
+  searches on the normalised query. Anything not recorded falls back to the
+  synthetic stubs in ``stubs``
+* synthetic mode: the same clients with an empty recording, i.e. the stubs
+  with realistic waits
+
+Replayed calls wait as long as the recorded call took, or for a time drawn
+from a ``Latency`` distribution, scaled by ``time_scale``.
+``create_backend_clients`` builds the client pair for a mode by name.
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+
+from search_cache import normalise_query
+
+BACKENDS = ("live", "record", "replay", "synthetic")
+
+
+class Latency:
+    """Seconds one call takes, drawn from a distribution.
+
+    Specs: ``"0.8"`` or ``"fixed:0.8"``; ``"uniform:0.5,1.5"`` (low, high);
+    ``"lognormal:1.2,0.5"`` (median seconds, sigma), the long-tailed shape
+    real API latencies have. Parameters must be finite and non-negative, a
+    uniform low at most its high, and a lognormal median above zero.
+    """
+
+    KINDS = ("fixed", "uniform", "lognormal")
+
+    def __init__(self, kind: str = "fixed", a: float = 0.0, b: float = 0.0, seed=None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution {kind!r}; expected one of {', '.join(self.KINDS)}")
+        if not (math.isfinite(a) and math.isfinite(b)) or a < 0 or b < 0:
+            raise ValueError(f"Latency parameters must be finite and non-negative, got {a}, {b}")
+        if kind == "uniform" and a > b:
+            raise ValueError(f"Uniform latency low {a} is above high {b}")
+        if kind == "lognormal" and a == 0:
+            raise ValueError("Lognormal latency needs a median above zero")
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self._random = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str, seed=None) -> "Latency":
+        kind, _, args = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+        try:
+            values = [float(value) for value in args.split(",")] if args else []
+        except ValueError:
+            raise ValueError(f"Invalid latency spec {spec!r}")
+        if len(values) != (1 if kind == "fixed" else 2):
+            raise ValueError(f"Invalid latency spec {spec!r}")
+        return cls(kind, *values, seed=seed)
+
+    def __repr__(self) -> str:
+        args = f"{self.a}" if self.kind == "fixed" else f"{self.a},{self.b}"
+        return f"Latency.parse({self.kind + ':' + args!r})"
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return self._random.uniform(self.a, self.b)
+        return self._random.lognormvariate(math.log(self.a), self.b)
+
+
+def exchange_key(messages: list) -> str:
+    """Key a model request by the conversation after the system prompt, so prompt edits keep replays valid."""
+    turns = [[m.get("role"), m.get("content")] for m in messages if m.get("role") != "system"]
+    return hashlib.sha256(json.dumps(turns, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class Recording:
+    """Recorded model replies and search responses, appended to a JSONL file as they are added.
+
+    Lines: {"kind": "chat", "key": ..., "model": ..., "reply": ..., "seconds": ...}
+           {"kind": "search", "query": ..., "response": {...}, "seconds": ...}
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.chats = {}
+        self.searches = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if path is not None and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._index(json.loads(line))
+                    except ValueError:
+                        continue  # partially written last line
+
+    def _index(self, record: dict) -> None:
+        if record.get("kind") == "chat":
+            self.chats[record["key"]] = record
+        elif record.get("kind") == "search":
+            self.searches[normalise_query(record["query"])] = record
+
+    def add(self, record: dict) -> None:
+        with self._lock:
+            self._index(record)
+            if self.path is None:
+                return
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def typical_seconds(self, kind: str) -> float:
+        """Median recorded duration of ``kind`` ("chat" or "search") calls; 0.0 with none recorded."""
+        records = self.chats if kind == "chat" else self.searches
+        seconds = [record["seconds"] for record in list(records.values())]
+        return statistics.median(seconds) if seconds else 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _timed(inner, call):
+    """(result, seconds) for ``call()``: the latency ``inner`` simulates if it does, else the wall time taken."""
+    simulated = getattr(inner, "simulated_seconds", None)
+    start = time.perf_counter()
+    result = call()
+    seconds = time.perf_counter() - start
+    if simulated is not None:
+        # A stub's own bookkeeping is not API latency (and it may have slept the simulated time too)
+        seconds = inner.simulated_seconds - simulated
+    return result, round(seconds, 4)
+
+
+class RecordingOpenAI:
+    """Wraps an OpenAI-compatible client, recording each non-streamed reply and how long it took."""
+
+    def __init__(self, inner, recording: Recording):
+        self.inner = inner
+        self.recording = recording
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        create = self.inner.chat.completions.create
+        if kwargs.get("stream"):
+            return create(model=model, messages=messages, **kwargs)
+        completion, seconds = _timed(self.inner, lambda: create(model=model, messages=messages, **kwargs))
+        reply = completion.choices[0].message.content
+        if reply is not None:
+            self.recording.add(
+                {"kind": "chat", "key": exchange_key(messages), "model": model, "reply": reply, "seconds": seconds}
+            )
+        return completion
+
+
+class RecordingTavilyClient:
+    """Wraps a Tavily client, recording each search response and how long it took."""
+
+    def __init__(self, inner, recording: Recording):
+        self.inner = inner
+        self.recording = recording
+
+    def search(self, query: str, **kwargs) -> dict:
+        response, seconds = _timed(self.inner, lambda: self.inner.search(query, **kwargs))
+        self.recording.add({"kind": "search", "query": query, "response": response, "seconds": seconds})
+        return response
+
+
+class _Replayer:
+    """Shared waiting and counting for the replaying clients."""
+
+    def __init__(self, recording, latency, time_scale, sleep):
+        self.recording = recording if recording is not None else Recording()
+        self.latency = latency
+        self.time_scale = time_scale
+        self.sleep = sleep
+        self.calls = 0
+        # Calls not in the recording, served by the synthetic fallback
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _wait(self, kind: str, recorded) -> None:
+        if self.latency is not None:
+            seconds = self.latency.sample()
+        elif recorded is not None:
+            seconds = recorded["seconds"]
+        else:
+            seconds = self.recording.typical_seconds(kind)
+        with self._lock:
+            self.calls += 1
+            self.misses += recorded is None
+        if seconds > 0:
+            self.sleep(seconds * self.time_scale)
+
+
+class RecordedOpenAI(_Replayer):
+    """Serves recorded replies for conversations seen before, and synthetic ones otherwise."""
+
+    def __init__(self, recording: Recording = None, latency: Latency = None, time_scale=1.0, fallback=None, sleep=None):
+        from stubs import StubOpenAI
+
+        super().__init__(recording, latency, time_scale, sleep or time.sleep)
+        self.fallback = fallback if fallback is not None else StubOpenAI()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, stream=False, **kwargs):
+        recorded = self.recording.chats.get(exchange_key(messages))
+        self._wait("chat", recorded)
+        if recorded is None:
+            completion = self.fallback.chat.completions.create(model=model, messages=messages)
+        else:
+            message = SimpleNamespace(content=recorded["reply"])
+            completion = SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+        if stream:
+            # The whole reply arrives as one chunk, after the full latency
+            delta = SimpleNamespace(content=completion.choices[0].message.content)
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=delta)])])
+        return completion
+
+
+class RecordedTavilyClient(_Replayer):
+    """Serves recorded search responses by normalised query, and synthetic ones otherwise."""
+
+    def __init__(self, recording: Recording = None, latency: Latency = None, time_scale=1.0, fallback=None, sleep=None):
+        from stubs import StubTavilyClient
+
+        super().__init__(recording, latency, time_scale, sleep or time.sleep)
+        self.fallback = fallback if fallback is not None else StubTavilyClient()
+
+    def search(self, query: str, **kwargs) -> dict:
+        recorded = self.recording.searches.get(normalise_query(query))
+        self._wait("search", recorded)
+        if recorded is None:
+            return self.fallback.search(query, **kwargs)
+        return recorded["response"]
+
+
+def live_clients():
+    """Pooled OpenRouter and Tavily clients from ``OPENROUTER_API_KEY``/``TAVILY_API_KEY``."""
+    from dotenv import load_dotenv
+
+    import transport
+    from runtime import OPENROUTER_BASE_URL
+
+    _ = load_dotenv()
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    tavily_api_key = os.getenv("TAVILY_API_KEY")
+    if not api_key or not tavily_api_key:
+        raise ValueError("OPENROUTER_API_KEY and TAVILY_API_KEY are needed for live and record backends.")
+    return transport.create_openai_client(api_key, OPENROUTER_BASE_URL), transport.create_tavily_client(tavily_api_key)
+
+
+def create_backend_clients(
+    backend: str,
+    recording: Recording = None,
+    model_latency: Latency = None,
+    search_latency: Latency = None,
+    time_scale: float = 1.0,
+) -> tuple:
+    """(openai_client, tavily_client) for one of ``BACKENDS``.
+
+    ``record`` appends to ``recording``; ``replay`` serves it. Latencies
+    override the recorded durations; ``synthetic`` waits 0 s without them.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    if backend in ("record", "replay") and recording is None:
+        raise ValueError(f"The {backend} backend needs a recording")
+    if backend == "live":
+        return live_clients()
+    if backend == "record":
+        openai_client, tavily_client = live_clients()
+        return RecordingOpenAI(openai_client, recording), RecordingTavilyClient(tavily_client, recording)
+    if backend == "synthetic":
+        recording = None
+    return (
+        RecordedOpenAI(recording, model_latency, time_scale),
+        RecordedTavilyClient(recording, search_latency, time_scale),
+    )
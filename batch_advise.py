@@ -0,0 +1,250 @@
+"""Offline batch advising for whole student cohorts.
+
+Reads a JSONL file of student records, runs a ReAct session (``query``) for
+each one on a bounded thread pool and appends one JSON result line per
+student to the output file as soon as it finishes. The output file doubles as
+the checkpoint: records already answered successfully are skipped on the next
+run, so an interrupted batch resumes where it stopped. OpenRouter and Tavily
+calls are rate limited with shared token buckets.
+
+Input record:  {"id": "s-001", "question": "...", "profile": {"subject": "...", ...}}
+Output record: {"id": "s-001", "status": "ok", "answer": "...", "elapsed": 1.23}
+               {"id": "s-002", "status": "error", "error": "...", "elapsed": 0.5}
+
+Run with ``python batch_advise.py cohort.jsonl results.jsonl --workers 8``;
+add ``--stub`` to run against local stub clients without API keys.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+
+import main
+from answer_cache import AnswerCache
+from prefetch import Prefetcher
+from rate_limit import TokenBucket
+
+
+def load_records(path: str):
+    """Yield student records from a JSONL file, skipping blank lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "id" not in record or "question" not in record:
+                raise ValueError(f"{path}:{line_number}: record needs 'id' and 'question'")
+            yield record
+
+
+def completed_ids(output_path: str) -> set:
+    """Ids already answered successfully in ``output_path`` (the checkpoint)."""
+    done = set()
+    try:
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue  # partially written last line
+                if result.get("status") == "ok":
+                    done.add(result["id"])
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def build_question(record: dict) -> str:
+    """The question text, followed by the student's profile fields when given."""
+    question = record["question"].strip()
+    profile = record.get("profile") or {}
+    if not profile:
+        return question
+    details = "; ".join(f"{key.replace('_', ' ')}: {value}" for key, value in profile.items())
+    return f"{question}\n\nStudent profile — {details}"
+
+
+def rate_limited(fn, bucket: TokenBucket):
+    """Wrap ``fn`` so each call first takes a token from ``bucket``."""
+
+    def wrapper(*args, **kwargs):
+        bucket.acquire()
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def rate_limited_client(openai_client, bucket: TokenBucket):
+    """A view of ``openai_client`` whose ``chat.completions.create`` is rate limited."""
+    completions = SimpleNamespace(create=rate_limited(openai_client.chat.completions.create, bucket))
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+def rate_limited_search_client(tavily_client, bucket: TokenBucket):
+    """A view of ``tavily_client`` whose ``search`` is rate limited (None stays None)."""
+    if tavily_client is None:
+        return None
+    return SimpleNamespace(search=rate_limited(tavily_client.search, bucket))
+
+
+class BatchRunner:
+    """Runs one ReAct session per record on a bounded pool and streams results to JSONL."""
+
+    def __init__(
+        self,
+        openai_client,
+        workers: int = 4,
+        llm_rate: float = 2.0,
+        search_rate: float = 2.0,
+        history_dir: str = "batch_histories",
+        max_turns: int = 5,
+        model: str = None,
+        answer_cache: AnswerCache = None,
+        tools: bool = False,
+        prefetch: bool = False,
+    ):
+        self.workers = workers
+        self.answer_cache = answer_cache
+        self.history_dir = history_dir
+        self.max_turns = max_turns
+        self.model = model
+        # Shared read-only by every worker thread: the rate-limited clients, and optionally native
+        # tool calls (models without tool support fall back to Action lines). Tavily is limited at
+        # the client, so searches, lookups falling back to a search and prefetches all take a
+        # token, and search-cache hits take none
+        base = main.global_runtime()
+        runtime = base.replace(
+            client=rate_limited_client(openai_client, TokenBucket(llm_rate)),
+            tavily_client=rate_limited_search_client(base.tavily_client, TokenBucket(search_rate)),
+            tools=main.tools if tools else None,
+        )
+        search = runtime.cached_search
+        # Warms each student's likely searches while the model is on its first turn
+        self.prefetcher = None
+        if prefetch:
+            self.prefetcher = Prefetcher(search=search, workers=workers)
+            search = self.prefetcher.search
+        self.runtime = runtime.with_actions(search=search, lookup=runtime.lookup_knowledge)
+        self._write_lock = threading.Lock()
+        os.makedirs(history_dir, exist_ok=True)
+
+    def advise(self, record: dict) -> dict:
+        """Run one student's session; errors are captured in the result rather than raised."""
+        start = time.perf_counter()
+        kwargs = {"model": self.model} if self.model else {}
+        agent = main.Agent(
+            main.prompt,
+            history_file=os.path.join(self.history_dir, f"{record['id']}.jsonl"),
+            runtime=self.runtime,
+            **kwargs,
+        )
+        try:
+            answer = main.cached_query(
+                record["question"],
+                agent,
+                profile=record.get("profile"),
+                message=build_question(record),
+                cache=self.answer_cache,
+                # Students answered from the cache make no searches, so only misses prefetch
+                on_miss=self._prefetch(record),
+                max_turns=self.max_turns,
+                verbose=False,
+            )
+        except Exception as e:
+            return {"id": record["id"], "status": "error", "error": str(e), "elapsed": time.perf_counter() - start}
+        result = {"id": record["id"], "status": "ok" if answer is not None else "no_answer", "answer": answer}
+        result["elapsed"] = time.perf_counter() - start
+        return result
+
+    def _prefetch(self, record: dict):
+        """A callable starting ``record``'s likely searches, or None with prefetch off."""
+        if self.prefetcher is None:
+            return None
+        return lambda: self.prefetcher.prefetch_profile(record.get("profile"), record["question"])
+
+    def _write(self, out, result: dict) -> None:
+        with self._write_lock:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+
+    def run(self, input_path: str, output_path: str) -> dict:
+        """Process every record not yet in the checkpoint; returns a status summary.
+
+        The prefetch pool is shut down when the run ends, so a runner makes one run.
+        """
+        done = completed_ids(output_path)
+        summary = {"skipped": 0, "ok": 0, "no_answer": 0, "error": 0}
+        in_flight = set()
+        try:
+            with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(self.workers) as pool:
+
+                def collect(futures):
+                    for future in futures:
+                        result = future.result()
+                        self._write(out, result)
+                        summary[result["status"]] += 1
+
+                for record in load_records(input_path):
+                    if record["id"] in done:
+                        summary["skipped"] += 1
+                        continue
+                    # Keep at most two records per worker queued so huge cohorts stay bounded in memory
+                    if len(in_flight) >= self.workers * 2:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        collect(finished)
+                    in_flight.add(pool.submit(self.advise, record))
+                collect(wait(in_flight).done)
+        finally:
+            if self.prefetcher is not None:
+                self.prefetcher.close()
+        return summary
+
+
+def main_cli(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Batch-advise a cohort of students from a JSONL file.")
+    parser.add_argument("input", help="JSONL file of student records")
+    parser.add_argument("output", help="JSONL file results are appended to (also the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--llm-rate", type=float, default=2.0, help="OpenRouter requests per second")
+    parser.add_argument("--search-rate", type=float, default=2.0, help="Tavily searches per second")
+    parser.add_argument("--history-dir", default="batch_histories")
+    parser.add_argument("--max-turns", type=int, default=5)
+    parser.add_argument("--answer-cache", help="SQLite file of cached answers reused across similar students")
+    parser.add_argument("--tools", action="store_true", help="offer actions as native tool calls")
+    parser.add_argument("--prefetch", action="store_true", help="warm each student's likely searches in advance")
+    parser.add_argument("--stub", action="store_true", help="use local stub clients (no network or API keys)")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        from stubs import StubOpenAI, StubTavilyClient
+
+        openai_client = StubOpenAI()
+        main.tavily_client = StubTavilyClient()
+    else:
+        main.load_dotenv_and_init_client()
+        openai_client = main.client
+
+    runner = BatchRunner(
+        openai_client,
+        workers=args.workers,
+        llm_rate=args.llm_rate,
+        search_rate=args.search_rate,
+        history_dir=args.history_dir,
+        max_turns=args.max_turns,
+        answer_cache=AnswerCache(args.answer_cache) if args.answer_cache else None,
+        tools=args.tools,
+        prefetch=args.prefetch,
+    )
+    summary = runner.run(args.input, args.output)
+    print(json.dumps(summary))
+    return summary
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compiled calculator engine versus the previous string-rewriting evaluator.
+
+The legacy evaluator (reproduced below) re-split and re-concatenated the
+expression string for every parenthesis pair and operator. The compiled
+engine parses once and caches the postfix program, so the benchmark reports
+a cold run (cache cleared before every call) and a warm run (cached program).
+
+Run from the repository root:
+    python benchmarks/bench_calculator.py --terms 10 50 200 1000
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calculator  # noqa: E402
+
+
+def legacy_evaluate_simple_expression(expr: str) -> float:
+    parts = re.split(r"([+\-*/])", expr.replace(" ", ""))
+    parts = [p for p in parts if p]
+    if len(parts) == 1:
+        return float(parts[0])
+    i = 1
+    while i < len(parts) - 1:
+        if parts[i] in ["*", "/"]:
+            left = float(parts[i - 1])
+            right = float(parts[i + 1])
+            if parts[i] == "*":
+                result = left * right
+            else:
+                if right == 0:
+                    raise ValueError("Division by zero")
+                result = left / right
+            parts[i - 1 : i + 2] = [str(result)]
+            i -= 1
+        i += 2
+    result = float(parts[0])
+    for i in range(1, len(parts), 2):
+        if i + 1 < len(parts):
+            if parts[i] == "+":
+                result += float(parts[i + 1])
+            elif parts[i] == "-":
+                result -= float(parts[i + 1])
+    return result
+
+
+def legacy_evaluate_expression(expr: str) -> float:
+    while "(" in expr:
+        start = expr.rfind("(")
+        end = expr.find(")", start)
+        if end == -1:
+            raise ValueError("Mismatched parentheses")
+        inner_result = legacy_evaluate_simple_expression(expr[start + 1 : end])
+        expr = expr[:start] + str(inner_result) + expr[end + 1 :]
+    return legacy_evaluate_simple_expression(expr)
+
+
+def budget_expression(terms: int) -> str:
+    """A long yearly budget: (tuition + accommodation * months) per term, summed."""
+    return " + ".join(f"({9250 + n} + {650 + n % 7} * 12 - {1500 + n % 3}) / 3" for n in range(terms))
+
+
+def flat_expression(terms: int) -> str:
+    """The same budget written without parentheses (monthly costs times months)."""
+    return " + ".join(f"{650 + n % 7} * 12 - {1500 + n % 3} / 3" for n in range(terms))
+
+
+WORKLOADS = {"nested": budget_expression, "flat": flat_expression}
+
+
+def time_per_call(fn, number: int) -> float:
+    return timeit.timeit(fn, number=number) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--terms", type=int, nargs="+", default=[10, 50, 200])
+    args = parser.parse_args()
+
+    print(f"{'shape':<8}{'terms':>6}{'chars':>8}{'legacy µs':>12}{'cold µs':>10}{'warm µs':>10}{'warm speed-up':>15}")
+    for shape, build in WORKLOADS.items():
+        for terms in args.terms:
+            expr = build(terms)
+            number = max(5, 2000 // terms)
+            legacy = time_per_call(lambda: legacy_evaluate_expression(expr), number)
+
+            def cold():
+                calculator.compile_expression.cache_clear()
+                return calculator.evaluate(expr)
+
+            cold_us = time_per_call(cold, number)
+            calculator.evaluate(expr)
+            warm_us = time_per_call(lambda: calculator.evaluate(expr), number)
+            print(
+                f"{shape:<8}{terms:>6}{len(expr):>8}{legacy:>12.1f}{cold_us:>10.1f}"
+                f"{warm_us:>10.1f}{legacy / warm_us:>14.1f}x"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-turn cost of saving conversation history.
+
+Compares the legacy ``history.json`` format (whole list re-serialised on every
+save) with the append-only JSONL store over a long simulated conversation, and
+prints the mean save time for early and late turns. With the JSONL store the
+per-turn cost stays flat; with the legacy format it grows with the history.
+
+Run from the repository root:
+    python benchmarks/bench_history.py --turns 250
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import Agent, prompt  # noqa: E402
+
+OBSERVATION = "Observation: " + "University of Example — BSc Computer Science, AAA, IELTS 6.5. " * 40
+
+
+def run(history_file: str, turns: int) -> list:
+    agent = Agent(prompt, history_file=history_file)
+    timings = []
+    for n in range(turns):
+        agent.messages.append({"role": "user", "content": OBSERVATION if n else "Question?"})
+        agent.messages.append({"role": "assistant", "content": f"Thought: turn {n}\nAction: search: query {n}\nPAUSE"})
+        start = time.perf_counter()
+        agent.save_history()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=250)
+    args = parser.parse_args()
+
+    window = max(1, args.turns // 10)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "legacy .json": run(os.path.join(tmp, "history.json"), args.turns),
+            "append .jsonl": run(os.path.join(tmp, "history.jsonl"), args.turns),
+        }
+
+    print(f"Save cost per turn over {args.turns} turns (mean of {window}-turn windows, ms)")
+    print(f"{'format':<15}{'first':>10}{'last':>10}{'growth':>10}")
+    for name, timings in results.items():
+        first = sum(timings[1 : window + 1]) / window * 1000
+        last = sum(timings[-window:]) / window * 1000
+        print(f"{name:<15}{first:>10.3f}{last:>10.3f}{last / first:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
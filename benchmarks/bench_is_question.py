@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark: precompiled question classifier versus the previous regex loop.
+
+The legacy ``is_question`` (reproduced below) formatted and searched a new
+pattern for each of its 17 question words on every input, and its doubled
+backslash meant the patterns never matched. The classifier runs one
+alternation, compiled at import, per input.
+
+The corpus is every user input in the recorded transcripts, plus inputs
+generated from English and Arabic templates in the shape of our logged REPL
+lines, repeated up to ``--size``. Pass ``--corpus`` with a text file of
+real logged inputs (one per line) to measure those instead.
+
+Run from the repository root:
+    python benchmarks/bench_is_question.py --size 200000
+    python benchmarks/bench_is_question.py --corpus logged_inputs.txt
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from question_classifier import classify_batch, is_question  # noqa: E402
+
+
+def legacy_is_question(user_input: str) -> bool:
+    question_words = [
+        "who",
+        "what",
+        "when",
+        "where",
+        "why",
+        "how",
+        "which",
+        "can",
+        "is",
+        "are",
+        "do",
+        "does",
+        "did",
+        "will",
+        "could",
+        "would",
+        "should",
+    ]
+    input_lower = user_input.lower().strip()
+    for word in question_words:
+        if re.search(rf"\\b{word}\\b", input_lower):
+            return True
+    non_questions = ["i have no more questions", "that's all", "no more questions"]
+    for statement in non_questions:
+        if input_lower.startswith(statement) and input_lower.endswith("?"):
+            return False
+    if input_lower.endswith("?"):
+        return True
+    return False
+
+
+TEMPLATES = [
+    "What scholarships can I get for {subject} in {country}?",
+    "how much is tuition for {subject} at a university in {country}",
+    "I got {grade} in tawjihi, which universities accept me?",
+    "My tawjihi average is {grade}",
+    "I want to study {subject} in {country}",
+    "Thanks, that's all",
+    "no more questions?",
+    "هل توجد منح لدراسة {subject_ar} في {country_ar}؟",
+    "كم رسوم دراسة {subject_ar} في {country_ar}",
+    "معدلي {grade} بدي ادرس {subject_ar}",
+    "شو الجامعات اللي بتقبل معدل {grade}؟",
+    "وين أقدر أدرس {subject_ar} ب{country_ar}",
+    "شكرا كتير",
+]
+FIELDS = {
+    "subject": ["computer science", "medicine", "civil engineering", "pharmacy"],
+    "subject_ar": ["الطب", "الهندسة", "علم الحاسوب", "الصيدلة"],
+    "country": ["Turkey", "Germany", "the UK", "Jordan"],
+    "country_ar": ["تركيا", "ألمانيا", "بريطانيا", "الأردن"],
+    "grade": ["88.5", "92", "95.4", "97"],
+}
+
+
+def transcript_inputs() -> list:
+    inputs = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "fixtures", "transcripts", "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            transcript = json.load(f)
+        inputs.append(transcript["question"])
+        inputs.extend(transcript.get("user_inputs", []))
+    return inputs
+
+
+def generated_inputs() -> list:
+    inputs = []
+    for n, template in enumerate(TEMPLATES):
+        for i in range(4):
+            inputs.append(template.format(**{key: values[(n + i) % 4] for key, values in FIELDS.items()}))
+    return inputs
+
+
+def build_corpus(size: int, path: str = None) -> list:
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [line.rstrip("\n") for line in f if line.strip()]
+    base = transcript_inputs() + generated_inputs()
+    return list(itertools.islice(itertools.cycle(base), size))
+
+
+def per_input_us(fn, corpus: list) -> float:
+    start = time.perf_counter()
+    fn(corpus)
+    return (time.perf_counter() - start) / len(corpus) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000, help="generated corpus size")
+    parser.add_argument("--corpus", help="text file of logged inputs, one per line")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.size, args.corpus)
+    legacy = per_input_us(lambda texts: [legacy_is_question(t) for t in texts], corpus)
+    single = per_input_us(lambda texts: [is_question(t) for t in texts], corpus)
+    batch = per_input_us(classify_batch, corpus)
+
+    legacy_yes = sum(legacy_is_question(t) for t in corpus)
+    new_yes = sum(classify_batch(corpus))
+    print(f"{len(corpus)} inputs ({len(set(corpus))} distinct)")
+    print(f"\n{'implementation':<20}{'µs/input':>10}{'inputs/s':>12}{'speed-up':>10}")
+    for name, us in (("legacy loop", legacy), ("is_question", single), ("classify_batch", batch)):
+        print(f"{name:<20}{us:>10.2f}{1e6 / us:>12,.0f}{legacy / us:>9.1f}x")
+    print(f"\nclassified as questions: legacy {legacy_yes}, classifier {new_yes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local ``lookup`` latency against an index of harvested search results.
+
+Builds an in-memory index from the recorded Tavily fixtures plus ``--pages``
+synthetic programme pages, then times ``KnowledgeIndex.lookup`` for typical
+advisor queries (a live Tavily search takes around a second).
+
+Run from the repository root:
+    python benchmarks/bench_knowledge_index.py --pages 20000
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from knowledge_index import KnowledgeIndex  # noqa: E402
+
+SUBJECTS = ["Computer Science", "Medicine", "Civil Engineering", "Economics", "Pharmacy", "Law", "Architecture"]
+COUNTRIES = ["UK", "Turkey", "Germany", "Malaysia", "Jordan", "Qatar", "Canada", "Ireland"]
+QUERIES = [
+    "Computer Science entry requirements Turkey",
+    "DAAD scholarships Germany",
+    "full scholarships for Palestinian students Computer Science 2026 site:*.ac.uk",
+    "Medicine tuition fees Jordan international students",
+    "Economics scholarships Malaysia Tawjihi",
+]
+
+
+def synthetic_pages(count: int, rng: random.Random):
+    for n in range(count):
+        subject, country = rng.choice(SUBJECTS), rng.choice(COUNTRIES)
+        yield {
+            "query": f"{subject} {country} admissions",
+            "results": [
+                {
+                    "title": f"{subject} BSc – University {n} ({country})",
+                    "url": f"https://www.uni{n}.edu/{subject.lower().replace(' ', '-')}",
+                    "content": f"{subject} entry requirements, tuition fees and scholarships for "
+                    f"international students in {country}. Tawjihi and A-level applicants welcome.",
+                }
+            ],
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    index = KnowledgeIndex(":memory:")
+    start = time.perf_counter()
+    for path in glob.glob(os.path.join(ROOT, "fixtures", "tavily", "*.json")):
+        with open(path, encoding="utf-8") as f:
+            index.harvest(json.load(f))
+    for response in synthetic_pages(args.pages, random.Random(0)):
+        index.harvest(response)
+    print(f"indexed {index.stats()['pages']} pages in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'query':<80}{'results':>8}{'ms/lookup':>11}")
+    for query in QUERIES:
+        results = index.lookup(query)
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            index.lookup(query)
+        per_lookup = (time.perf_counter() - start) / args.runs * 1e3
+        print(f"{query[:78]:<80}{len(results):>8}{per_lookup:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
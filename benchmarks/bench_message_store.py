@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory per session with conversations held as plain dicts and in a MessageStore.
+
+Each recorded transcript is replayed through ``query()`` with the real
+``main.prompt`` to get a full conversation. Sessions are then built from it
+the way a server holds them: every session has its own question and its
+history decoded separately (as when loaded from disk), so no strings are
+shared by accident. Two workloads are measured:
+
+* ``popular``: sessions ask about the three recorded topics, so their search
+  observations repeat across sessions, as popular searches do
+* ``unique``: every observation is different; only the system prompt repeats
+
+For each, ``tracemalloc`` gives the memory held per session at each session
+count for a list of dicts, a ``MessageStore``, and a ``MessageStore`` that
+compresses all but the last ``--compress-after`` messages. Reading every
+message of every session back is timed too, as the store builds dicts on
+access.
+
+Run from the repository root:
+    python benchmarks/bench_message_store.py
+"""
+import argparse
+import gc
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main  # noqa: E402
+from message_store import MessageStore  # noqa: E402
+from stubs import ReplayOpenAI, ReplayTavilyClient, load_transcript  # noqa: E402
+
+TRANSCRIPT_DIR = os.path.join(ROOT, "fixtures", "transcripts")
+
+
+def replay(transcript: dict, workdir: str) -> list:
+    """The full conversation ``query()`` produces for ``transcript``."""
+    main.tavily_client = ReplayTavilyClient(transcript["search_responses"])
+    agent = main.Agent(
+        main.prompt, history_file=os.path.join(workdir, "replay.jsonl"), client=ReplayOpenAI(transcript["replies"])
+    )
+    main.query(transcript["question"], agent, verbose=False)
+    return list(agent.messages)
+
+
+def session_texts(conversations: list, sessions: int, unique: bool) -> list:
+    """Serialised history for each session: its own question, and its own observations if ``unique``."""
+    texts = []
+    for n in range(sessions):
+        messages = [dict(m) for m in conversations[n % len(conversations)]]
+        messages[1]["content"] += f" (student {n})"
+        if unique:
+            for m in messages[2:]:
+                if m["content"].startswith("Observation"):
+                    m["content"] += f"\n(session {n})"
+        texts.append(json.dumps(messages))
+    return texts
+
+
+def measure(texts: list, build) -> tuple:
+    """(bytes held per session, microseconds to read one session back) for sessions built by ``build``."""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    sessions = [build(json.loads(text)) for text in texts]
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for session in sessions:
+        for message in session:
+            message["content"]
+    read_us = (time.perf_counter() - start) / len(sessions) * 1e6
+    del sessions
+    return held / len(texts), read_us
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", default="1000,10000", help="comma-separated session counts")
+    parser.add_argument("--compress-after", type=int, default=4)
+    args = parser.parse_args()
+
+    transcripts = [load_transcript(path) for path in sorted(glob.glob(os.path.join(TRANSCRIPT_DIR, "*.json")))]
+    saved = (main.tavily_client, main.async_tavily_client, main.search_cache, main.knowledge_index)
+    main.async_tavily_client = main.search_cache = main.knowledge_index = None
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            conversations = [replay(transcript, workdir) for transcript in transcripts]
+    finally:
+        main.tavily_client, main.async_tavily_client, main.search_cache, main.knowledge_index = saved
+
+    variants = (
+        ("list of dicts", list),
+        ("MessageStore", MessageStore),
+        (f"compressed (last {args.compress_after})", lambda m: MessageStore(m, compress_after=args.compress_after)),
+    )
+    messages = sum(map(len, conversations)) / len(conversations)
+    print(f"{len(conversations)} conversations, {messages:.1f} messages each\n")
+    print(f"{'workload':<10}{'sessions':>10}  {'storage':<24}{'KiB/session':>13}{'vs list':>10}{'read µs':>10}")
+    for workload in ("popular", "unique"):
+        for count in map(int, args.sessions.split(",")):
+            texts = session_texts(conversations, count, unique=workload == "unique")
+            baseline = None
+            for name, build in variants:
+                held, read_us = measure(texts, build)
+                baseline = baseline or held
+                print(
+                    f"{workload:<10}{count:>10}  {name:<24}{held / 1024:>13.1f}"
+                    f"{held / baseline:>9.0%} {read_us:>10.1f}"
+                )
+        print()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Benchmark: observation payload size for recorded Tavily responses.
+
+Compares the raw ``repr`` of each fixture response (what used to be injected
+as ``Observation: {observation}``) with the output of
+``format_search_results``, in characters and approximate tokens, and times
+the formatter.
+
+Run from the repository root:
+    python benchmarks/bench_observations.py
+"""
+import glob
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from context_window import estimate_tokens  # noqa: E402
+from observations import format_search_results  # noqa: E402
+
+
+def main() -> None:
+    paths = sorted(glob.glob(os.path.join(ROOT, "fixtures", "tavily", "*.json")))
+    print(f"{'fixture':<38}{'raw chars':>10}{'fmt chars':>10}{'raw tok':>9}{'fmt tok':>9}{'saved':>8}{'µs/call':>9}")
+    total_raw = total_fmt = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            response = json.load(f)
+        raw = repr(response)
+        formatted = format_search_results(response)
+        runs = 2000
+        per_call = timeit.timeit(lambda: format_search_results(response), number=runs) / runs * 1e6
+        total_raw += len(raw)
+        total_fmt += len(formatted)
+        print(
+            f"{os.path.basename(path):<38}{len(raw):>10}{len(formatted):>10}"
+            f"{estimate_tokens(raw):>9}{estimate_tokens(formatted):>9}"
+            f"{1 - len(formatted) / len(raw):>7.0%}{per_call:>9.1f}"
+        )
+    print(f"{'total':<38}{total_raw:>10}{total_fmt:>10}{'':>18}{1 - total_fmt / total_raw:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
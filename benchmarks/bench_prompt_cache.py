@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes and tokens saved per conversation by treating the system prompt as a cached prefix.
+
+Each recorded transcript is replayed through ``query()`` with the real
+``main.prompt``, saving history after every turn. The report then gives,
+per conversation:
+
+* model calls, and the prompt tokens sent across them (estimated)
+* prefix tokens a provider cache can serve: the system prompt on every call
+  after the first, for providers that cache automatically (OpenAI, DeepSeek)
+  or with a ``cache_control`` marker (Anthropic, Gemini)
+* history bytes written with the legacy ``.json`` format, where the whole
+  list (prompt included) is rewritten on every save
+* the same for the JSONL store with the prompt inline, and with the prompt
+  stored once by hash (the prompt file is shared, so it is counted once per
+  directory and not per conversation)
+
+It also times the Gemma fold of the prompt into the first user turn, with and
+without the memoised fold.
+
+Run from the repository root:
+    python benchmarks/bench_prompt_cache.py
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import history_store  # noqa: E402
+import main  # noqa: E402
+import model_router  # noqa: E402
+from context_window import message_tokens  # noqa: E402
+from history_store import JSONLHistoryStore  # noqa: E402
+from stubs import ReplayOpenAI, ReplayTavilyClient, load_transcript  # noqa: E402
+
+TRANSCRIPT_DIR = os.path.join(ROOT, "fixtures", "transcripts")
+
+
+def replay(transcript: dict, workdir: str) -> tuple:
+    """Replay ``transcript``; returns (the request message lists, the history as it stood at each save)."""
+    model = ReplayOpenAI(transcript["replies"])
+    main.tavily_client = ReplayTavilyClient(transcript["search_responses"])
+    agent = main.Agent(main.prompt, history_file=os.path.join(workdir, "replay.jsonl"), client=model)
+    main.query(transcript["question"], agent, verbose=False)
+    # History is saved after every model turn; rebuild the list as it stood at each save
+    saves = [agent.messages[: n + 1] for n, m in enumerate(agent.messages) if m["role"] == "assistant"]
+    return model.requests, saves
+
+
+def history_bytes(saves: list, path: str, by_reference: bool) -> int:
+    """Bytes written saving each of ``saves`` in turn to a JSONL store."""
+    saved_min = history_store.PROMPT_REF_MIN_CHARS
+    history_store.PROMPT_REF_MIN_CHARS = saved_min if by_reference else sys.maxsize
+    try:
+        store = JSONLHistoryStore(path)
+        for messages in saves:
+            store.sync(messages)
+    finally:
+        history_store.PROMPT_REF_MIN_CHARS = saved_min
+    return store.bytes_written
+
+
+def bench_fold(repeat: int) -> tuple:
+    """Microseconds per Gemma fold of ``main.prompt``, memoised and not."""
+    messages = [{"role": "system", "content": main.prompt}, {"role": "user", "content": "Medicine in Germany?"}]
+    timings = []
+    for fold in (model_router._folded_content.__wrapped__, model_router._folded_content):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fold(messages[0]["content"], messages[1]["content"])
+        timings.append((time.perf_counter() - start) / repeat * 1e6)
+    return tuple(timings)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=100_000, help="folds per timing")
+    args = parser.parse_args()
+
+    saved = (main.tavily_client, main.async_tavily_client, main.search_cache, main.knowledge_index, main.answer_cache)
+    main.async_tavily_client = main.search_cache = main.knowledge_index = main.answer_cache = None
+    prompt_bytes = len(main.prompt.encode("utf-8"))
+    prefix_tokens = message_tokens({"role": "system", "content": main.prompt})
+    print(f"system prompt: {prompt_bytes} bytes, ~{prefix_tokens} tokens\n")
+    print(f"{'conversation':<28}{'calls':>6}{'tokens':>8}{'cacheable':>11}{'.json B':>10}{'inline B':>10}{'by-ref B':>10}")
+    totals = [0] * 6
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for path in sorted(glob.glob(os.path.join(TRANSCRIPT_DIR, "*.json"))):
+                transcript = load_transcript(path)
+                requests, saves = replay(transcript, workdir)
+                tokens = sum(message_tokens(m) for request in requests for m in request)
+                cacheable = prefix_tokens * (len(requests) - 1)
+                legacy = sum(len(json.dumps(messages).encode("utf-8")) for messages in saves)
+                name = transcript["name"]
+                inline = history_bytes(saves, os.path.join(workdir, f"{name}-inline.jsonl"), False)
+                by_ref = history_bytes(saves, os.path.join(workdir, f"{name}-ref.jsonl"), True)
+                row = (len(requests), tokens, cacheable, legacy, inline, by_ref)
+                totals = [total + value for total, value in zip(totals, row)]
+                print(f"{name:<28}" + "".join(f"{v:>{w}}" for v, w in zip(row, (6, 8, 11, 10, 10, 10))))
+    finally:
+        main.tavily_client, main.async_tavily_client, main.search_cache, main.knowledge_index, main.answer_cache = saved
+
+    calls, tokens, cacheable, legacy, inline, by_ref = totals
+    print(f"\ncacheable prefix: {cacheable} of {tokens} prompt tokens ({cacheable / tokens:.0%})")
+    print(f"history bytes: .json {legacy}, JSONL inline {inline}, JSONL by reference {by_ref} "
+          f"({1 - by_ref / inline:.0%} less than inline, plus the {prompt_bytes} B prompt file once)")
+    uncached, cached = bench_fold(args.repeat)
+    print(f"gemma fold: {uncached:.2f} us per turn unmemoised, {cached:.2f} us memoised")
+
+
+if __name__ == "__main__":
+    main_cli()
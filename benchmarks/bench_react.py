@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the ReAct loop replayed from recorded transcripts.
+
+Each transcript in ``fixtures/transcripts`` holds a student question, the
+model replies recorded for it, and the Tavily fixtures its searches returned.
+The harness replays the transcripts through:
+
+* ``query()`` end to end, with real history files and tracing on, for the
+  per-stage overhead breakdown
+* ``Agent.execute``
+* ``safe_calculate``, on every calculation in the transcripts
+* ``is_question``, on the recorded user inputs
+* history persistence, as a 100-turn conversation saved every turn
+
+Model and search latencies are simulated deterministically rather than slept.
+Each transcript's recorded latency is added to a virtual clock, so
+"simulated q/s" is the throughput a single worker would reach against the
+real APIs, and every timing below is pure advisor overhead.
+
+Metrics are compared against a stored baseline, and the script exits with
+status 1 on a regression:
+
+* count metrics (model calls, searches, prompt tokens, observation size)
+  must not grow at all
+* timings must stay within ``--tolerance`` of the baseline
+
+Timings are machine-dependent, so refresh the baseline with
+``--update-baseline`` on the machine that runs the check.
+
+Run from the repository root:
+    python benchmarks/bench_react.py
+    python benchmarks/bench_react.py --update-baseline
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main  # noqa: E402
+import tracing  # noqa: E402
+from context_window import message_tokens  # noqa: E402
+from stubs import ReplayOpenAI, ReplayTavilyClient, load_transcript  # noqa: E402
+
+TRANSCRIPT_DIR = os.path.join(ROOT, "fixtures", "transcripts")
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_TOLERANCE = 0.5
+STAGES = ("query", "model.call", "parse", "action", "history.save")
+
+
+def load_transcripts(directory: str = TRANSCRIPT_DIR) -> list:
+    return [load_transcript(path) for path in sorted(glob.glob(os.path.join(directory, "*.json")))]
+
+
+def _use_replay_search(transcript: dict) -> ReplayTavilyClient:
+    """Point the search action at the transcript's recorded responses, with no caches or index."""
+    tavily = ReplayTavilyClient(transcript["search_responses"], latency=transcript.get("search_latency", 0.0))
+    main.tavily_client = tavily
+    main.async_tavily_client = None
+    main.search_cache = None
+    main.knowledge_index = None
+    main.answer_cache = None
+    return tavily
+
+
+def _median_ms(samples: list) -> float:
+    return statistics.median(samples) * 1e3
+
+
+def bench_query(transcripts: list, runs: int, workdir: str) -> dict:
+    """Replay every transcript through query(); returns count, timing and stage metrics."""
+    tracer = tracing.enable(tracing.Tracer())
+    per_query = []
+    simulated = 0.0
+    model_calls = searches = prompt_tokens = observation_chars = 0
+    try:
+        for run in range(runs):
+            for transcript in transcripts:
+                model = ReplayOpenAI(transcript["replies"], latency=transcript.get("model_latency", 0.0))
+                tavily = _use_replay_search(transcript)
+                history = os.path.join(workdir, f"{transcript['name']}-{run}.jsonl")
+                agent = main.Agent(main.prompt, history_file=history, client=model)
+                start = time.perf_counter()
+                answer = main.query(transcript["question"], agent, verbose=False)
+                per_query.append(time.perf_counter() - start)
+                if answer is None:
+                    raise RuntimeError(f"{transcript['name']}: replay ended without an answer")
+                simulated += model.simulated_seconds + tavily.simulated_seconds
+                if run == 0:
+                    model_calls += len(model.requests)
+                    searches += tavily.calls
+                    prompt_tokens += sum(message_tokens(m) for request in model.requests for m in request)
+                    observation_chars += sum(
+                        len(m["content"]) for m in agent.messages if m["content"].startswith("Observation")
+                    )
+    finally:
+        tracing.disable()
+
+    total = sum(per_query)
+    summary = tracer.summary()
+    metrics = {
+        "query.model_calls": {"value": model_calls, "kind": "count"},
+        "query.searches": {"value": searches, "kind": "count"},
+        "query.prompt_tokens": {"value": prompt_tokens, "kind": "count"},
+        "query.observation_chars": {"value": observation_chars, "kind": "count"},
+        "query.overhead_ms": {"value": _median_ms(per_query), "kind": "time"},
+    }
+    for stage in STAGES[1:]:
+        if stage in summary:
+            metrics[f"stage.{stage}_ms"] = {"value": summary[stage]["p50_ms"], "kind": "time"}
+    report = {
+        "queries": len(per_query),
+        "overhead_qps": len(per_query) / total,
+        "simulated_qps": len(per_query) / (total + simulated),
+        "stages": summary,
+    }
+    return metrics, report
+
+
+def bench_execute(transcripts: list, runs: int) -> dict:
+    """Median time of Agent.execute on a replayed reply, with a realistic history length."""
+    samples = []
+    for transcript in transcripts:
+        agent = main.Agent(main.prompt, client=ReplayOpenAI(transcript["replies"] * runs))
+        agent.messages.append({"role": "user", "content": transcript["question"]})
+        for _ in range(runs * len(transcript["replies"])):
+            start = time.perf_counter()
+            agent.execute()
+            samples.append(time.perf_counter() - start)
+    return {"execute_ms": {"value": _median_ms(samples), "kind": "time"}}
+
+
+def bench_calculate(transcripts: list, runs: int) -> dict:
+    expressions = [
+        reply.split("Action: calculate:", 1)[1].split("\n", 1)[0].strip()
+        for transcript in transcripts
+        for reply in transcript["replies"]
+        if "Action: calculate:" in reply
+    ]
+    repeat = max(1, runs * 100)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for expression in expressions:
+            main.safe_calculate(expression)
+    elapsed = time.perf_counter() - start
+    return {"safe_calculate_us": {"value": elapsed / (repeat * len(expressions)) * 1e6, "kind": "time"}}
+
+
+def bench_is_question(transcripts: list, runs: int) -> dict:
+    inputs = [text for transcript in transcripts for text in transcript.get("user_inputs", [])]
+    repeat = max(1, runs * 200)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in inputs:
+            main.is_question(text)
+    elapsed = time.perf_counter() - start
+    return {"is_question_us": {"value": elapsed / (repeat * len(inputs)) * 1e6, "kind": "time"}}
+
+
+def bench_history(transcripts: list, workdir: str, turns: int = 100) -> dict:
+    """Median per-turn save cost over a ``turns``-turn conversation built from the transcripts."""
+    replies = [reply for transcript in transcripts for reply in transcript["replies"]]
+    agent = main.Agent(main.prompt, history_file=os.path.join(workdir, "long-history.jsonl"))
+    samples = []
+    for turn in range(turns):
+        agent.messages.append({"role": "user", "content": f"Observation: turn {turn}"})
+        agent.messages.append({"role": "assistant", "content": replies[turn % len(replies)]})
+        start = time.perf_counter()
+        agent.save_history()
+        samples.append(time.perf_counter() - start)
+    return {"history_save_ms": {"value": _median_ms(samples), "kind": "time"}}
+
+
+def run_all(runs: int = 5) -> tuple:
+    """Run every benchmark; returns ``(metrics, report)``."""
+    transcripts = load_transcripts()
+    saved = (main.tavily_client, main.async_tavily_client, main.search_cache, main.knowledge_index, main.answer_cache)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            metrics, report = bench_query(transcripts, runs, workdir)
+            metrics.update(bench_execute(transcripts, runs))
+            metrics.update(bench_calculate(transcripts, runs))
+            metrics.update(bench_is_question(transcripts, runs))
+            metrics.update(bench_history(transcripts, workdir))
+    finally:
+        (
+            main.tavily_client,
+            main.async_tavily_client,
+            main.search_cache,
+            main.knowledge_index,
+            main.answer_cache,
+        ) = saved
+    return metrics, report
+
+
+def compare(metrics: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """Regressions of ``metrics`` against ``baseline``, as human-readable strings."""
+    failures = []
+    for name, expected in baseline.items():
+        current = metrics.get(name)
+        if current is None:
+            failures.append(f"{name}: missing from this run")
+            continue
+        limit = expected["value"] if expected["kind"] == "count" else expected["value"] * (1 + tolerance)
+        if current["value"] > limit:
+            failures.append(f"{name}: {current['value']:.4g} > allowed {limit:.4g} (baseline {expected['value']:.4g})")
+    return failures
+
+
+def print_report(metrics: dict, report: dict, baseline: dict) -> None:
+    print(
+        f"{report['queries']} replayed queries: {report['overhead_qps']:.0f} q/s overhead-only, "
+        f"{report['simulated_qps']:.2f} q/s with simulated API latency"
+    )
+    print(f"\n{'stage':<16}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'total ms':>10}")
+    for stage in STAGES:
+        stats = report["stages"].get(stage)
+        if stats:
+            print(f"{stage:<16}{stats['count']:>7}{stats['p50_ms']:>9.3f}{stats['p95_ms']:>9.3f}{stats['total_ms']:>10.1f}")
+    print(f"\n{'metric':<28}{'value':>12}{'baseline':>12}")
+    for name, metric in metrics.items():
+        expected = baseline.get(name, {}).get("value")
+        shown = f"{expected:.4g}" if expected is not None else "-"
+        print(f"{name:<28}{metric['value']:>12.4g}{shown:>12}")
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded transcripts through the ReAct loop.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed timing slowdown (0.5 = +50%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", help="also write the metrics and report to this file")
+    args = parser.parse_args(argv)
+
+    metrics, report = run_all(args.runs)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(metrics, report, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"metrics": metrics, "report": report}, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({name: {**m, "value": round(m["value"], 4)} for name, m in metrics.items()}, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    failures = compare(metrics, baseline, args.tolerance)
+    if failures:
+        print("\nREGRESSIONS:\n  " + "\n  ".join(failures))
+        return 1
+    print("\nNo regressions against baseline." if baseline else "\nNo baseline yet; run with --update-baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: interpreter startup and import cost of the advisor modules.
+
+Each scenario runs in a fresh interpreter under ``python -X importtime``,
+``--runs`` times. The report gives the median wall time of the whole process
+and the median cumulative import time of the scenario's imports, as logged
+by ``-X importtime``. It also lists which heavy third-party or stdlib
+packages each scenario loaded.
+
+The "eager" scenario imports the OpenAI and Tavily SDKs, dotenv and asyncio
+before ``main``. That is the startup the CLI and every test module paid
+while ``main`` imported them at module level. "main + init" additionally runs
+``load_dotenv_and_init_client()`` (with dummy keys), which is what the REPL
+does before its first prompt.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ("openai", "tavily", "dotenv", "httpx", "pydantic", "requests", "asyncio")
+INIT = "main.load_dotenv_and_init_client()"
+SCENARIOS = {
+    "calculator": ["calculator"],
+    "ucas": ["ucas"],
+    "main": ["main"],
+    "main + init": ["main", INIT],
+    "eager (previous)": ["openai", "tavily", "dotenv", "asyncio", "main"],
+}
+IMPORTTIME_RE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| (\S.*)$")
+
+
+def scenario_script(steps: list) -> str:
+    lines = [step if step == INIT else f"import {step}" for step in steps]
+    lines.append("import sys")
+    lines.append(f"print(' '.join(m for m in {HEAVY!r} if m in sys.modules))")
+    return "\n".join(lines)
+
+
+def run_once(steps: list, workdir: str) -> tuple:
+    """One fresh interpreter; returns (wall seconds, top-level import microseconds, heavy modules loaded)."""
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        OPENROUTER_API_KEY="bench",
+        TAVILY_API_KEY="bench",
+        SEARCH_CACHE_PATH=os.path.join(workdir, "search_cache.db"),
+        KNOWLEDGE_INDEX_PATH=os.path.join(workdir, "knowledge_index.db"),
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", scenario_script(steps)],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - start
+    imported = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        # Top-level imports only (no leading indent); skip the interpreter's own startup
+        if match and not match.group(2).startswith(" ") and match.group(2) not in ("site", "encodings"):
+            imported += int(match.group(1))
+    return wall, imported, result.stdout.split()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<18}{'wall ms':>9}{'import ms':>11}  heavy modules loaded")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, steps in SCENARIOS.items():
+            samples = [run_once(steps, workdir) for _ in range(args.runs)]
+            wall = statistics.median(s[0] for s in samples) * 1e3
+            imported = statistics.median(s[1] for s in samples) / 1e3
+            print(f"{name:<18}{wall:>9.1f}{imported:>11.1f}  {', '.join(samples[-1][2]) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
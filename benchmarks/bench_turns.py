@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark: model turns per answer, before and after adaptive turn control.
+
+The recorded transcripts are well-formed, so each is also replayed in the
+ways models actually stray from the protocol:
+
+* ``recorded``: the replies as recorded
+* ``near-miss``: Action lines written ``**Action:** Search - ...`` and the
+  final Answer preceded by a Thought line
+* ``repeated``: the model repeats its first action once before moving on
+* ``runaway``: the model keeps acting past ``max_turns`` unless told to
+  answer (it complies with the forced-answer note, as prompted models do)
+
+Each variant runs through the previous loop, reproduced below, and through
+the current ``query()``. The report gives answers, model calls, searches
+and average model turns per answer, with failed sessions counted against
+the answers that were produced.
+
+Run from the repository root:
+    python benchmarks/bench_turns.py
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import tempfile
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main  # noqa: E402
+from stubs import ReplayTavilyClient, load_transcript  # noqa: E402
+from turn_control import FORCE_ANSWER_NOTE  # noqa: E402
+
+TRANSCRIPT_DIR = os.path.join(ROOT, "fixtures", "transcripts")
+LEGACY_ACTION_RE = re.compile(r"^Action: (\w+): (.*)$")
+
+
+def legacy_query(question: str, agent, max_turns: int = 5):
+    """The text ReAct loop before turn control: exact syntax only, stops on any deviation."""
+    next_prompt = question
+    for _ in range(max_turns):
+        result = agent(next_prompt)
+        match = next(filter(None, map(LEGACY_ACTION_RE.match, result.split("\n"))), None)
+        if match:
+            action, action_input = match.groups()
+            if action not in main.known_actions:
+                return None
+            next_prompt = f"Observation: {main.shape_observation(action, main.known_actions[action](action_input))}"
+        elif result.startswith("Answer:"):
+            return result.split("Answer: ", 1)[1]
+        else:
+            return None
+    return None
+
+
+class ScriptedModel:
+    """Replays ``replies`` in order, but answers with ``final`` as soon as it is told to answer."""
+
+    def __init__(self, replies: list, final: str):
+        self.replies = list(replies)
+        self.final = final
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        self.calls += 1
+        forced = FORCE_ANSWER_NOTE in messages[-1]["content"]
+        content = self.final if forced or not self.replies else self.replies.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def near_miss(reply: str) -> str:
+    if reply.startswith("Answer:"):
+        return f"Thought: I have what I need.\n{reply}"
+    return re.sub(r"^Action: (\w+): ", lambda m: f"**Action:** {m.group(1).title()} - ", reply, flags=re.M)
+
+
+def variants(transcript: dict) -> dict:
+    replies = transcript["replies"]
+    actions = [reply for reply in replies if "Action:" in reply]
+    return {
+        "recorded": replies,
+        "near-miss": [near_miss(reply) for reply in replies],
+        "repeated": actions[:1] + replies,
+        "runaway": actions * 4,
+    }
+
+
+def run(transcripts: list, loop, workdir: str) -> dict:
+    """Totals per variant for ``loop(question, agent)`` over every transcript."""
+    totals = {}
+    for transcript in transcripts:
+        final = transcript["replies"][-1]
+        for name, replies in variants(transcript).items():
+            model = ScriptedModel(replies, final)
+            tavily = ReplayTavilyClient(transcript["search_responses"])
+            main.tavily_client = tavily
+            agent = main.Agent(main.prompt, history_file=os.path.join(workdir, f"{name}.jsonl"), client=model)
+            answer = loop(transcript["question"], agent)
+            row = totals.setdefault(name, {"sessions": 0, "answers": 0, "calls": 0, "searches": 0})
+            row["sessions"] += 1
+            row["answers"] += answer is not None
+            row["calls"] += model.calls
+            row["searches"] += tavily.calls
+    return totals
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-turns", type=int, default=5)
+    args = parser.parse_args()
+
+    transcripts = [load_transcript(path) for path in sorted(glob.glob(os.path.join(TRANSCRIPT_DIR, "*.json")))]
+    saved = (main.tavily_client, main.async_tavily_client, main.search_cache, main.knowledge_index)
+    main.async_tavily_client = main.search_cache = main.knowledge_index = None
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            before = run(transcripts, lambda question, agent: legacy_query(question, agent, args.max_turns), workdir)
+            after = run(
+                transcripts, lambda question, agent: main.query(question, agent, args.max_turns, verbose=False), workdir
+            )
+    finally:
+        main.tavily_client, main.async_tavily_client, main.search_cache, main.knowledge_index = saved
+
+    def per_answer(row):
+        return f"{row['calls'] / row['answers']:.2f}" if row["answers"] else "-"
+
+    print(f"{'variant':<11}{'answers':>14}{'model calls':>14}{'searches':>12}{'turns/answer':>16}")
+    for name in before:
+        b, a = before[name], after[name]
+        columns = (
+            (f"{b['answers']}/{b['sessions']} -> {a['answers']}/{a['sessions']}", 14),
+            (f"{b['calls']} -> {a['calls']}", 14),
+            (f"{b['searches']} -> {a['searches']}", 12),
+            (f"{per_answer(b)} -> {per_answer(a)}", 16),
+        )
+        print(f"{name:<11}" + "".join(f"{text:>{width}}" for text, width in columns))
+    total_before = {key: sum(row[key] for row in before.values()) for key in ("answers", "calls")}
+    total_after = {key: sum(row[key] for row in after.values()) for key in ("answers", "calls")}
+    print(f"\nall variants: {per_answer(total_before)} -> {per_answer(total_after)} model turns per answer")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bulk UCAS conversion of applicant grade records.
+
+Converts N synthetic (applicant_id, qualification, grade) rows to per-applicant
+totals, comparing a loop over the previous ``get_ucas_points`` (which rebuilt
+its tariff dict on every call) with ``ucas.batch_totals``.
+
+Run from the repository root:
+    python benchmarks/bench_ucas.py --rows 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ucas import batch_totals  # noqa: E402
+
+
+def legacy_get_ucas_points(grade: str, subject_type: str = "A-level") -> int:
+    ucas_points = {
+        "A-level": {"A*": 56, "A": 48, "B": 40, "C": 32, "D": 24, "E": 16},
+        "AS-level": {"A": 20, "B": 16, "C": 12, "D": 10, "E": 6},
+        "BTEC": {"D*": 56, "D": 48, "M": 32, "P": 16},
+    }
+    try:
+        return ucas_points.get(subject_type, {}).get(grade.upper(), 0)
+    except Exception:
+        return 0
+
+
+def legacy_totals(rows) -> dict:
+    totals = {}
+    for applicant_id, qualification, grade in rows:
+        totals[applicant_id] = totals.get(applicant_id, 0) + legacy_get_ucas_points(grade, qualification)
+    return totals
+
+
+def synthetic_rows(n: int, seed: int = 2026) -> list:
+    rng = random.Random(seed)
+    choices = [
+        ("A-level", ["A*", "A", "B", "C", "D", "E"]),
+        ("AS-level", ["A", "B", "C", "D", "E"]),
+        ("BTEC", ["D*", "D", "M", "P"]),
+    ]
+    rows = []
+    for i in range(n):
+        qualification, grades = rng.choice(choices)
+        rows.append((f"applicant-{i // 3}", qualification, rng.choice(grades)))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    start = time.perf_counter()
+    expected = legacy_totals(rows)
+    legacy = time.perf_counter() - start
+    start = time.perf_counter()
+    totals = batch_totals(rows)
+    batch = time.perf_counter() - start
+    assert totals == expected
+
+    print(f"{args.rows} rows, {len(totals)} applicants")
+    print(f"{'legacy get_ucas_points loop':<30}{legacy * 1000:>9.1f} ms")
+    print(f"{'ucas.batch_totals':<30}{batch * 1000:>9.1f} ms  ({legacy / batch:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
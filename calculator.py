@@ -0,0 +1,176 @@
+"""Arithmetic engine for the ``calculate`` action.
+
+Expressions are tokenised once, parsed with the shunting-yard algorithm
+(binary ``+ - * /``, unary ``+``/``-`` and parentheses) and compiled to a
+flat postfix program. Compiled programs are kept in an LRU cache, so repeated
+expressions skip parsing entirely. Evaluation runs in float mode by default
+or in ``Decimal`` mode for exact fee and budget arithmetic.
+``safe_calculate`` is the action itself: it screens the input and reports
+errors as text for the model.
+"""
+
+import re
+from decimal import Decimal
+from functools import lru_cache
+
+_TOKEN_RE = re.compile(r"(\d+(?:\.\d*)?|\.\d+)|([-+*/()])|(\S)")
+
+# Binding powers: higher binds tighter; "u-"/"u+" are the prefix (unary) operators
+_BP = {"+": 1, "-": 1, "*": 2, "/": 2, "u-": 3, "u+": 3}
+
+# Opcodes of the compiled postfix program
+_PUSH, _NEG, _ADD, _SUB, _MUL, _DIV = range(6)
+_OPCODES = {"+": _ADD, "-": _SUB, "*": _MUL, "/": _DIV, "u-": _NEG}
+
+
+def tokenize(expression: str) -> list:
+    """Split ``expression`` into number and operator tokens."""
+    tokens = []
+    append = tokens.append
+    for number, symbol, other in _TOKEN_RE.findall(expression):
+        if other:
+            raise ValueError(f"Unexpected character '{other}'")
+        append(number or symbol)
+    return tokens
+
+
+def _parse(tokens: list):
+    """Shunting-yard parse of ``tokens`` into a postfix program and its constant pool."""
+    if not tokens:
+        raise ValueError("Empty expression")
+    code = []
+    emit = code.append
+    constants = []
+    operators = []
+    expect_operand = True
+    for token in tokens:
+        if token[0].isdigit() or token[0] == ".":
+            if not expect_operand:
+                raise ValueError(f"Unexpected number '{token}'")
+            emit((_PUSH, len(constants)))
+            constants.append(token)
+            expect_operand = False
+        elif token == "(":
+            if not expect_operand:
+                raise ValueError("Unexpected '('")
+            operators.append(token)
+        elif token == ")":
+            if expect_operand:
+                raise ValueError("Unexpected ')'")
+            while operators and operators[-1] != "(":
+                op = operators.pop()
+                if op != "u+":
+                    emit((_OPCODES[op], None))
+            if not operators:
+                raise ValueError("Mismatched parentheses")
+            operators.pop()
+        elif expect_operand:
+            if token not in "+-":
+                raise ValueError(f"Unexpected '{token}'")
+            operators.append("u" + token)
+        else:
+            bp = _BP[token]
+            while operators and operators[-1] != "(" and _BP[operators[-1]] >= bp:
+                op = operators.pop()
+                if op != "u+":
+                    emit((_OPCODES[op], None))
+            operators.append(token)
+            expect_operand = True
+    if expect_operand:
+        raise ValueError("Unexpected end of expression")
+    while operators:
+        op = operators.pop()
+        if op == "(":
+            raise ValueError("Mismatched parentheses")
+        if op != "u+":
+            emit((_OPCODES[op], None))
+    return tuple(code), tuple(constants)
+
+
+class CompiledExpression:
+    """A parsed expression as a postfix program, evaluable in float or Decimal mode."""
+
+    __slots__ = ("source", "code", "constants", "_float_constants", "_decimal_constants")
+
+    def __init__(self, source: str, code: tuple, constants: tuple):
+        self.source = source
+        self.code = code
+        self.constants = constants
+        self._float_constants = tuple(map(float, constants))
+        # Built on first Decimal evaluation
+        self._decimal_constants = None
+
+    def evaluate(self, use_decimal: bool = False):
+        if use_decimal:
+            if self._decimal_constants is None:
+                self._decimal_constants = tuple(map(Decimal, self.constants))
+            constants = self._decimal_constants
+        else:
+            constants = self._float_constants
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for opcode, arg in self.code:
+            if opcode == _PUSH:
+                push(constants[arg])
+            elif opcode == _NEG:
+                push(-pop())
+            else:
+                right = pop()
+                left = pop()
+                if opcode == _ADD:
+                    push(left + right)
+                elif opcode == _SUB:
+                    push(left - right)
+                elif opcode == _MUL:
+                    push(left * right)
+                else:
+                    if right == 0:
+                        raise ValueError("Division by zero")
+                    push(left / right)
+        return stack[0]
+
+
+@lru_cache(maxsize=512)
+def compile_expression(expression: str) -> CompiledExpression:
+    """Parse and compile ``expression``; results are cached by source text."""
+    code, constants = _parse(tokenize(expression))
+    return CompiledExpression(expression, code, constants)
+
+
+def evaluate(expression: str, use_decimal: bool = False):
+    """Evaluate ``expression``, returning a float (or a Decimal with ``use_decimal=True``)."""
+    return compile_expression(expression).evaluate(use_decimal)
+
+
+def safe_calculate(expression: str, use_decimal: bool = False):
+    """Safely evaluate mathematical expressions without using eval().
+
+    Supports +, -, *, /, unary minus and parentheses. Accepts numbers with
+    optional comma thousands separators, which are removed before parsing.
+    With ``use_decimal=True`` the result is an exact ``Decimal`` (useful for
+    fees and budgets) instead of a float.
+    """
+    try:
+        if expression is None:
+            raise ValueError("Empty expression")
+        # Normalize whitespace and remove thousands separators
+        expression = expression.strip()
+        expression_no_commas = expression.replace(",", "")
+
+        # Disallow obviously dangerous characters
+        dangerous_chars = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_[]{}|\\`~@#$%^")
+        if any(c in dangerous_chars for c in expression_no_commas):
+            raise ValueError("Expression contains potentially dangerous characters")
+
+        # Allow only safe characters
+        safe_chars = set("0123456789+-*/(). ")
+        if not all(c in safe_chars for c in expression_no_commas):
+            other_chars = set(expression_no_commas) - safe_chars
+            if any(c in dangerous_chars for c in other_chars):
+                raise ValueError("Expression contains potentially dangerous characters")
+
+        # Delegate to the compiled expression engine
+        return evaluate(expression_no_commas, use_decimal)
+    except Exception as e:
+        return f"Error calculating: {str(e)}"
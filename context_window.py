@@ -0,0 +1,150 @@
+"""Token-budgeted context window for Agent requests.
+
+``Agent.messages`` keeps the full conversation; ``ContextWindow.fit`` builds
+the (smaller) list actually sent to the model:
+
+1. The system prompt and the student's first question are always kept.
+2. Observations older than the most recent ``keep_recent`` messages are
+   truncated to ``observation_chars`` characters.
+3. If the estimate still exceeds the model's budget, the oldest unpinned
+   messages are dropped until it fits (the latest message is always sent).
+   Tool results are never sent without the assistant turn that called them.
+
+Token counts are approximate (about four characters per token plus a small
+per-message overhead), which is enough for budgeting without a tokenizer.
+"""
+
+from collections import deque
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+DEFAULT_TOKEN_BUDGET = 12000
+
+# Prompt token budgets per model; leaves headroom below each context limit for the reply
+MODEL_TOKEN_BUDGETS = {
+    "deepseek/deepseek-r1-0528-qwen3-8b:free": 24000,
+    "google/gemma-3-27b-it:free": 24000,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of ``text``."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def message_tokens(message: dict) -> int:
+    """Approximate the token count of one chat message, including its framing."""
+    content = message.get("content") or ""
+    if not isinstance(content, str):
+        content = str(content)
+    tokens = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+    for call in message.get("tool_calls") or ():
+        function = call["function"]
+        tokens += estimate_tokens(function["name"] + function["arguments"]) + MESSAGE_OVERHEAD_TOKENS
+    return tokens
+
+
+def token_counts(messages) -> list:
+    """``message_tokens`` of each message; a ``MessageStore`` answers from its records without decoding."""
+    counts = getattr(messages, "token_counts", None)
+    return counts() if counts is not None else [message_tokens(m) for m in messages]
+
+
+def is_observation(message: dict) -> bool:
+    """True for action results: text-protocol Observation messages and tool results."""
+    content = message.get("content")
+    if not isinstance(content, str):
+        return False
+    role = message.get("role")
+    return role == "tool" or (role == "user" and content.startswith("Observation"))
+
+
+class ContextWindow:
+    """Trims a message history to a per-model token budget and records tokens sent."""
+
+    def __init__(
+        self,
+        budget: int = None,
+        model_budgets: dict = None,
+        keep_recent: int = 4,
+        observation_chars: int = 1500,
+        metrics_window: int = 1000,
+    ):
+        self.budget = budget
+        self.model_budgets = dict(MODEL_TOKEN_BUDGETS if model_budgets is None else model_budgets)
+        self.keep_recent = keep_recent
+        self.observation_chars = observation_chars
+        self.turns = 0
+        self.tokens_sent = 0
+        self.tokens_in_history = 0
+        # Tokens sent for each recent request, oldest first
+        self.tokens_per_turn = deque(maxlen=metrics_window)
+
+    def budget_for(self, model: str) -> int:
+        if self.budget is not None:
+            return self.budget
+        return self.model_budgets.get(model, DEFAULT_TOKEN_BUDGET)
+
+    def _shorten(self, message: dict) -> dict:
+        content = message["content"]
+        if len(content) <= self.observation_chars:
+            return message
+        omitted = len(content) - self.observation_chars
+        return {**message, "content": f"{content[: self.observation_chars]}… [{omitted} characters truncated]"}
+
+    def fit(self, messages: list, model: str = "", record: bool = True) -> list:
+        """Return the messages to send for ``model``; ``messages`` itself is not modified.
+
+        Messages are read from the newest backwards and only until the budget
+        is spent, so the older part of a long history is never read (or, in a
+        ``MessageStore``, decoded and decompressed). Pass ``record=False`` to
+        leave the metrics alone, e.g. when refitting one request for another model.
+        """
+        if not messages:
+            return []
+        budget = self.budget_for(model)
+        counts = token_counts(messages)
+        head = messages[:2]
+        pinned = 1 if head[0].get("role") == "system" else 0
+        if len(head) > pinned and head[pinned].get("role") == "user":
+            pinned += 1
+        recent_start = max(pinned, len(messages) - self.keep_recent)
+
+        # Keep the newest messages that fit alongside the pinned ones, always keeping the latest
+        total = sum(counts[:pinned])
+        kept, kept_counts = [], []
+        for n in range(len(messages) - 1, pinned - 1, -1):
+            message, tokens = messages[n], counts[n]
+            if n < recent_start and is_observation(message):
+                shortened = self._shorten(message)
+                if shortened is not message:
+                    message, tokens = shortened, message_tokens(shortened)
+            if kept and total + tokens > budget:
+                break
+            kept.append(message)
+            kept_counts.append(tokens)
+            total += tokens
+        # Tool results would be rejected without the assistant turn that called them, so they go too
+        if pinned + len(kept) < len(messages):
+            while len(kept) > 1 and kept[-1].get("role") == "tool":
+                kept.pop()
+                total -= kept_counts.pop()
+        fitted = head[:pinned]
+        fitted.extend(reversed(kept))
+
+        if not record:
+            return fitted
+        self.turns += 1
+        self.tokens_sent += total
+        self.tokens_in_history += sum(counts)
+        self.tokens_per_turn.append(total)
+        return fitted
+
+    def stats(self) -> dict:
+        """Token metrics across all requests fitted so far."""
+        return {
+            "turns": self.turns,
+            "tokens_sent": self.tokens_sent,
+            "tokens_saved": self.tokens_in_history - self.tokens_sent,
+            "last_tokens_sent": self.tokens_per_turn[-1] if self.tokens_per_turn else 0,
+        }
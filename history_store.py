@@ -0,0 +1,170 @@
+"""Append-only JSONL persistence for conversation histories.
+
+Each message is one JSON line. ``sync()`` only writes the messages added since
+the last call, so the cost of saving a turn does not grow with the length of
+the conversation. Writes are flushed to the OS on every call and fsynced in
+batches of ``fsync_every`` messages; ``compact()`` rewrites the file atomically
+when the in-memory history has been shortened or edited.
+
+System prompts are stored by content hash rather than inline. The prompt text
+is written once to ``<prompt_dir>/<sha256>.txt`` (by default a ``prompts``
+directory next to the history), and the history line only holds
+``{"role": "system", "content_ref": "sha256:<hex>"}``. Every conversation
+started from the same prompt shares one copy on disk and, once loaded, in
+memory. Prompts shorter than ``PROMPT_REF_MIN_CHARS`` stay inline.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+PROMPT_REF_MIN_CHARS = 256
+PROMPT_DIR = "prompts"
+
+# Prompt texts already read or written in this process, by digest
+_prompts = {}
+
+
+def prompt_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class JSONLHistoryStore:
+    """Incremental message log backed by a JSON Lines file."""
+
+    def __init__(self, path: str, fsync_every: int = 10, prompt_dir: str = None):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.prompt_dir = prompt_dir or os.path.join(os.path.dirname(path), PROMPT_DIR)
+        # Number of messages already persisted to ``path``
+        self.written = 0
+        self._unsynced = 0
+        # Until the file has been loaded or rewritten, its contents are unknown
+        self._needs_rewrite = True
+        # Bytes written to ``path``, and prompt bytes kept out of it by referencing the prompt file
+        self.bytes_written = 0
+        self.prompt_bytes_saved = 0
+
+    def _prompt_path(self, digest: str) -> str:
+        return os.path.join(self.prompt_dir, f"{digest}.txt")
+
+    def _store_prompt(self, text: str) -> str:
+        digest = prompt_digest(text)
+        path = self._prompt_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(self.prompt_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        _prompts.setdefault(digest, text)
+        return digest
+
+    def _load_prompt(self, digest: str) -> str:
+        text = _prompts.get(digest)
+        if text is None:
+            with open(self._prompt_path(digest), "r", encoding="utf-8") as f:
+                text = _prompts.setdefault(digest, f.read())
+        return text
+
+    def _encode(self, message: dict) -> str:
+        content = message.get("content")
+        if message.get("role") == "system" and isinstance(content, str) and len(content) >= PROMPT_REF_MIN_CHARS:
+            ref = {k: v for k, v in message.items() if k != "content"}
+            ref["content_ref"] = f"sha256:{self._store_prompt(content)}"
+            line = json.dumps(ref, ensure_ascii=False) + "\n"
+            self.prompt_bytes_saved += len(json.dumps(message, ensure_ascii=False).encode("utf-8")) + 1 - len(
+                line.encode("utf-8")
+            )
+            return line
+        return json.dumps(message, ensure_ascii=False) + "\n"
+
+    def _decode(self, record: dict) -> dict:
+        ref = record.get("content_ref")
+        if ref is None:
+            return record
+        message = {k: v for k, v in record.items() if k != "content_ref"}
+        message["content"] = self._load_prompt(ref.split(":", 1)[1])
+        return message
+
+    def iter_messages(self):
+        """Stream messages from disk one line at a time.
+
+        A truncated final line (e.g. from a crash mid-write) is skipped.
+        Referenced system prompts are read back from the prompt directory.
+        """
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                yield self._decode(record)
+
+    def load(self) -> list:
+        """Read the whole history and mark it as already persisted."""
+        messages = list(self.iter_messages())
+        self.written = len(messages)
+        self._needs_rewrite = False
+        return messages
+
+    def append(self, messages) -> None:
+        """Append ``messages`` to the log, fsyncing once enough writes have accumulated."""
+        if not messages:
+            return
+        data = "".join(self._encode(m) for m in messages)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            self.bytes_written += len(data.encode("utf-8"))
+            f.flush()
+            self._unsynced += len(messages)
+            if self._unsynced >= self.fsync_every:
+                os.fsync(f.fileno())
+                self._unsynced = 0
+        self.written += len(messages)
+
+    def sync(self, messages: list) -> None:
+        """Persist ``messages``, writing only those not yet on disk.
+
+        If the list is now shorter than what was written (history replaced or
+        trimmed), or the file was never loaded by this store, the file is
+        compacted instead.
+        """
+        if self._needs_rewrite or len(messages) < self.written:
+            self.compact(messages)
+        else:
+            self.append(messages[self.written :])
+
+    def compact(self, messages: list) -> None:
+        """Atomically rewrite the log so it contains exactly ``messages``."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            data = "".join(self._encode(m) for m in messages)
+            f.write(data)
+            f.flush()
+            self.bytes_written += len(data.encode("utf-8"))
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.written = len(messages)
+        self._unsynced = 0
+        self._needs_rewrite = False
+
+    def stats(self) -> dict:
+        """Bytes written by this store and prompt bytes saved by storing the prompt by reference."""
+        return {"bytes_written": self.bytes_written, "prompt_bytes_saved": self.prompt_bytes_saved}
+
+    def flush(self) -> None:
+        """Force any batched writes to stable storage."""
+        if not self._unsynced:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            os.fsync(f.fileno())
+        self._unsynced = 0
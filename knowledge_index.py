@@ -0,0 +1,243 @@
+"""Local full-text index of programme and scholarship pages.
+
+Every live Tavily search is harvested into an SQLite FTS5 index (title,
+snippet and the query that found it, per URL, with when it was fetched). The
+``lookup`` action answers from this index in milliseconds without network
+access; entries older than their TTL are not served, so stale facts fall
+back to a live search, and ``refresh`` re-runs the searches that found them.
+
+The index can be seeded from recorded Tavily responses and refreshed from the
+command line:
+
+    python knowledge_index.py seed fixtures/tavily/*.json
+    python knowledge_index.py refresh
+    python knowledge_index.py lookup "DAAD scholarships Germany"
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from answer_cache import question_tokens
+from observations import is_official_domain, normalise_url, result_domain
+
+DEFAULT_INDEX_PATH = "knowledge_index.db"
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+DEFAULT_LIMIT = 5
+# Share of the query's terms a page must contain to be returned
+DEFAULT_MIN_COVERAGE = 0.6
+CANDIDATES_PER_RESULT = 4
+
+# Search-engine syntax the model uses in queries, which means nothing to the index
+SEARCH_SYNTAX_RE = re.compile(r"\b(?:site|inurl|intitle|filetype):\S+|\b(?:OR|AND|NOT)\b")
+
+
+def fts_query(query: str, any_word: bool = True) -> str:
+    """Turn free text into an FTS5 query matching any (or all) of its content words."""
+    words = question_tokens(SEARCH_SYNTAX_RE.sub(" ", query))
+    return (" OR " if any_word else " ").join(f'"{word}"' for word in dict.fromkeys(words))
+
+
+def isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+
+
+class KnowledgeIndex:
+    """SQLite FTS5 index of harvested search results with per-entry freshness."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_INDEX_PATH,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        min_coverage: float = DEFAULT_MIN_COVERAGE,
+        clock=time.time,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.min_coverage = min_coverage
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY,
+                url_key TEXT NOT NULL UNIQUE,
+                url TEXT NOT NULL,
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                official INTEGER NOT NULL,
+                source_query TEXT,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_expires_at ON pages (expires_at);
+            CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts
+                USING fts5(title, content, source_query, tokenize = 'porter unicode61');
+            """
+        )
+        self._conn.commit()
+
+    def harvest(self, response, query: str = None, ttl: float = None) -> int:
+        """Add (or refresh) every result of a Tavily response; returns how many were stored."""
+        if not isinstance(response, dict):
+            return 0
+        now = self.clock()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        query = query or response.get("query")
+        stored = 0
+        with self._lock:
+            for result in response.get("results") or []:
+                url = result.get("url")
+                content = result.get("content") or ""
+                if not url or not content:
+                    continue
+                title = result.get("title") or ""
+                url_key = normalise_url(url)
+                row = self._conn.execute("SELECT id FROM pages WHERE url_key = ?", (url_key,)).fetchone()
+                if row is not None:
+                    self._conn.execute("DELETE FROM pages WHERE id = ?", row)
+                    self._conn.execute("DELETE FROM pages_fts WHERE rowid = ?", row)
+                official = is_official_domain(result_domain(url))
+                cursor = self._conn.execute(
+                    "INSERT INTO pages "
+                    "(url_key, url, title, content, official, source_query, fetched_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url_key, url, title, content, official, query, now, expires_at),
+                )
+                self._conn.execute(
+                    "INSERT INTO pages_fts (rowid, title, content, source_query) VALUES (?, ?, ?, ?)",
+                    (cursor.lastrowid, title, content, query or ""),
+                )
+                stored += 1
+            self._conn.commit()
+        return stored
+
+    def lookup(self, query: str, limit: int = DEFAULT_LIMIT) -> list:
+        """Fresh pages matching ``query``, best first, each with ``retrieved`` and ``age_days``.
+
+        Pages are ranked by BM25, with official university and government
+        domains first, and must contain at least ``min_coverage`` of the
+        query's content words. Expired pages are never returned.
+        """
+        terms = set(question_tokens(SEARCH_SYNTAX_RE.sub(" ", query)))
+        if not terms:
+            return []
+        now = self.clock()
+        # Pages containing every word are cheap to find and usually enough; matching
+        # any word ranks the whole corpus, so it is only the fallback
+        results = self._search(fts_query(query, any_word=False), terms, now, limit)
+        if len(results) < limit:
+            seen = {r["url"] for r in results}
+            for result in self._search(fts_query(query), terms, now, limit):
+                if result["url"] not in seen:
+                    results.append(result)
+        results.sort(key=lambda r: not r["official"])
+        results = results[:limit]
+        if results:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return results
+
+    def _search(self, match: str, terms: set, now: float, limit: int) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT pages.url, pages.title, pages.content, pages.source_query, pages.official,
+                       pages.fetched_at, bm25(pages_fts, 2.0, 1.0, 0.5) AS rank
+                FROM pages_fts JOIN pages ON pages.id = pages_fts.rowid
+                WHERE pages_fts MATCH ? AND pages.expires_at > ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (match, now, limit * CANDIDATES_PER_RESULT),
+            ).fetchall()
+        results = []
+        for url, title, content, source_query, official, fetched_at, rank in rows:
+            # The query a page was found by counts as evidence of what it is about
+            words = set(question_tokens(f"{title} {content} {source_query or ''}"))
+            if len(terms & words) / len(terms) < self.min_coverage:
+                continue
+            results.append(
+                {
+                    "title": title,
+                    "url": url,
+                    "content": content,
+                    "score": round(-rank, 4),
+                    "official": bool(official),
+                    "retrieved": isoformat(fetched_at),
+                    "age_days": int((now - fetched_at) // 86400),
+                }
+            )
+        return results
+
+    def stale_queries(self) -> list:
+        """Source queries of expired pages, i.e. the searches ``refresh`` should re-run."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT source_query FROM pages WHERE expires_at <= ? AND source_query IS NOT NULL",
+                (self.clock(),),
+            ).fetchall()
+        return [query for (query,) in rows]
+
+    def refresh(self, search) -> int:
+        """Re-run ``search(query)`` for every stale source query; returns the pages refreshed."""
+        refreshed = 0
+        for query in self.stale_queries():
+            refreshed += self.harvest(search(query), query)
+        return refreshed
+
+    def stats(self) -> dict:
+        with self._lock:
+            (pages,) = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+            (stale,) = self._conn.execute(
+                "SELECT COUNT(*) FROM pages WHERE expires_at <= ?", (self.clock(),)
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "pages": pages, "stale": stale}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def main_cli(argv=None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the local programme/scholarship index.")
+    parser.add_argument("--path", default=DEFAULT_INDEX_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    seed = commands.add_parser("seed", help="index recorded Tavily responses (JSON files)")
+    seed.add_argument("files", nargs="+")
+    commands.add_parser("refresh", help="re-run live searches for stale entries")
+    lookup = commands.add_parser("lookup", help="query the index")
+    lookup.add_argument("query")
+    args = parser.parse_args(argv)
+
+    index = KnowledgeIndex(args.path)
+    if args.command == "seed":
+        for path in args.files:
+            with open(path, "r", encoding="utf-8") as f:
+                print(f"{path}: {index.harvest(json.load(f))} pages")
+    elif args.command == "refresh":
+        import main
+
+        main.load_dotenv_and_init_client()
+
+        def search(query):
+            return main.tavily_upstream.call(main.tavily_client.search, query)
+
+        print(f"Refreshed {index.refresh(search)} pages")
+    else:
+        for result in index.lookup(args.query):
+            print(f"{result['title']} — {result['url']} (retrieved {result['retrieved']})")
+    print(json.dumps(index.stats()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,207 @@
+"""Load generator: many concurrent simulated students asking questions through ``query()``.
+
+Each student is a thread. It asks its questions one after another, each in a
+new conversation with its own JSONL history, against one shared ``Runtime``
+whose clients come from ``backends``:
+
+* ``synthetic`` (default): stub model and search, waiting for times drawn from
+  ``--model-latency`` / ``--search-latency``
+* ``replay``: serves ``--recording`` back, waiting as long as each recorded
+  call took. With no recording given, one is made from the transcripts in
+  ``fixtures/transcripts`` and their recorded latencies
+* ``record``: live APIs, appending every exchange to ``--recording``
+* ``live``: live APIs (uses OpenRouter and Tavily quota)
+
+Questions default to the recorded transcripts' questions; pass a batch cohort
+file (``--questions cohort.jsonl``) to use others. The report gives
+throughput, end-to-end latency percentiles per question, and how many calls
+replay had to serve synthetically because they were never recorded.
+
+Run with ``python loadgen.py --students 50 --questions-per-student 4``;
+add ``--time-scale 0.1`` to run ten times faster than real time.
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import main
+from backends import BACKENDS, Latency, Recording, RecordingOpenAI, RecordingTavilyClient, create_backend_clients
+from batch_advise import load_records
+from model_router import percentile
+from runtime import Runtime
+from stubs import ReplayOpenAI, ReplayTavilyClient, load_transcript
+
+TRANSCRIPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "transcripts")
+# Used by the synthetic backend when no latency is given: long-tailed, roughly like the recorded APIs
+DEFAULT_MODEL_LATENCY = "lognormal:1.2,0.5"
+DEFAULT_SEARCH_LATENCY = "lognormal:0.8,0.4"
+
+
+def offline_runtime(openai_client, tavily_client) -> Runtime:
+    """A runtime on the given clients with no caches, so every question reaches the backends."""
+    return Runtime(client=openai_client, tavily_client=tavily_client)
+
+
+def record_transcripts(paths: list, recording: Recording, max_turns: int = 5) -> None:
+    """Replay each transcript through ``query()`` once, recording its exchanges with their recorded latencies."""
+    with tempfile.TemporaryDirectory() as history_dir:
+        for path in paths:
+            transcript = load_transcript(path)
+            openai_client = ReplayOpenAI(transcript["replies"], latency=transcript.get("model_latency", 0.0))
+            tavily_client = ReplayTavilyClient(
+                transcript["search_responses"], latency=transcript.get("search_latency", 0.0)
+            )
+            runtime = offline_runtime(
+                RecordingOpenAI(openai_client, recording), RecordingTavilyClient(tavily_client, recording)
+            )
+            agent = main.Agent(
+                main.prompt, history_file=os.path.join(history_dir, f"{transcript['name']}.jsonl"), runtime=runtime
+            )
+            main.query(transcript["question"], agent, max_turns, verbose=False)
+
+
+def run_load(runtime: Runtime, questions: list, students: int, per_student: int, history_dir: str, max_turns=5):
+    """Drive ``students`` concurrent students through ``per_student`` questions each; returns the outcomes.
+
+    Outcomes: {"latencies": [seconds per question], "answered": n, "no_answer": n, "errors": n, "seconds": wall}
+    """
+    outcomes = {"latencies": [], "answered": 0, "no_answer": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def student(n: int) -> None:
+        for k in range(per_student):
+            question = questions[(n * per_student + k) % len(questions)]
+            agent = main.Agent(
+                main.prompt, history_file=os.path.join(history_dir, f"student-{n}-{k}.jsonl"), runtime=runtime
+            )
+            start = time.perf_counter()
+            try:
+                answer = main.query(question, agent, max_turns, verbose=False)
+                outcome = "answered" if answer is not None else "no_answer"
+            except Exception:
+                outcome = "errors"
+            elapsed = time.perf_counter() - start
+            with lock:
+                outcomes["latencies"].append(elapsed)
+                outcomes[outcome] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=students) as pool:
+        list(pool.map(student, range(students)))
+    outcomes["seconds"] = time.perf_counter() - start
+    return outcomes
+
+
+def summarise(backend: str, students: int, outcomes: dict, openai_client, tavily_client) -> dict:
+    latencies = outcomes["latencies"]
+    summary = {
+        "backend": backend,
+        "students": students,
+        "questions": len(latencies),
+        "answered": outcomes["answered"],
+        "no_answer": outcomes["no_answer"],
+        "errors": outcomes["errors"],
+        "seconds": round(outcomes["seconds"], 3),
+        "throughput_qps": round(len(latencies) / outcomes["seconds"], 3) if outcomes["seconds"] else 0.0,
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p95_s": round(percentile(latencies, 95), 3),
+        "p99_s": round(percentile(latencies, 99), 3),
+    }
+    for name, client in (("model", openai_client), ("search", tavily_client)):
+        if hasattr(client, "misses"):
+            summary[f"{name}_calls"] = client.calls
+            if backend == "replay":
+                summary[f"{name}_unrecorded"] = client.misses
+    return summary
+
+
+def main_cli(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Load-test query() with concurrent simulated students.")
+    parser.add_argument("--students", type=int, default=20, help="concurrent simulated students")
+    parser.add_argument("--questions-per-student", type=int, default=3)
+    parser.add_argument("--questions", help="JSONL cohort file of questions to ask (default: the transcripts')")
+    parser.add_argument("--backend", choices=BACKENDS, default="synthetic")
+    parser.add_argument("--recording", help="JSONL recording written by 'record' and served by 'replay'")
+    parser.add_argument("--model-latency", help=f"e.g. 1.2, uniform:0.5,2 or {DEFAULT_MODEL_LATENCY}")
+    parser.add_argument("--search-latency", help=f"as --model-latency (synthetic default {DEFAULT_SEARCH_LATENCY})")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiply every simulated wait by this")
+    parser.add_argument("--max-turns", type=int, default=5)
+    parser.add_argument("--seed", type=int, help="seed for the latency distributions")
+    parser.add_argument("--json", action="store_true", help="print the summary as one JSON line")
+    args = parser.parse_args(argv)
+
+    transcripts = sorted(glob.glob(os.path.join(TRANSCRIPT_DIR, "*.json")))
+    if args.questions:
+        questions = [record["question"] for record in load_records(args.questions)]
+    else:
+        questions = [load_transcript(path)["question"] for path in transcripts]
+
+    model_latency, search_latency = args.model_latency, args.search_latency
+    if args.backend == "synthetic":
+        model_latency = model_latency or DEFAULT_MODEL_LATENCY
+        search_latency = search_latency or DEFAULT_SEARCH_LATENCY
+    # One seed per distribution, so model and search waits are not drawn in lockstep
+    search_seed = args.seed + 1 if args.seed is not None else None
+    try:
+        model_latency = Latency.parse(model_latency, seed=args.seed) if model_latency else None
+        search_latency = Latency.parse(search_latency, seed=search_seed) if search_latency else None
+    except ValueError as e:
+        parser.error(str(e))
+    recording = None
+    if args.backend == "record":
+        if not args.recording:
+            parser.error("--backend record needs --recording")
+        recording = Recording(args.recording)
+    elif args.backend == "replay":
+        recording = Recording(args.recording)
+        if not args.recording:
+            record_transcripts(transcripts, recording, args.max_turns)
+
+    openai_client, tavily_client = create_backend_clients(
+        args.backend,
+        recording,
+        model_latency=model_latency,
+        search_latency=search_latency,
+        time_scale=args.time_scale,
+    )
+    runtime = offline_runtime(openai_client, tavily_client)
+    try:
+        with tempfile.TemporaryDirectory() as history_dir:
+            outcomes = run_load(
+                runtime, questions, args.students, args.questions_per_student, history_dir, args.max_turns
+            )
+    finally:
+        if recording is not None:
+            recording.close()
+
+    summary = summarise(args.backend, args.students, outcomes, openai_client, tavily_client)
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print(
+            f"{summary['questions']} questions from {args.students} students on the {args.backend} backend "
+            f"in {summary['seconds']:.2f}s: {summary['throughput_qps']:.2f} questions/s"
+        )
+        print(
+            f"latency per question: p50 {summary['p50_s']:.3f}s  p95 {summary['p95_s']:.3f}s  "
+            f"p99 {summary['p99_s']:.3f}s"
+        )
+        print(f"answered {summary['answered']}, no answer {summary['no_answer']}, errors {summary['errors']}")
+        if "model_calls" in summary:
+            print(f"model calls {summary['model_calls']}, searches {summary['search_calls']}")
+        if "model_unrecorded" in summary:
+            print(
+                f"not recorded (served synthetically): {summary['model_unrecorded']} model calls, "
+                f"{summary['search_unrecorded']} searches"
+            )
+    return summary
+
+
+if __name__ == "__main__":
+    main_cli()
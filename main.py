@@ -1,407 +1,1185 @@
-(cd "$(git rev-parse --show-toplevel)" && git apply --3way <<'EOF'
-diff --git a/main.py b/main.py
---- a/main.py
-+++ b/main.py
-@@ -0,0 +1,400 @@
-+import os
-+import re
-+import json
-+from dotenv import load_dotenv
-+from openai import OpenAI
-+from tavily import TavilyClient
-+
-+# Global OpenRouter client
-+client = None
-+# Global Tavily client
-+tavily_client = None
-+
-+
-+def search_tavily(query: str):
-+    """Search using Tavily; requires prior initialisation via load_dotenv_and_init_client."""
-+    if tavily_client is None:
-+        raise Exception(
-+            "Tavily client not initialised. Call load_dotenv_and_init_client() first."
-+        )
-+    response = tavily_client.search(query)
-+    return response
-+
-+
-+class Agent:
-+    """Simple chat agent with optional system prompt and model selection."""
-+
-+    def __init__(self, system: str = "", model: str = "deepseek/deepseek-r1-0528-qwen3-8b:free"):
-+        self.system = system
-+        self.model = model
-+        self.messages = []
-+        if self.system:
-+            self.messages.append({"role": "system", "content": system})
-+
-+    def save_history(self, filename: str = "history.json") -> None:
-+        with open(filename, "w") as f:
-+            json.dump(self.messages, f)
-+
-+    def load_history(self, filename: str = "history.json") -> None:
-+        try:
-+            with open(filename, "r") as f:
-+                self.messages = json.load(f)
-+        except FileNotFoundError:
-+            pass
-+
-+    def __call__(self, message: str) -> str:
-+        self.messages.append({"role": "user", "content": message})
-+        result = self.execute()
-+        self.messages.append({"role": "assistant", "content": result})
-+        return result
-+
-+    def execute(self) -> str:
-+        if client is None:
-+            raise Exception(
-+                "OpenRouter client not initialised. Call load_dotenv_and_init_client() first."
-+            )
-+
-+        # For Gemma-family models, prepend system to first user message
-+        if "gemma" in self.model.lower():
-+            messages = self.messages.copy()
-+            system_msg = None
-+            if messages and messages[0]["role"] == "system":
-+                system_msg = messages.pop(0)
-+            if messages and messages[0]["role"] == "user" and system_msg is not None:
-+                messages[0]["content"] = (
-+                    f"SYSTEM: {system_msg['content']}\n\nUSER: {messages[0]['content']}"
-+                )
-+            completion = client.chat.completions.create(
-+                model=self.model, temperature=0.2, messages=messages
-+            )
-+        else:
-+            completion = client.chat.completions.create(
-+                model=self.model, temperature=0.2, messages=self.messages
-+            )
-+
-+        return completion.choices[0].message.content
-+
-+
-+prompt = """
-+You are an AI Palestine Students University Advisor focused on helping Palestinian students discover suitable degree programs and scholarships worldwide. Use UK English. Your goal is to provide accurate, up-to-date information for the student's intended intake (default to 2026 unless specified), covering admissions, language requirements, tuition/fees, living costs notes, and scholarship opportunities.
-+
-+You operate in a strict ReAct loop with this output contract:
-+- When taking an action, output ONLY:
-+  Thought: <your brief reasoning>
-+  Action: <one of the allowed actions below>
-+  PAUSE
-+- When you have enough information to respond to the user, output ONLY:
-+  Answer: <your final answer to the user>
-+Do not include both action and answer in the same turn. Do not output anything other than the fields shown above.
-+
-+Available actions:
-+- search: Search the web for current program information (e.g., fees, modules), official university pages, typical entry requirements, scholarship information, and deadlines.
-+  Example:
-+  Action: search: "full scholarships for Palestinian students Computer Science 2026 site:*.ac.uk OR site:*.edu"
-+- calculate: Perform calculations for grade/GPA mappings, averages, UCAS points (if relevant), budgets, or other numerical assessments.
-+  Example:
-+  Action: calculate: (48 + 40 + 32)
-+
-+Before searching, if key inputs are missing, ask concise clarifying questions (in an Answer turn). Ask about:
-+- Subject/area of interest; current/previous qualifications (e.g., Tawjihi percentage/GPA, A levels/IB/BTEC), achieved or predicted grades
-+- Year of entry; target countries/regions; budget/fee status; visa needs; language proficiency (IELTS/TOEFL/DUOLINGO)
-+- Interests (e.g., AI, data science), course type (with placement/abroad), and flexibility about foundation years or pathway colleges
-+
-+UCAS tariff (A levels, 2017+ scale):
-+- A* = 56, A = 48, B = 40, C = 32, D = 24, E = 16
-+When relevant, calculate UCAS points explicitly and state the formula. If the student uses other qualifications (IB, BTEC, Scottish Highers, Tawjihi, SATs, etc.), prefer searching for official equivalencies and cite sources.
-+
-+Scholarships and funding guidance:
-+- Prioritise official university scholarships, government/embassy schemes, major external awards (e.g., Chevening, DAAD, Türkiye Scholarships), and Palestinian-eligible opportunities
-+- Clearly indicate eligibility, coverage (tuition/stipend/fees), and key dates; if data varies or is unclear, say so and link to official pages
-+
-+Source quality and citations:
-+- Prefer official sources: university pages (*.ac.uk/*.edu), official policy pages, UCAS (when applicable), and recognised league tables (CUG, Guardian, Times/Sunday Times, QS)
-+- Include 2–4 citations in your Answer when data depends on current info. Format:
-+  - <Title> — <URL> (Accessed: <Month YYYY>)
-+- If a specific figure/date is unknown or varies, say so and direct the user to the official source.
-+
-+Formatting for Answer:
-+- Start with a short summary tailored to the student (qualifications, target regions, constraints)
-+- Provide 3–6 specific program recommendations with entry requirements and any scholarship notes
-+- When helpful, include a compact table (University | Course | Typical Entry | Notes)
-+- Mention application timelines (e.g., EU/UK main cycles, priority scholarship windows, country-specific intakes)
-+- Give actionable next steps (tests to take, documents to prepare, items to verify on official pages)
-+- If you suggest more than 5 courses, make it clear that many central application portals cap application counts (e.g., UCAS at 5)
-+
-+Error handling:
-+- If search returns low/no results, say what was attempted and suggest improved queries or broader criteria
-+- If sources conflict, explain the discrepancy and prefer the most official/authoritative page
-+
-+Example session:
-+
-+Question: I have 95% in Tawjihi (Scientific stream) and IELTS 7.0. I want Computer Science programs in Europe or Turkey with scholarship options. What should I consider for Fall 2026?
-+
-+Thought: Confirm typical thresholds and then search for CS entry requirements and scholarship programmes.
-+Action: search: "site:*.edu OR site:*.ac.uk Computer Science entry requirements 2026 IELTS 6.5 7.0"
-+PAUSE
-+
-+Observation: [Search results about Computer Science entry requirements and related scholarships]
-+
-+Answer: Based on your profile (Tawjihi 95% ≈ competitive for many programmes; IELTS 7.0 meets typical 6.0–6.5 bands), consider:
-+- <University> — BSc Computer Science (Typical entry high school certificate with strong maths; English IELTS 6.5). Explore merit scholarships.
-+- <University> — BSc CS with AI (Higher threshold; check scholarship deadlines). Stretch option.
-+Next steps:
-+- Shortlist 4–6 programmes and verify their 2026 requirements on official pages.
-+- Prepare statements and references; check priority scholarship windows.
-+- Confirm language and document requirements; align with visa timelines.
-+
-+Citations:
-+- <Title> — <URL> (Accessed: <Month YYYY>)
-+- <Title> — <URL> (Accessed: <Month YYYY>)
-+
-+Summary of guidelines for your responses:
-+- Always search for current, up-to-date information.
-+- If you do not know a specific figure (e.g., deposit amount), say you do not know or direct the user to the official page.
-+- Do not make up or guess specific fees, dates, or requirements.
-+- Provide specific programme and scholarship recommendations with entry thresholds when possible.
-+- Calculate UCAS points when relevant; for other systems, prefer official equivalence references.
-+- Mention application deadlines and important dates when found.
-+- Suggest alternative courses or pathways when appropriate (e.g., foundation or pathway colleges).
-+
-+If the user asks about something unrelated to university admissions, respond:
-+Answer: Sorry, I can't answer that. As an AI University Application Advisor, I am designed to assist with higher education applications and related academic guidance.
-+""".strip()
-+
-+
-+def safe_calculate(expression: str):
-+    """Safely evaluate mathematical expressions without using eval().
-+
-+    Supports +, -, *, / and parentheses. Accepts numbers with optional comma
-+    thousands separators, which are removed before parsing.
-+    """
-+    try:
-+        if expression is None:
-+            raise ValueError("Empty expression")
-+        # Normalize whitespace and remove thousands separators
-+        expression = expression.strip()
-+        expression_no_commas = expression.replace(",", "")
-+
-+        # Disallow obviously dangerous characters
-+        dangerous_chars = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_[]{}|\\`~@#$%^")
-+        if any(c in dangerous_chars for c in expression_no_commas):
-+            raise ValueError("Expression contains potentially dangerous characters")
-+
-+        # Allow only safe characters
-+        safe_chars = set("0123456789+-*/(). ")
-+        if not all(c in safe_chars for c in expression_no_commas):
-+            other_chars = set(expression_no_commas) - safe_chars
-+            if any(c in dangerous_chars for c in other_chars):
-+                raise ValueError("Expression contains potentially dangerous characters")
-+
-+        # Delegate to parser
-+        if "(" in expression_no_commas or ")" in expression_no_commas:
-+            return evaluate_expression(expression_no_commas)
-+        return evaluate_simple_expression(expression_no_commas)
-+    except Exception as e:
-+        return f"Error calculating: {str(e)}"
-+
-+
-+def evaluate_simple_expression(expr: str) -> float:
-+    """Evaluate simple arithmetic expressions without parentheses."""
-+    parts = re.split(r"([+\-*/])", expr.replace(" ", ""))
-+    parts = [p for p in parts if p]
-+
-+    if len(parts) == 1:
-+        return float(parts[0])
-+
-+    # Handle multiplication and division first
-+    i = 1
-+    while i < len(parts) - 1:
-+        if parts[i] in ["*", "/"]:
-+            left = float(parts[i - 1])
-+            right = float(parts[i + 1])
-+            if parts[i] == "*":
-+                result = left * right
-+            else:
-+                if right == 0:
-+                    raise ValueError("Division by zero")
-+                result = left / right
-+            parts[i - 1 : i + 2] = [str(result)]
-+            i -= 1
-+        i += 2
-+
-+    # Handle addition and subtraction
-+    result = float(parts[0])
-+    for i in range(1, len(parts), 2):
-+        if i + 1 < len(parts):
-+            if parts[i] == "+":
-+                result += float(parts[i + 1])
-+            elif parts[i] == "-":
-+                result -= float(parts[i + 1])
-+
-+    return result
-+
-+
-+def evaluate_expression(expr: str) -> float:
-+    """Evaluate expressions with parentheses by reducing innermost pairs first."""
-+    while "(" in expr:
-+        start = expr.rfind("(")
-+        end = expr.find(")", start)
-+        if end == -1:
-+            raise ValueError("Mismatched parentheses")
-+        inner_expr = expr[start + 1 : end]
-+        inner_result = evaluate_simple_expression(inner_expr)
-+        expr = expr[:start] + str(inner_result) + expr[end + 1 :]
-+    return evaluate_simple_expression(expr)
-+
-+
-+# Create a dictionary of known actions
-+known_actions = {"calculate": safe_calculate, "search": search_tavily}
-+
-+# Action regex: e.g., "Action: search: something"
-+action_re = re.compile(r"^Action: (\w+): (.*)$")
-+
-+
-+def query(question: str, agent: Agent, max_turns: int = 5) -> None:
-+    print(f"Question: {question}\n")
-+    next_prompt = question
-+    for i in range(max_turns):
-+        result = agent(next_prompt)
-+        agent.save_history()
-+        print(f"--- Turn {i + 1} ---")
-+        print(result)
-+        actions = [action_re.match(a) for a in result.split("\n") if action_re.match(a)]
-+        if actions:
-+            action, action_input = actions[0].groups()
-+            if action not in known_actions:
-+                print(f"Unknown action: {action}: {action_input}")
-+                return
-+            print(f"Action: {action}('{action_input}')")
-+            observation = known_actions[action](action_input)
-+            print(f"Observation: {observation}\n")
-+            next_prompt = f"Observation: {observation}"
-+        else:
-+            if result.startswith("Answer:"):
-+                print(f"\nFinal Answer: {result.split('Answer: ', 1)[1]}")
-+            else:
-+                print("No action taken and no clear answer. Stopping.")
-+            return
-+    print("Max turns reached.")
-+
-+
-+def load_dotenv_and_init_client() -> None:
-+    global client, tavily_client
-+    _ = load_dotenv()
-+    api_key = os.getenv("OPENROUTER_API_KEY")
-+    tavily_api_key = os.getenv("TAVILY_API_KEY")
-+
-+    if not api_key:
-+        raise ValueError(
-+            "OPENROUTER_API_KEY not found in .env file or environment variables."
-+        )
-+    if not tavily_api_key:
-+        raise ValueError(
-+            "TAVILY_API_KEY not found in .env file or environment variables."
-+        )
-+
-+    client = OpenAI(api_key=api_key, base_url="https://openrouter.ai/api/v1")
-+    tavily_client = TavilyClient(tavily_api_key)
-+
-+
-+def is_question(user_input: str) -> bool:
-+    question_words = [
-+        "who",
-+        "what",
-+        "when",
-+        "where",
-+        "why",
-+        "how",
-+        "which",
-+        "can",
-+        "is",
-+        "are",
-+        "do",
-+        "does",
-+        "did",
-+        "will",
-+        "could",
-+        "would",
-+        "should",
-+    ]
-+    input_lower = user_input.lower().strip()
-+    for word in question_words:
-+        if re.search(rf"\\b{word}\\b", input_lower):
-+            return True
-+    non_questions = ["i have no more questions", "that's all", "no more questions"]
-+    for statement in non_questions:
-+        if input_lower.startswith(statement) and input_lower.endswith("?"):
-+            return False
-+    if input_lower.endswith("?"):
-+        return True
-+    return False
-+
-+
-+def get_ucas_points(grade: str, subject_type: str = "A-level") -> int:
-+    """Get UCAS points for a given grade and subject type."""
-+    ucas_points = {
-+        "A-level": {"A*": 56, "A": 48, "B": 40, "C": 32, "D": 24, "E": 16},
-+        "AS-level": {"A": 20, "B": 16, "C": 12, "D": 10, "E": 6},
-+        "BTEC": {"D*": 56, "D": 48, "M": 32, "P": 16},
-+    }
-+    try:
-+        return ucas_points.get(subject_type, {}).get(grade.upper(), 0)
-+    except Exception:
-+        return 0
-+
-+
-+def calculate_ucas_total(grades_input: str) -> str:
-+    """Calculate total UCAS points from a comma-separated list of '<Subject> <Grade>' entries."""
-+    try:
-+        grades = [g.strip() for g in grades_input.split(",")]
-+        total = 0
-+        breakdown = []
-+        for grade_entry in grades:
-+            if " " in grade_entry:
-+                subject, grade = grade_entry.rsplit(" ", 1)
-+                points = get_ucas_points(grade)
-+                total += points
-+                breakdown.append(f"{subject}: {grade} = {points} points")
-+        result = f"Total UCAS points: {total}\nBreakdown:\n" + "\n".join(breakdown)
-+        return result
-+    except Exception as e:
-+        return f"Error calculating UCAS points: {str(e)}"
-+
-+
-+if __name__ == "__main__":
-+    try:
-+        load_dotenv_and_init_client()
-+    except Exception as e:
-+        print(f"Warning: client initialisation failed — {e}")
-+    agent_instance = Agent(prompt)
-+    try:
-+        agent_instance.load_history()
-+    except Exception:
-+        pass
-+
-+    print("Welcome! I'm your AI Palestine Student University Advisor.")
-+    print(
-+        "Ask me anything related to universities, admissions, or scholarships. (Write 'exit' to exit. If you don't type a question, I'll end the conversation.)"
-+    )
-+
-+    while True:
-+        try:
-+            user_input = input("\nAsk a question:\n> ").strip()
-+        except (EOFError, KeyboardInterrupt):
-+            print("\nGoodbye!")
-+            break
-+        if user_input.lower() == "exit":
-+            print("Goodbye!")
-+            break
-+        if not user_input:
-+            print("It looks like you have no questions for now. Goodbye.")
-+            break
-+        if is_question(user_input):
-+            try:
-+                query(user_input, agent_instance)
-+            except Exception as e:
-+                print(f"Error during query: {e}")
-+        else:
-+            print("It looks like you have no questions for now. Goodbye.")
-+            break
-+
-EOF
-)
+import os
+import json
+import threading
+from contextlib import nullcontext
+from functools import partial
+import calculator
+import tool_calls
+import tracing
+import transport
+import turn_control
+from answer_cache import AnswerCache
+from calculator import safe_calculate
+from context_window import ContextWindow, estimate_tokens
+from history_store import JSONLHistoryStore
+from message_store import MessageStore
+from model_router import ModelRouter, adapt_messages
+from observations import format_search_results
+from question_classifier import is_question
+from runtime import DEFAULT_MODEL, Runtime
+from ucas import UCAS_POINTS
+
+# Global OpenRouter client
+client = None
+# Global async OpenRouter client (used by aquery)
+async_client = None
+# Global Tavily client
+tavily_client = None
+# Global async Tavily client (used by aquery)
+async_tavily_client = None
+# Global search result cache (None disables caching)
+search_cache = None
+# Global local programme/scholarship index fed by live searches (None disables lookup)
+knowledge_index = None
+# Global final-answer cache used by cached_query (None disables it)
+answer_cache = None
+# Retry/backoff, rate limiting and circuit breaking for each upstream API
+openrouter_upstream = transport.Upstream("openrouter")
+tavily_upstream = transport.Upstream("tavily")
+
+
+def global_runtime() -> Runtime:
+    """The runtime behind the module-level API: a snapshot of the globals above and the action registries.
+
+    Built on each call, so code that swaps a global (as tests do) is seen by
+    the next query. Agents created with ``runtime=`` do not use it.
+    """
+    return Runtime(
+        client=client,
+        async_client=async_client,
+        tavily_client=tavily_client,
+        async_tavily_client=async_tavily_client,
+        openrouter_upstream=openrouter_upstream,
+        tavily_upstream=tavily_upstream,
+        search_cache=search_cache,
+        knowledge_index=knowledge_index,
+        answer_cache=answer_cache,
+        actions=known_actions,
+        async_actions=async_known_actions,
+    )
+
+
+def search_tavily(query: str):
+    """Search using Tavily; requires prior initialisation via load_dotenv_and_init_client."""
+    return global_runtime().search_tavily(query)
+
+
+def cached_search(query: str, bypass_cache: bool = False):
+    """Search via the result cache, falling back to search_tavily on a miss or when bypassed."""
+    return global_runtime().cached_search(query, bypass_cache)
+
+
+async def asearch_tavily(query: str):
+    """Async counterpart of search_tavily; falls back to the sync client in a worker thread."""
+    return await global_runtime().asearch_tavily(query)
+
+
+async def acached_search(query: str, bypass_cache: bool = False):
+    """Async counterpart of cached_search; the network call is awaited outside the cache lock."""
+    return await global_runtime().acached_search(query, bypass_cache)
+
+
+def local_lookup(query: str):
+    """Fresh matches for ``query`` from the local index, as a search-shaped response, or None."""
+    return global_runtime().local_lookup(query)
+
+
+def lookup_knowledge(query: str):
+    """Answer from the local index, falling back to a live (cached) search if it has nothing fresh."""
+    return global_runtime().lookup_knowledge(query)
+
+
+async def alookup_knowledge(query: str):
+    return await global_runtime().alookup_knowledge(query)
+
+
+def agent_runtime(agent) -> Runtime:
+    """The runtime ``agent`` runs against: its own, or the global one."""
+    runtime = getattr(agent, "runtime", None)
+    return runtime if runtime is not None else global_runtime()
+
+
+def _session_lock(agent):
+    # Test doubles and other duck-typed agents have no lock
+    lock = getattr(agent, "lock", None)
+    return lock if lock is not None else nullcontext()
+
+
+def _record_usage(span, model: str, completion) -> None:
+    """Attach the model and, when the response reports it, token usage to a model.call span."""
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        span.set(model=model)
+        return
+    span.set(
+        model=model,
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        # Prompt tokens the provider served from its prefix cache
+        cached_tokens=getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0,
+    )
+
+
+def _counted_once(prepare):
+    """``prepare`` for one routed request: fits for the fallback and hedge models after the first are not counted."""
+    models = []
+
+    def prepare_once(model: str) -> list:
+        models.append(model)
+        return prepare(model, record=len(models) == 1)
+
+    return prepare_once
+
+
+class Agent:
+    """Simple chat agent with optional system prompt and model selection.
+
+    One Agent is one conversation. Its ``lock`` is held by query() for a whole
+    question and by the sync methods that change ``messages``, so an agent
+    shared between threads runs one question at a time. Async callers
+    serialise their own turns (the server keeps an ``asyncio.Lock`` per session).
+    """
+
+    def __init__(
+        self,
+        system: str = "",
+        model: str = None,
+        history_file: str = "history.jsonl",
+        client=None,
+        async_client=None,
+        context_window: ContextWindow = None,
+        router: ModelRouter = None,
+        tools: list = None,
+        runtime: Runtime = None,
+        compress_after: int = None,
+    ):
+        self.system = system
+        # Clients, upstream policies and actions; the module globals (global_runtime()) when None
+        self.runtime = runtime
+        self.model = model or (runtime.model if runtime is not None else DEFAULT_MODEL)
+        # Optional router choosing among candidate models per request; ``model`` is used without one
+        self.router = router
+        self.last_model = None
+        # OpenAI-style tool schemas; when set (and supported by the model), query() uses tool calls
+        if tools is None and runtime is not None and runtime.tools:
+            tools = list(runtime.tools)
+        self.tools = tools
+        self.lock = threading.RLock()
+        self.history_file = history_file
+        # Trims what is sent to the model; self.messages always keeps the full history
+        self.context_window = context_window if context_window is not None else ContextWindow()
+        # Per-agent clients override the module-level ones (e.g. a server's shared pool)
+        self.client = client
+        self.async_client = async_client
+        # Keep only this many recent messages uncompressed in memory (see message_store); None: no compression
+        self.compress_after = compress_after
+        self.messages = []
+        self._history_stores = {}
+        if self.system:
+            self.messages.append({"role": "system", "content": system})
+
+    @property
+    def messages(self) -> MessageStore:
+        """The full conversation, as a list-like ``MessageStore`` of message dicts."""
+        return self._messages
+
+    @messages.setter
+    def messages(self, messages) -> None:
+        self._messages = MessageStore(messages, compress_after=self.compress_after)
+
+    def _history_store(self, filename: str) -> JSONLHistoryStore:
+        store = self._history_stores.get(filename)
+        if store is None:
+            store = self._history_stores[filename] = JSONLHistoryStore(filename)
+        return store
+
+    def save_history(self, filename: str = None) -> None:
+        """Persist the conversation; only new messages are written to ``.jsonl`` files.
+
+        Files ending in ``.json`` use the legacy format and are rewritten in full.
+        """
+        filename = filename or self.history_file
+        with self.lock, tracing.span("history.save", messages=len(self.messages)):
+            if filename.endswith(".json"):
+                with open(filename, "w") as f:
+                    json.dump(list(self.messages), f)
+                return
+            self._history_store(filename).sync(self.messages)
+
+    def load_history(self, filename: str = None) -> None:
+        filename = filename or self.history_file
+        with self.lock:
+            if filename.endswith(".json"):
+                try:
+                    with open(filename, "r") as f:
+                        self.messages = json.load(f)
+                except FileNotFoundError:
+                    pass
+                return
+            if os.path.exists(filename):
+                self.messages = self._history_store(filename).load()
+
+    def __call__(self, message: str) -> str:
+        with self.lock:
+            self.messages.append({"role": "user", "content": message})
+            result = self.execute()
+            self.messages.append({"role": "assistant", "content": result})
+            return result
+
+    async def acall(self, message: str) -> str:
+        self.messages.append({"role": "user", "content": message})
+        result = await self.aexecute()
+        self.messages.append({"role": "assistant", "content": result})
+        return result
+
+    def _request_messages(self, model: str = None, record: bool = True) -> list:
+        """Return the message list to send: fitted to the token budget and adapted to the model."""
+        model = model or self.model
+        return adapt_messages(model, self.context_window.fit(self.messages, model, record))
+
+    def stream(self, message: str, on_text=None) -> str:
+        """Like __call__, but streams the reply (see execute_stream)."""
+        with self.lock:
+            self.messages.append({"role": "user", "content": message})
+            result = self.execute_stream(on_text)
+            self.messages.append({"role": "assistant", "content": result})
+            return result
+
+    async def astream(self, message: str, on_text=None) -> str:
+        self.messages.append({"role": "user", "content": message})
+        result = await self.aexecute_stream(on_text)
+        self.messages.append({"role": "assistant", "content": result})
+        return result
+
+    def _openrouter(self):
+        if self.client is not None:
+            return self.client
+        return agent_runtime(self).openrouter()
+
+    def _async_openrouter(self):
+        if self.async_client is not None:
+            return self.async_client
+        return agent_runtime(self).async_openrouter()
+
+    def _upstream(self) -> transport.Upstream:
+        return self.runtime.openrouter_upstream if self.runtime is not None else openrouter_upstream
+
+    def _complete(self, prepare=None, **kwargs):
+        """Create a chat completion on ``self.model``, or on the router's pick when one is set.
+
+        ``prepare(model, record=True)`` builds the messages to send (``_request_messages`` by
+        default); with a router, only the first model's fit is recorded in the context window metrics.
+        """
+        prepare = prepare or self._request_messages
+        with tracing.span("model.call", stream=bool(kwargs.get("stream"))) as span:
+            create = partial(self._upstream().call, self._openrouter().chat.completions.create)
+            if self.router is None:
+                self.last_model = self.model
+                completion = create(model=self.model, messages=prepare(self.model), **kwargs)
+            else:
+                # A losing hedged stream could not be closed, so streams only use the fallback chain
+                self.last_model, completion = self.router.complete(
+                    create, _counted_once(prepare), hedge=not kwargs.get("stream"), **kwargs
+                )
+            _record_usage(span, self.last_model, completion)
+        return completion
+
+    async def _acomplete(self, prepare=None, **kwargs):
+        prepare = prepare or self._request_messages
+        with tracing.span("model.call", stream=bool(kwargs.get("stream"))) as span:
+            create = partial(self._upstream().acall, self._async_openrouter().chat.completions.create)
+            if self.router is None:
+                self.last_model = self.model
+                completion = await create(model=self.model, messages=prepare(self.model), **kwargs)
+            else:
+                self.last_model, completion = await self.router.acomplete(
+                    create, _counted_once(prepare), hedge=not kwargs.get("stream"), **kwargs
+                )
+            _record_usage(span, self.last_model, completion)
+        return completion
+
+    def _models(self) -> list:
+        return self.router.models if self.router is not None else [self.model]
+
+    def uses_tools(self) -> bool:
+        """True if this agent offers tool calls: tools are set and every model it may use supports them."""
+        return bool(self.tools) and all(tool_calls.supports_tools(model) for model in self._models())
+
+    def reject_tools(self) -> None:
+        """Switch this agent's models to the text protocol after they refused tool calls."""
+        for model in self._models():
+            tool_calls.mark_text_only(model)
+
+    def _tool_request_messages(self, model: str = None, record: bool = True) -> list:
+        model = model or self.model
+        messages = self.context_window.fit(self.messages, model, record)
+        if messages and messages[0]["role"] == "system":
+            system = {**messages[0], "content": f"{messages[0]['content']}\n\n{tool_calls.TOOL_PROTOCOL_NOTE}"}
+            messages = [system] + messages[1:]
+        # Adapted last, so the note is part of any folded or cache-marked system prompt
+        return adapt_messages(model, messages)
+
+    def tool_turn(self, messages: list):
+        """Send ``messages`` (the question, or tool results) offering ``self.tools``; returns the reply message.
+
+        The reply is recorded with its tool calls. If the request fails,
+        ``messages`` are taken back out of the history, so the turn can be
+        retried (for example with the text protocol).
+        """
+        with self.lock:
+            self.messages.extend(messages)
+            try:
+                completion = self._complete(prepare=self._tool_request_messages, temperature=0.2, tools=self.tools)
+            except Exception:
+                del self.messages[-len(messages) :]
+                raise
+            message = completion.choices[0].message
+            self.messages.append(tool_calls.assistant_message(message))
+            return message
+
+    async def atool_turn(self, messages: list):
+        """Async counterpart of tool_turn."""
+        self.messages.extend(messages)
+        try:
+            completion = await self._acomplete(
+                prepare=self._tool_request_messages, temperature=0.2, tools=self.tools
+            )
+        except Exception:
+            del self.messages[-len(messages) :]
+            raise
+        message = completion.choices[0].message
+        self.messages.append(tool_calls.assistant_message(message))
+        return message
+
+    def execute(self) -> str:
+        completion = self._complete(temperature=0.2)
+        return completion.choices[0].message.content
+
+    async def aexecute(self) -> str:
+        completion = await self._acomplete(temperature=0.2)
+        return completion.choices[0].message.content
+
+    def execute_stream(self, on_text=None) -> str:
+        """Stream the completion, stopping as soon as a complete Action line arrives.
+
+        ``on_text`` is called with the reply text as it streams in, but only
+        for Answer turns. The rest of the generation is abandoned once an
+        action is found, so the action can be dispatched straight away.
+        """
+        scanner = ActionStreamScanner(on_text)
+        # Only opening the stream is retried; a stream that fails midway surfaces its error
+        stream = self._complete(temperature=0.2, stream=True)
+        try:
+            for chunk in stream:
+                if scanner.feed(_chunk_text(chunk)):
+                    break
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        return scanner.result()
+
+    async def aexecute_stream(self, on_text=None) -> str:
+        """Async counterpart of execute_stream."""
+        scanner = ActionStreamScanner(on_text)
+        stream = await self._acomplete(temperature=0.2, stream=True)
+        try:
+            async for chunk in stream:
+                if scanner.feed(_chunk_text(chunk)):
+                    break
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await close()
+        return scanner.result()
+
+
+prompt = """
+You are an AI Palestine Students University Advisor focused on helping Palestinian students discover suitable degree programs and scholarships worldwide. Use UK English. Your goal is to provide accurate, up-to-date information for the student's intended intake (default to 2026 unless specified), covering admissions, language requirements, tuition/fees, living costs notes, and scholarship opportunities.
+
+You operate in a strict ReAct loop with this output contract:
+- When taking an action, output ONLY:
+  Thought: <your brief reasoning>
+  Action: <one of the allowed actions below>
+  PAUSE
+- When you have enough information to respond to the user, output ONLY:
+  Answer: <your final answer to the user>
+Do not include both action and answer in the same turn. Do not output anything other than the fields shown above.
+
+Available actions:
+- lookup: Look up programmes, entry requirements, fees and scholarships in the local index of previously retrieved official pages (instant; falls back to a live web search when nothing fresh is stored). Prefer this before search; each result shows when it was retrieved.
+  Example:
+  Action: lookup: DAAD scholarships Germany Computer Science
+- search: Search the web for current program information (e.g., fees, modules), official university pages, typical entry requirements, scholarship information, and deadlines.
+  Example:
+  Action: search: "full scholarships for Palestinian students Computer Science 2026 site:*.ac.uk OR site:*.edu"
+- calculate: Perform calculations for grade/GPA mappings, averages, UCAS points (if relevant), budgets, or other numerical assessments.
+  Example:
+  Action: calculate: (48 + 40 + 32)
+
+Before searching, if key inputs are missing, ask concise clarifying questions (in an Answer turn). Ask about:
+- Subject/area of interest; current/previous qualifications (e.g., Tawjihi percentage/GPA, A levels/IB/BTEC), achieved or predicted grades
+- Year of entry; target countries/regions; budget/fee status; visa needs; language proficiency (IELTS/TOEFL/DUOLINGO)
+- Interests (e.g., AI, data science), course type (with placement/abroad), and flexibility about foundation years or pathway colleges
+
+UCAS tariff (A levels, 2017+ scale):
+- A* = 56, A = 48, B = 40, C = 32, D = 24, E = 16
+When relevant, calculate UCAS points explicitly and state the formula. If the student uses other qualifications (IB, BTEC, Scottish Highers, Tawjihi, SATs, etc.), prefer searching for official equivalencies and cite sources.
+
+Scholarships and funding guidance:
+- Prioritise official university scholarships, government/embassy schemes, major external awards (e.g., Chevening, DAAD, Türkiye Scholarships), and Palestinian-eligible opportunities
+- Clearly indicate eligibility, coverage (tuition/stipend/fees), and key dates; if data varies or is unclear, say so and link to official pages
+
+Source quality and citations:
+- Prefer official sources: university pages (*.ac.uk/*.edu), official policy pages, UCAS (when applicable), and recognised league tables (CUG, Guardian, Times/Sunday Times, QS)
+- Include 2–4 citations in your Answer when data depends on current info. Format:
+  - <Title> — <URL> (Accessed: <Month YYYY>)
+- If a specific figure/date is unknown or varies, say so and direct the user to the official source.
+
+Formatting for Answer:
+- Start with a short summary tailored to the student (qualifications, target regions, constraints)
+- Provide 3–6 specific program recommendations with entry requirements and any scholarship notes
+- When helpful, include a compact table (University | Course | Typical Entry | Notes)
+- Mention application timelines (e.g., EU/UK main cycles, priority scholarship windows, country-specific intakes)
+- Give actionable next steps (tests to take, documents to prepare, items to verify on official pages)
+- If you suggest more than 5 courses, make it clear that many central application portals cap application counts (e.g., UCAS at 5)
+
+Error handling:
+- If search returns low/no results, say what was attempted and suggest improved queries or broader criteria
+- If sources conflict, explain the discrepancy and prefer the most official/authoritative page
+
+Example session:
+
+Question: I have 95% in Tawjihi (Scientific stream) and IELTS 7.0. I want Computer Science programs in Europe or Turkey with scholarship options. What should I consider for Fall 2026?
+
+Thought: Confirm typical thresholds and then search for CS entry requirements and scholarship programmes.
+Action: search: "site:*.edu OR site:*.ac.uk Computer Science entry requirements 2026 IELTS 6.5 7.0"
+PAUSE
+
+Observation: [Search results about Computer Science entry requirements and related scholarships]
+
+Answer: Based on your profile (Tawjihi 95% ≈ competitive for many programmes; IELTS 7.0 meets typical 6.0–6.5 bands), consider:
+- <University> — BSc Computer Science (Typical entry high school certificate with strong maths; English IELTS 6.5). Explore merit scholarships.
+- <University> — BSc CS with AI (Higher threshold; check scholarship deadlines). Stretch option.
+Next steps:
+- Shortlist 4–6 programmes and verify their 2026 requirements on official pages.
+- Prepare statements and references; check priority scholarship windows.
+- Confirm language and document requirements; align with visa timelines.
+
+Citations:
+- <Title> — <URL> (Accessed: <Month YYYY>)
+- <Title> — <URL> (Accessed: <Month YYYY>)
+
+Summary of guidelines for your responses:
+- Always search for current, up-to-date information.
+- If you do not know a specific figure (e.g., deposit amount), say you do not know or direct the user to the official page.
+- Do not make up or guess specific fees, dates, or requirements.
+- Provide specific programme and scholarship recommendations with entry thresholds when possible.
+- Calculate UCAS points when relevant; for other systems, prefer official equivalence references.
+- Mention application deadlines and important dates when found.
+- Suggest alternative courses or pathways when appropriate (e.g., foundation or pathway colleges).
+
+If the user asks about something unrelated to university admissions, respond:
+Answer: Sorry, I can't answer that. As an AI University Application Advisor, I am designed to assist with higher education applications and related academic guidance.
+""".strip()
+
+
+def evaluate_simple_expression(expr: str) -> float:
+    """Evaluate simple arithmetic expressions without parentheses."""
+    return calculator.evaluate(expr)
+
+
+def evaluate_expression(expr: str) -> float:
+    """Evaluate expressions with parentheses."""
+    return calculator.evaluate(expr)
+
+
+# Create a dictionary of known actions
+known_actions = {"calculate": safe_calculate, "search": cached_search, "lookup": lookup_knowledge}
+
+# Async overrides used by aquery; actions not listed here fall back to known_actions
+async_known_actions = {"search": acached_search, "lookup": alookup_knowledge}
+
+# Per-action observation formatters; actions not listed here are passed through unchanged
+observation_formatters = {"search": format_search_results, "lookup": format_search_results}
+
+# Tool definitions offered with the tools protocol: action -> (description, argument, argument description)
+action_tools = {
+    "lookup": (
+        "Look up programmes, entry requirements, fees and scholarships in the local index of previously "
+        "retrieved official pages. Instant; falls back to a live web search when nothing fresh is stored. "
+        "Prefer this before search.",
+        "query",
+        "What to look up, e.g. DAAD scholarships Germany Computer Science",
+    ),
+    "search": (
+        "Search the web for current programme information, official university pages, entry requirements, "
+        "scholarships and deadlines.",
+        "query",
+        "Web search query; site: and OR operators are allowed",
+    ),
+    "calculate": (
+        "Evaluate an arithmetic expression (+, -, *, /, parentheses), e.g. for UCAS points, averages or budgets.",
+        "expression",
+        "The expression, e.g. (48 + 40 + 32)",
+    ),
+}
+tools = tool_calls.build_tools(action_tools)
+
+# Action regex: e.g., "Action: search: something"
+action_re = turn_control.ACTION_RE
+
+
+def _chunk_text(chunk) -> str:
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
+
+class ActionStreamScanner:
+    """Incrementally scans streamed model output for a complete Action line or an Answer."""
+
+    def __init__(self, on_text=None):
+        self.on_text = on_text
+        self.text = ""
+        # None until enough text has arrived to tell whether this is an Answer turn
+        self.is_answer = None
+        self.action_found = False
+        self._line_start = 0
+
+    def feed(self, delta: str) -> bool:
+        """Consume one streamed delta; returns True once generation can stop."""
+        if not delta:
+            return False
+        self.text += delta
+        if self.is_answer is None:
+            head = self.text.lstrip()
+            if head.startswith("Answer:"):
+                self.is_answer = True
+                delta = self.text
+            elif not "Answer:".startswith(head):
+                self.is_answer = False
+        if self.is_answer:
+            if self.on_text is not None:
+                self.on_text(delta)
+            return False
+        while True:
+            end = self.text.find("\n", self._line_start)
+            if end == -1:
+                return False
+            line = self.text[self._line_start : end]
+            self._line_start = end + 1
+            if action_re.match(line):
+                self.text = self.text[:end]
+                self.action_found = True
+                return True
+
+    def result(self) -> str:
+        """The reply text; an early-stopped action turn is closed with PAUSE as per the prompt contract."""
+        if self.action_found:
+            return f"{self.text}\nPAUSE"
+        return self.text
+
+
+def shape_observation(action: str, observation):
+    """Compact a raw action result with the formatter registered for ``action``, if any."""
+    formatter = observation_formatters.get(action)
+    if formatter is None:
+        return observation
+    return formatter(observation)
+
+
+def _silent(*args, **kwargs) -> None:
+    pass
+
+
+def observation_prompt(actions: list, observations: list) -> str:
+    """The user message carrying the observations for one turn's ``(action, input)`` pairs."""
+    if len(observations) == 1:
+        return f"Observation: {observations[0]}"
+    return "\n\n".join(
+        f"Observation {n} ({action}: {action_input}): {observation}"
+        for n, ((action, action_input), observation) in enumerate(zip(actions, observations), 1)
+    )
+
+
+def _unknown_action(action: str, actions) -> str:
+    return f"Error: unknown action {action}; available actions: {', '.join(actions)}"
+
+
+def run_action(action: str, action_input: str, actions: dict = None):
+    """Run one action for the tools protocol; unknown actions and errors become observation text."""
+    actions = known_actions if actions is None else actions
+    action_fn = actions.get(action)
+    if action_fn is None:
+        return _unknown_action(action, actions)
+    with tracing.span("action", action=action) as span:
+        try:
+            return shape_observation(action, action_fn(action_input))
+        except Exception as e:
+            span.set(error=str(e))
+            return f"Error running {action}: {e}"
+
+
+def run_actions(calls: list, actions: dict = None, workers: int = 4) -> list:
+    """Run ``(action, input)`` pairs concurrently on up to ``workers`` threads; observations in call order."""
+    if len(calls) == 1:
+        return [run_action(*calls[0], actions)]
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(calls))) as pool:
+        # Each call runs in a copy of this context so its action span nests under the query span
+        futures = [
+            pool.submit(contextvars.copy_context().run, run_action, action, action_input, actions)
+            for action, action_input in calls
+        ]
+        return [future.result() for future in futures]
+
+
+def _read_tool_reply(message) -> tuple:
+    """``(calls, pairs)`` for a tools-protocol reply: its ``ToolCall``s and their ``(action, input)`` pairs.
+
+    Models sometimes write text Action lines even when offered tools. Those
+    are dispatched too, with ``calls`` set to None, and their observations go
+    back as a user message instead of tool results.
+    """
+    with tracing.span("parse"):
+        calls = tool_calls.parse_tool_calls(message)
+        if calls:
+            return calls, [(call.name, call.input) for call in calls]
+        content = message.content or ""
+        return None, [m.groups() for m in map(action_re.match, content.split("\n")) if m]
+
+
+def _tool_answer(message):
+    """The final answer in a reply with no actions (the "Answer:" prefix is optional), or None if empty."""
+    content = (message.content or "").strip()
+    if content.startswith("Answer:"):
+        content = content[len("Answer:") :].strip()
+    return content or None
+
+
+def _tool_results(calls, pairs: list, observations: list) -> list:
+    """The messages answering one turn's calls: tool results, or an Observation for text Action lines."""
+    if calls is None:
+        return [{"role": "user", "content": observation_prompt(pairs, observations)}]
+    return [tool_calls.tool_message(call, observation) for call, observation in zip(calls, observations)]
+
+
+def tool_query(
+    question: str,
+    agent: Agent,
+    max_turns: int = 5,
+    verbose: bool = True,
+    actions: dict = None,
+    workers: int = 4,
+):
+    """ReAct loop over native tool calls; used by query() when the agent offers tools.
+
+    Every tool call in a turn is dispatched in parallel on up to ``workers``
+    threads, and unknown tools or failing actions are reported back to the
+    model instead of ending the session. If the model rejects tools on the
+    first turn, it is switched to the text protocol and the question is asked
+    again through query().
+    """
+    log = print if verbose else _silent
+    if actions is None:
+        actions = agent_runtime(agent).actions
+    with _session_lock(agent), tracing.span("query", stream=False, protocol="tools") as span:
+        log(f"Question: {question}\n")
+        pending = [{"role": "user", "content": question}]
+        for i in range(max_turns):
+            try:
+                message = agent.tool_turn(pending)
+            except Exception as e:
+                if i > 0 or not tool_calls.is_tools_unsupported(e):
+                    raise
+                span.set(protocol="text")
+                break
+            agent.save_history()
+            log(f"--- Turn {i + 1} ---")
+            if message.content:
+                log(message.content)
+            calls, pairs = _read_tool_reply(message)
+            if not pairs:
+                answer = _tool_answer(message)
+                if answer is None:
+                    log("No action taken and no clear answer. Stopping.")
+                    return None
+                log(f"\nFinal Answer: {answer}")
+                span.set(turns=i + 1, answered=True)
+                return answer
+            for action, action_input in pairs:
+                log(f"Action: {action}('{action_input}')")
+            observations = run_actions(pairs, actions, workers)
+            pending = _tool_results(calls, pairs, observations)
+            log("\n".join(f"Observation: {observation}" for observation in observations) + "\n")
+        else:
+            _record_tool_results(agent, pending)
+            log("Max turns reached.")
+            span.set(turns=max_turns)
+            return None
+    agent.reject_tools()
+    return query(question, agent, max_turns, verbose=verbose, actions=actions)
+
+
+def _record_tool_results(agent: Agent, pending: list) -> None:
+    """Add the tool results the loop ran out of turns to send, so no tool call in the history goes unanswered.
+
+    Providers reject a conversation whose assistant ``tool_calls`` lack their
+    ``tool`` replies, so without them every later question in the session fails.
+    """
+    if pending and pending[0]["role"] == "tool":
+        with _session_lock(agent):
+            agent.messages.extend(pending)
+        agent.save_history()
+
+
+def _print_live(text: str) -> None:
+    print(text, end="", flush=True)
+
+
+def _tokens_sent(agent) -> int:
+    window = getattr(agent, "context_window", None)
+    return window.tokens_sent if window is not None else 0
+
+
+def _observe(action: str, action_input: str, actions: dict, memo: turn_control.ObservationMemo):
+    """The observation for one action: an error for unknown actions, the memo for repeats, else a fresh run."""
+    if action not in actions:
+        return _unknown_action(action, actions)
+    observation = memo.get(action, action_input)
+    if observation is not None:
+        return observation
+    with tracing.span("action", action=action):
+        observation = shape_observation(action, actions[action](action_input))
+    memo.set(action, action_input, observation)
+    return observation
+
+
+def _stop_without_answer(log, forced: bool) -> None:
+    if forced:
+        log("Budget spent and still no answer. Stopping.")
+    else:
+        log("No action taken and no clear answer. Stopping.")
+
+
+def query(
+    question: str,
+    agent: Agent,
+    max_turns: int = 5,
+    stream: bool = False,
+    verbose: bool = True,
+    actions: dict = None,
+    max_seconds: float = None,
+    max_tokens: int = None,
+):
+    """Run the ReAct loop for one question; returns the final answer text, or None.
+
+    With ``stream=True`` answers are printed as they are generated and each
+    action is dispatched as soon as its line arrives (see Agent.execute_stream).
+    ``actions`` overrides the agent's action registry (its runtime's, or
+    known_actions) for this call, and ``verbose=False`` suppresses the console
+    output. The agent's lock is held for the whole question.
+
+    The question may use ``max_turns`` model calls, ``max_seconds`` of wall
+    time and ``max_tokens`` (prompt plus reply, estimated). When what is left
+    fits one more turn, the model is told to answer on it. Near-miss Action
+    and Answer lines are repaired, unknown actions are reported back to the
+    model, and an action repeated with the same input is answered from its
+    earlier observation (see turn_control).
+    """
+    if not stream and getattr(agent, "tools", None) and agent.uses_tools():
+        return tool_query(question, agent, max_turns, verbose=verbose, actions=actions)
+    log = print if verbose else _silent
+    if actions is None:
+        actions = agent_runtime(agent).actions
+    budget = turn_control.TurnBudget(max_turns, max_seconds, max_tokens)
+    memo = turn_control.ObservationMemo()
+    with _session_lock(agent), tracing.span("query", stream=stream) as span:
+        log(f"Question: {question}\n")
+        next_prompt = question
+        while not budget.exhausted():
+            forced = budget.nearly_spent()
+            if forced:
+                next_prompt = f"{next_prompt}\n\n{turn_control.FORCE_ANSWER_NOTE}"
+            sent = _tokens_sent(agent)
+            if stream:
+                log(f"--- Turn {budget.turns + 1} ---")
+                result = agent.stream(next_prompt, on_text=_print_live if verbose else None)
+                agent.save_history()
+                # Answer text has already been shown live; other turns are shown once complete
+                log(result if not result.startswith("Answer:") else "")
+            else:
+                result = agent(next_prompt)
+                agent.save_history()
+                log(f"--- Turn {budget.turns + 1} ---")
+                log(result)
+            budget.charge(_tokens_sent(agent) - sent + estimate_tokens(result))
+            with tracing.span("parse"):
+                pairs, answer = turn_control.read_reply(result, actions, forced)
+            if pairs:
+                action, action_input = pairs[0]
+                log(f"Action: {action}('{action_input}')")
+                observation = _observe(action, action_input, actions, memo)
+                log(f"Observation: {observation}\n")
+                next_prompt = f"Observation: {observation}"
+                continue
+            span.set(turns=budget.turns)
+            if memo.hits:
+                span.set(repeats=memo.hits)
+            if answer is None:
+                _stop_without_answer(log, forced)
+                return None
+            if not stream:
+                log(f"\nFinal Answer: {answer}")
+            span.set(answered=True)
+            return answer
+        log("Budget exhausted.")
+        span.set(turns=budget.turns)
+        return None
+
+
+def _fresh_conversation(agent: Agent) -> bool:
+    """True if the agent has not been asked anything yet (follow-ups depend on context)."""
+    return not any(m["role"] == "user" for m in agent.messages)
+
+
+def _record_cached_answer(agent: Agent, message: str, answer: str) -> None:
+    agent.messages.append({"role": "user", "content": message})
+    agent.messages.append({"role": "assistant", "content": f"Answer: {answer}"})
+    agent.save_history()
+
+
+def cached_query(
+    question: str,
+    agent: Agent,
+    profile: dict = None,
+    message: str = None,
+    cache: AnswerCache = None,
+    on_miss=None,
+    **kwargs,
+):
+    """Like query(), but answers repeated first questions from the answer cache.
+
+    ``question`` and ``profile`` form the cache key; ``message`` is the text
+    actually sent to the agent (defaults to ``question``). Only the opening
+    question of a conversation is cached, and only successful answers are
+    stored. ``on_miss()``, if given, is called just before query() runs, i.e.
+    never for a cached answer. Extra keyword arguments are passed to query().
+    """
+    cache = cache if cache is not None else agent_runtime(agent).answer_cache
+    message = message or question
+    # Held across the check and the answer, so a concurrent question cannot make this one a follow-up midway
+    with _session_lock(agent):
+        if cache is not None and _fresh_conversation(agent):
+            answer = cache.get(question, profile)
+            if answer is not None:
+                _record_cached_answer(agent, message, answer)
+                return answer
+        else:
+            cache = None
+        if on_miss is not None:
+            on_miss()
+        answer = query(message, agent, **kwargs)
+    if answer is not None and cache is not None:
+        cache.set(question, answer, profile)
+    return answer
+
+
+async def acached_query(
+    question: str,
+    agent: Agent,
+    profile: dict = None,
+    message: str = None,
+    cache: AnswerCache = None,
+    **kwargs,
+):
+    """Async counterpart of cached_query, running aquery() on a miss.
+
+    The SQLite cache and the history file are used from worker threads, keeping the event loop free.
+    """
+    import asyncio
+
+    cache = cache if cache is not None else agent_runtime(agent).answer_cache
+    message = message or question
+    if cache is None or not _fresh_conversation(agent):
+        return await aquery(message, agent, **kwargs)
+    answer = await asyncio.to_thread(cache.get, question, profile)
+    if answer is not None:
+        await asyncio.to_thread(_record_cached_answer, agent, message, answer)
+        return answer
+    answer = await aquery(message, agent, **kwargs)
+    if answer is not None:
+        await asyncio.to_thread(cache.set, question, answer, profile)
+    return answer
+
+
+async def arun_action(action: str, action_input: str, timeout: float = 30.0, runtime: Runtime = None):
+    """Run one action without blocking the event loop, bounded by ``timeout`` seconds.
+
+    The action comes from ``runtime`` (the global one by default), preferring
+    its async registry. Coroutine actions are awaited directly; plain
+    functions run in a worker thread. Timeouts and errors are returned as
+    observation text so the model can react to them, while cancellation of the
+    caller propagates.
+    """
+    import asyncio
+    import inspect
+
+    runtime = runtime if runtime is not None else global_runtime()
+    action_fn = runtime.async_actions.get(action) or runtime.actions[action]
+    with tracing.span("action", action=action) as span:
+        if inspect.iscoroutinefunction(action_fn):
+            call = action_fn(action_input)
+        else:
+            call = asyncio.to_thread(action_fn, action_input)
+        try:
+            return shape_observation(action, await asyncio.wait_for(call, timeout))
+        except asyncio.TimeoutError:
+            span.set(error="timeout")
+            return f"Error: action {action} timed out after {timeout:g}s"
+        except Exception as e:
+            span.set(error=str(e))
+            return f"Error running {action}: {e}"
+
+
+async def _aobserve(
+    action: str,
+    action_input: str,
+    timeout: float,
+    runtime: Runtime,
+    memo: turn_control.ObservationMemo,
+):
+    """Async counterpart of _observe, running new actions through arun_action."""
+    if action not in runtime.actions and action not in runtime.async_actions:
+        return _unknown_action(action, sorted(set(runtime.actions) | set(runtime.async_actions)))
+    observation = memo.get(action, action_input)
+    if observation is not None:
+        return observation
+    observation = await arun_action(action, action_input, timeout, runtime)
+    memo.set(action, action_input, observation)
+    return observation
+
+
+async def aquery(
+    question: str,
+    agent: Agent,
+    max_turns: int = 5,
+    action_timeout: float = 30.0,
+    verbose: bool = True,
+    stream: bool = False,
+    max_seconds: float = None,
+    max_tokens: int = None,
+):
+    """Async ReAct loop; all actions emitted in one turn run concurrently.
+
+    Returns the final answer text, or None if the loop stopped without one.
+    Pass ``verbose=False`` to suppress the turn-by-turn console output. With
+    ``stream=True`` the reply is streamed and cut off at the first Action line,
+    so only that action is dispatched for the turn. Budgets, repairs and
+    repeated actions are handled as in query(). Agents offering tools use
+    atool_query instead (unless streaming).
+    """
+    import asyncio
+
+    if not stream and getattr(agent, "tools", None) and agent.uses_tools():
+        return await atool_query(question, agent, max_turns, action_timeout, verbose=verbose)
+    log = print if verbose else _silent
+    runtime = agent_runtime(agent)
+    known = {**runtime.actions, **runtime.async_actions}
+    budget = turn_control.TurnBudget(max_turns, max_seconds, max_tokens)
+    memo = turn_control.ObservationMemo()
+    with tracing.span("query", stream=stream) as span:
+        log(f"Question: {question}\n")
+        next_prompt = question
+        while not budget.exhausted():
+            forced = budget.nearly_spent()
+            if forced:
+                next_prompt = f"{next_prompt}\n\n{turn_control.FORCE_ANSWER_NOTE}"
+            sent = _tokens_sent(agent)
+            if stream:
+                log(f"--- Turn {budget.turns + 1} ---")
+                result = await agent.astream(next_prompt, on_text=_print_live if verbose else None)
+                await asyncio.to_thread(agent.save_history)
+                # Answer text has already been shown live; other turns are shown once complete
+                log(result if not result.startswith("Answer:") else "")
+            else:
+                result = await agent.acall(next_prompt)
+                await asyncio.to_thread(agent.save_history)
+                log(f"--- Turn {budget.turns + 1} ---")
+                log(result)
+            budget.charge(_tokens_sent(agent) - sent + estimate_tokens(result))
+            with tracing.span("parse"):
+                actions, answer = turn_control.read_reply(result, known, forced)
+            if actions:
+                for action, action_input in actions:
+                    log(f"Action: {action}('{action_input}')")
+                observations = await asyncio.gather(
+                    *(
+                        _aobserve(action, action_input, action_timeout, runtime, memo)
+                        for action, action_input in actions
+                    )
+                )
+                next_prompt = observation_prompt(actions, observations)
+                log(f"{next_prompt}\n")
+                continue
+            span.set(turns=budget.turns)
+            if memo.hits:
+                span.set(repeats=memo.hits)
+            if answer is None:
+                _stop_without_answer(log, forced)
+                return None
+            if not stream:
+                log(f"\nFinal Answer: {answer}")
+            span.set(answered=True)
+            return answer
+        log("Budget exhausted.")
+        span.set(turns=budget.turns)
+        return None
+
+
+async def atool_query(
+    question: str,
+    agent: Agent,
+    max_turns: int = 5,
+    action_timeout: float = 30.0,
+    verbose: bool = True,
+):
+    """Async counterpart of tool_query; each turn's tool calls run concurrently via arun_action."""
+    import asyncio
+
+    log = print if verbose else _silent
+    runtime = agent_runtime(agent)
+    with tracing.span("query", stream=False, protocol="tools") as span:
+        log(f"Question: {question}\n")
+        pending = [{"role": "user", "content": question}]
+        for i in range(max_turns):
+            try:
+                message = await agent.atool_turn(pending)
+            except Exception as e:
+                if i > 0 or not tool_calls.is_tools_unsupported(e):
+                    raise
+                span.set(protocol="text")
+                break
+            await asyncio.to_thread(agent.save_history)
+            log(f"--- Turn {i + 1} ---")
+            if message.content:
+                log(message.content)
+            calls, pairs = _read_tool_reply(message)
+            if not pairs:
+                answer = _tool_answer(message)
+                if answer is None:
+                    log("No action taken and no clear answer. Stopping.")
+                    return None
+                log(f"\nFinal Answer: {answer}")
+                span.set(turns=i + 1, answered=True)
+                return answer
+            for action, action_input in pairs:
+                log(f"Action: {action}('{action_input}')")
+            known = set(runtime.actions) | set(runtime.async_actions)
+
+            async def unknown(action):
+                return _unknown_action(action, sorted(known))
+
+            observations = await asyncio.gather(
+                *(
+                    arun_action(action, action_input, action_timeout, runtime) if action in known else unknown(action)
+                    for action, action_input in pairs
+                )
+            )
+            pending = _tool_results(calls, pairs, observations)
+            log("\n".join(f"Observation: {observation}" for observation in observations) + "\n")
+        else:
+            await asyncio.to_thread(_record_tool_results, agent, pending)
+            log("Max turns reached.")
+            span.set(turns=max_turns)
+            return None
+    agent.reject_tools()
+    return await aquery(question, agent, max_turns, action_timeout, verbose=verbose)
+
+
+def load_dotenv_and_init_client() -> None:
+    """Initialise the module-level clients, caches and upstream policies from the environment.
+
+    This is ``Runtime.from_env()`` applied to the globals behind the
+    module-level API; caches that are already open are kept.
+    """
+    global client, async_client, tavily_client, async_tavily_client
+    global search_cache, answer_cache, knowledge_index
+    global openrouter_upstream, tavily_upstream
+
+    runtime = Runtime.from_env(search_cache=search_cache, knowledge_index=knowledge_index, answer_cache=answer_cache)
+    client, async_client = runtime.client, runtime.async_client
+    tavily_client, async_tavily_client = runtime.tavily_client, runtime.async_tavily_client
+    openrouter_upstream, tavily_upstream = runtime.openrouter_upstream, runtime.tavily_upstream
+    search_cache, knowledge_index, answer_cache = runtime.search_cache, runtime.knowledge_index, runtime.answer_cache
+    # Set TRACE_PATH to stream OpenTelemetry-style spans for every turn to a JSONL file
+    if os.getenv("TRACE_PATH") and tracing.active_tracer() is None:
+        tracing.enable(tracing.Tracer(os.getenv("TRACE_PATH")))
+
+
+def get_ucas_points(grade: str, subject_type: str = "A-level") -> int:
+    """Get UCAS points for a given grade and subject type."""
+    try:
+        return UCAS_POINTS.get(subject_type, {}).get(grade.upper(), 0)
+    except Exception:
+        return 0
+
+
+def calculate_ucas_total(grades_input: str, subject_type: str = "A-level") -> str:
+    """Calculate total UCAS points from a comma-separated list of '<Subject> <Grade>' entries."""
+    try:
+        grades = [g.strip() for g in grades_input.split(",")]
+        total = 0
+        breakdown = []
+        for grade_entry in grades:
+            if " " in grade_entry:
+                subject, grade = grade_entry.rsplit(" ", 1)
+                points = get_ucas_points(grade, subject_type)
+                total += points
+                breakdown.append(f"{subject}: {grade} = {points} points")
+        result = f"Total UCAS points: {total}\nBreakdown:\n" + "\n".join(breakdown)
+        return result
+    except Exception as e:
+        return f"Error calculating UCAS points: {str(e)}"
+
+
+if __name__ == "__main__":
+    try:
+        load_dotenv_and_init_client()
+    except Exception as e:
+        print(f"Warning: client initialisation failed — {e}")
+    # ACTION_PROTOCOL=tools offers actions as native tool calls instead of Action lines
+    agent_instance = Agent(prompt, tools=tools if os.getenv("ACTION_PROTOCOL") == "tools" else None)
+    try:
+        agent_instance.load_history()
+    except Exception:
+        pass
+
+    print("Welcome! I'm your AI Palestine Student University Advisor.")
+    print(
+        "Ask me anything related to universities, admissions, or scholarships. (Write 'exit' to exit. If you don't type a question, I'll end the conversation.)"
+    )
+
+    while True:
+        try:
+            user_input = input("\nAsk a question:\n> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print("\nGoodbye!")
+            break
+        if user_input.lower() == "exit":
+            print("Goodbye!")
+            break
+        if not user_input:
+            print("It looks like you have no questions for now. Goodbye.")
+            break
+        if is_question(user_input):
+            try:
+                query(user_input, agent_instance)
+            except Exception as e:
+                print(f"Error during query: {e}")
+        else:
+            print("It looks like you have no questions for now. Goodbye.")
+            break
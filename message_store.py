@@ -0,0 +1,203 @@
+"""Memory-compact storage for conversation messages.
+
+A server keeping thousands of sessions holds every turn of every conversation
+in memory. As plain dicts, each message costs a dict plus its strings, and
+the same system prompt and popular search observations are held once per
+session. ``MessageStore`` keeps the list-of-dicts interface that ``Agent``,
+``ContextWindow`` and the history store use, but stores:
+
+* one ``__slots__`` record per message, with its role interned
+* contents of ``SHARED_MIN_CHARS`` or more (the system prompt, observations)
+  once per process, deduplicated by content across every session and
+  released when no session refers to them any more
+* optionally, turns older than the most recent ``compress_after`` as zlib
+  data, decompressed again when read. Compressed contents are shared too,
+  keyed by a hash of the content, so sessions repeating a cold observation
+  still hold it once.
+
+Reading a message builds a new dict, so changing that dict does not change
+the store; assign the message back (``store[i] = message``) instead. Each
+record also keeps its token estimate, so ``ContextWindow.fit`` only decodes
+the messages it actually sends.
+"""
+
+import hashlib
+import sys
+import threading
+import weakref
+import zlib
+from collections.abc import MutableSequence
+
+from context_window import message_tokens
+
+SHARED_MIN_CHARS = 256
+COMPRESS_MIN_CHARS = 256
+
+# Content -> _Shared and content digest -> _Packed; entries disappear with the last record referring to them
+_shared = weakref.WeakValueDictionary()
+_packed = weakref.WeakValueDictionary()
+_shared_lock = threading.Lock()
+
+
+class _Shared:
+    """One process-wide copy of a long message content."""
+
+    __slots__ = ("text", "__weakref__")
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def share(text: str) -> _Shared:
+    """The shared copy of ``text``, created on first use."""
+    with _shared_lock:
+        shared = _shared.get(text)
+        if shared is None:
+            shared = _shared[text] = _Shared(text)
+        return shared
+
+
+class _Packed:
+    """One process-wide zlib-compressed copy of a cold message content."""
+
+    __slots__ = ("data", "__weakref__")
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def pack(text: str) -> _Packed:
+    """The shared compressed copy of ``text``, compressed on first use."""
+    encoded = text.encode("utf-8")
+    digest = hashlib.blake2b(encoded, digest_size=16).digest()
+    with _shared_lock:
+        packed = _packed.get(digest)
+        if packed is None:
+            packed = _packed[digest] = _Packed(zlib.compress(encoded))
+        return packed
+
+
+def shared_stats() -> dict:
+    """How many distinct contents are shared, and their total length in characters."""
+    with _shared_lock:
+        texts = list(_shared.keys())
+    return {"contents": len(texts), "chars": sum(map(len, texts))}
+
+
+class _Record:
+    """One message: interned role, content (str, ``_Shared`` or ``_Packed``), any other keys and its token estimate."""
+
+    __slots__ = ("role", "body", "extra", "tokens")
+
+    def __init__(self, role: str, body, extra: dict, tokens: int):
+        self.role = role
+        self.body = body
+        self.extra = extra
+        self.tokens = tokens
+
+
+# Marks a message stored without a "content" key
+_NO_CONTENT = object()
+
+
+def _encode(message: dict) -> _Record:
+    extra = {key: value for key, value in message.items() if key != "role" and key != "content"} or None
+    content = message.get("content", _NO_CONTENT)
+    if isinstance(content, str) and len(content) >= SHARED_MIN_CHARS:
+        content = share(content)
+    return _Record(sys.intern(message["role"]), content, extra, message_tokens(message))
+
+
+def _decode(record: _Record) -> dict:
+    message = {"role": record.role}
+    body = record.body
+    if body.__class__ is _Shared:
+        message["content"] = body.text
+    elif body.__class__ is _Packed:
+        message["content"] = zlib.decompress(body.data).decode("utf-8")
+    elif body is not _NO_CONTENT:
+        message["content"] = body
+    if record.extra:
+        message.update(record.extra)
+    return message
+
+
+def _compress(record: _Record) -> None:
+    body = record.body
+    if body.__class__ is _Shared:
+        body = body.text
+    if body.__class__ is str and len(body) >= COMPRESS_MIN_CHARS:
+        record.body = pack(body)
+
+
+class MessageStore(MutableSequence):
+    """A list of chat messages (dicts) kept as compact records; see the module docstring."""
+
+    def __init__(self, messages=(), compress_after: int = None):
+        self._records = []
+        # Keep this many recent messages uncompressed; None disables compression
+        self.compress_after = compress_after
+        # Records before this index have already been considered for compression
+        self._cold = 0
+        self.extend(messages)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_decode(record) for record in self._records[index]]
+        return _decode(self._records[index])
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            self._records[index] = [_encode(message) for message in value]
+            self._cold = 0
+        else:
+            self._records[index] = _encode(value)
+            self._cold = min(self._cold, index % len(self._records))
+        self._compress_cold()
+
+    def __delitem__(self, index) -> None:
+        del self._records[index]
+        self._cold = min(self._cold, len(self._records))
+
+    def __iter__(self):
+        return map(_decode, self._records)
+
+    def token_counts(self) -> list:
+        """``message_tokens`` of every message, from the records, so nothing is decoded."""
+        return [record.tokens for record in self._records]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (MessageStore, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"MessageStore({list(self)!r})"
+
+    def insert(self, index: int, message: dict) -> None:
+        self._records.insert(index, _encode(message))
+        self._cold = min(self._cold, max(0, index))
+        self._compress_cold()
+
+    def append(self, message: dict) -> None:
+        self._records.append(_encode(message))
+        self._compress_cold()
+
+    def extend(self, messages) -> None:
+        self._records.extend(_encode(message) for message in messages)
+        self._compress_cold()
+
+    def _compress_cold(self) -> None:
+        if self.compress_after is None:
+            return
+        # The system prompt and first question are sent every turn, so they stay as they are
+        start = max(self._cold, 2)
+        end = len(self._records) - self.compress_after
+        for record in self._records[start:end]:
+            _compress(record)
+        self._cold = max(self._cold, end)
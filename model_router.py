@@ -0,0 +1,350 @@
+"""Latency-aware routing across candidate OpenRouter models.
+
+A ``ModelRouter`` holds an ordered list of candidate models. For each request
+it ranks them:
+
+1. Healthy models (recent error rate below ``max_error_rate``) before
+   unhealthy ones, so a failing model is only tried as a last resort.
+   Once ``probe_after`` seconds have passed since an unhealthy model was
+   last tried, one request probes it first again; if the probe succeeds
+   its old failures are forgotten and it is healthy again.
+2. Models with no measurements yet, in configured order, so every
+   candidate gets sampled.
+3. The rest by rolling p50 latency over the last ``window`` requests.
+
+It then walks that fallback chain until one model succeeds. When ``hedge_after``
+is set, a request still running after that many seconds is raced against the
+next model in the chain, and the first successful reply wins. Each request's
+first attempt gets a thread of its own, so concurrent requests never queue
+behind one another; only hedges share a pool of ``hedge_workers`` threads.
+
+Each model's messages are passed through its adapter (see ``adapter_for``), for
+example folding the system prompt into the first user turn for models without
+system-role support, or marking the system prompt as a cacheable prefix for
+providers that only cache on request.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+DEFAULT_WINDOW = 50
+DEFAULT_MAX_ERROR_RATE = 0.5
+DEFAULT_PROBE_AFTER = 30.0
+# Threads for hedge requests; at most this many hedges run at once across all callers
+DEFAULT_HEDGE_WORKERS = 32
+
+
+# OpenRouter passes this marker through to providers with explicit prompt caching
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+@lru_cache(maxsize=256)
+def _folded_content(system: str, first: str) -> str:
+    # The same prompt and question are folded again on every turn of a conversation
+    return f"SYSTEM: {system}\n\nUSER: {first}"
+
+
+def fold_system_prompt(messages: list) -> list:
+    """Merge a leading system message into the first user message (for models without a system role)."""
+    if len(messages) < 2 or messages[0]["role"] != "system" or messages[1]["role"] != "user":
+        return messages
+    system, first = messages[0], messages[1]
+    folded = {**first, "content": _folded_content(system["content"], first["content"])}
+    return [folded] + messages[2:]
+
+
+def cache_system_prompt(messages: list) -> list:
+    """Mark a leading system message as a cacheable prefix (``cache_control`` on its text part).
+
+    Anthropic and Gemini models only reuse a cached prefix when the request
+    marks where it ends. OpenAI and DeepSeek models cache long prefixes
+    automatically, so their messages are left alone.
+    """
+    if not messages or messages[0]["role"] != "system" or not isinstance(messages[0]["content"], str):
+        return messages
+    system = messages[0]
+    part = {"type": "text", "text": system["content"], "cache_control": CACHE_CONTROL}
+    return [{**system, "content": [part]}] + messages[1:]
+
+
+# Substring of the model id -> message adapter; the first match wins
+MODEL_ADAPTERS = [
+    ("gemma", fold_system_prompt),
+    ("anthropic/", cache_system_prompt),
+    ("gemini", cache_system_prompt),
+]
+
+
+def adapter_for(model: str):
+    """The message adapter registered for ``model``, or None if its messages are sent as-is."""
+    lowered = model.lower()
+    for fragment, adapter in MODEL_ADAPTERS:
+        if fragment in lowered:
+            return adapter
+    return None
+
+
+def adapt_messages(model: str, messages: list) -> list:
+    adapter = adapter_for(model)
+    return adapter(messages) if adapter is not None else messages
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile of ``values`` (0.0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class ModelStats:
+    """Rolling latency and outcome samples for one model."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        # Router clock reading when a request to the model last finished, or a probe was handed out
+        self.last_tried = None
+
+    def record(self, latency: float, ok: bool) -> None:
+        if ok:
+            self.latencies.append(latency)
+        self.outcomes.append(ok)
+
+    def forget_failures(self) -> None:
+        self.outcomes = deque((ok for ok in self.outcomes if ok), maxlen=self.outcomes.maxlen)
+
+    @property
+    def samples(self) -> int:
+        return len(self.outcomes)
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def p50(self) -> float:
+        return percentile(self.latencies, 50)
+
+    def p95(self) -> float:
+        return percentile(self.latencies, 95)
+
+
+def _run_into(future, fn) -> None:
+    """Run ``fn`` and settle ``future`` with its result or exception (the body of a one-off attempt thread)."""
+    try:
+        future.set_result(fn())
+    except BaseException as e:
+        future.set_exception(e)
+
+
+class ModelRouter:
+    """Picks the fastest healthy candidate model, with fallback and optional hedging."""
+
+    def __init__(
+        self,
+        models: list,
+        window: int = DEFAULT_WINDOW,
+        max_error_rate: float = DEFAULT_MAX_ERROR_RATE,
+        hedge_after: float = None,
+        probe_after: float = DEFAULT_PROBE_AFTER,
+        clock=time.perf_counter,
+        hedge_workers: int = DEFAULT_HEDGE_WORKERS,
+    ):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.models = list(models)
+        self.max_error_rate = max_error_rate
+        self.hedge_after = hedge_after
+        self.probe_after = probe_after
+        self.clock = clock
+        # Size this to the number of requests expected in flight at once
+        self.hedge_workers = hedge_workers
+        self.model_stats = {model: ModelStats(window) for model in self.models}
+        self.hedges = 0
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _unhealthy(self, stats: ModelStats) -> bool:
+        return stats.samples > 0 and stats.error_rate >= self.max_error_rate
+
+    def record(self, model: str, latency: float, ok: bool) -> None:
+        with self._lock:
+            stats = self.model_stats[model]
+            if ok and self._unhealthy(stats):
+                # A successful probe: the model has recovered
+                stats.forget_failures()
+            stats.record(latency, ok)
+            stats.last_tried = self.clock()
+
+    def ranked(self) -> list:
+        """Candidate models, best first (see module docstring for the ordering).
+
+        An unhealthy model due a probe is ranked first, and the probe is handed
+        out to this caller only.
+        """
+        with self._lock:
+            now = self.clock()
+            probe = None
+            if self.probe_after is not None:
+                for model in self.models:
+                    stats = self.model_stats[model]
+                    if self._unhealthy(stats) and now - stats.last_tried >= self.probe_after:
+                        probe = model
+                        stats.last_tried = now
+                        break
+
+            def key(item):
+                index, model = item
+                stats = self.model_stats[model]
+                return (model != probe, self._unhealthy(stats), stats.samples > 0, stats.p50(), index)
+
+            return [model for _, model in sorted(enumerate(self.models), key=key)]
+
+    def _attempt(self, create, messages: list, model: str, kwargs: dict):
+        started = self.clock()
+        try:
+            result = create(model=model, messages=messages, **kwargs)
+        except Exception:
+            self.record(model, self.clock() - started, False)
+            raise
+        self.record(model, self.clock() - started, True)
+        return result
+
+    def complete(self, create, prepare, hedge: bool = True, **kwargs):
+        """Call ``create(model=..., messages=prepare(model), **kwargs)`` on the best model.
+
+        Returns ``(model, result)``. Falls back down the ranking on errors and
+        re-raises the last error if every model fails. Pass ``hedge=False``
+        for calls whose losing result cannot simply be dropped (e.g. streams).
+        """
+        chain = self.ranked()
+        if hedge and self.hedge_after is not None and len(chain) > 1:
+            return self._complete_hedged(create, prepare, chain, kwargs)
+        last_error = None
+        for model in chain:
+            try:
+                return model, self._attempt(create, prepare(model), model, kwargs)
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    def _complete_hedged(self, create, prepare, chain: list, kwargs: dict):
+        from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix="model-hedge")
+        remaining = list(chain)
+        pending = {}
+        # Model -> perf_counter reading when its attempt actually started (absent while it waits for a pool thread)
+        started_at = {}
+        last_error = None
+
+        def launch():
+            model = remaining.pop(0)
+            # Messages are prepared here, on the calling thread, never in the pool
+            messages = prepare(model)
+
+            def run():
+                started_at[model] = time.perf_counter()
+                return self._attempt(create, messages, model, kwargs)
+
+            if pending:
+                future = self._pool.submit(run)
+            else:
+                # Nothing in flight: this attempt starts now on its own thread, never queued behind other requests
+                future = Future()
+                threading.Thread(target=_run_into, args=(future, run), name="model-attempt", daemon=True).start()
+            pending[future] = model
+
+        launch()
+        while pending:
+            # Wait for the in-flight calls, but only up to the hedge deadline while there is still a model left
+            # to race against them; the deadline counts from when the latest attempt started, not was queued
+            timeout = started = None
+            if remaining:
+                started = started_at.get(chain[len(chain) - len(remaining) - 1])
+                timeout = self.hedge_after if started is None else started + self.hedge_after - time.perf_counter()
+            done, _ = wait(pending, timeout=None if timeout is None else max(timeout, 0.0), return_when=FIRST_COMPLETED)
+            if not done:
+                if started is None:
+                    # The latest hedge is still queued for a pool thread; its deadline has not begun
+                    continue
+                with self._lock:
+                    self.hedges += 1
+                launch()
+                continue
+            for future in done:
+                model = pending.pop(future)
+                try:
+                    # Slower in-flight calls are left to finish; their latency is still recorded
+                    return model, future.result()
+                except Exception as e:
+                    last_error = e
+            if not pending and remaining:
+                launch()
+        raise last_error
+
+    async def _aattempt(self, create, messages: list, model: str, kwargs: dict):
+        started = self.clock()
+        try:
+            result = await create(model=model, messages=messages, **kwargs)
+        except Exception:
+            self.record(model, self.clock() - started, False)
+            raise
+        self.record(model, self.clock() - started, True)
+        return result
+
+    async def acomplete(self, create, prepare, hedge: bool = True, **kwargs):
+        """Async counterpart of ``complete``; losing hedged requests are cancelled."""
+        import asyncio
+
+        remaining = self.ranked()
+        hedging = hedge and self.hedge_after is not None
+        pending = {}
+        last_error = None
+
+        def launch():
+            model = remaining.pop(0)
+            pending[asyncio.ensure_future(self._aattempt(create, prepare(model), model, kwargs))] = model
+
+        launch()
+        try:
+            while pending:
+                timeout = self.hedge_after if hedging and remaining else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    with self._lock:
+                        self.hedges += 1
+                    launch()
+                    continue
+                for task in done:
+                    model = pending.pop(task)
+                    try:
+                        return model, task.result()
+                    except Exception as e:
+                        last_error = e
+                if not pending and remaining:
+                    launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """Per-model rolling p50/p95 latency, error rate and sample count, plus the hedge count."""
+        with self._lock:
+            models = {
+                model: {
+                    "p50": stats.p50(),
+                    "p95": stats.p95(),
+                    "error_rate": stats.error_rate,
+                    "samples": stats.samples,
+                }
+                for model, stats in self.model_stats.items()
+            }
+        return {"models": models, "hedges": self.hedges}
@@ -0,0 +1,90 @@
+"""Observation shaping: turn raw action results into compact text for the model.
+
+The raw Tavily response carries scores, image lists, timings and full
+snippets; sending its ``repr`` back to the model bloats every later request.
+``format_search_results`` keeps only what the model needs to cite sources
+(title, URL and a short snippet), drops duplicate URLs and repeated domains,
+puts official university and government domains first, and caps the size.
+"""
+
+import re
+from urllib.parse import urlsplit
+
+# Official academic/government hosts, e.g. ucl.ac.uk, stanford.edu, metu.edu.tr, gov.uk
+OFFICIAL_DOMAIN_RE = re.compile(r"(^|\.)(ac|edu|gov)(\.[a-z]{2})?$")
+
+DEFAULT_MAX_RESULTS = 5
+DEFAULT_SNIPPET_CHARS = 300
+DEFAULT_MAX_CHARS = 2000
+
+
+def result_domain(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def normalise_url(url: str) -> str:
+    """Canonical form used to detect duplicate URLs (scheme, www. and trailing slash ignored)."""
+    parts = urlsplit(url)
+    path = parts.path.rstrip("/")
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{result_domain(url)}{path}{query}"
+
+
+def is_official_domain(domain: str) -> bool:
+    return bool(OFFICIAL_DOMAIN_RE.search(domain))
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[: limit - 1].rstrip() + "…"
+
+
+def format_search_results(
+    response,
+    max_results: int = DEFAULT_MAX_RESULTS,
+    snippet_chars: int = DEFAULT_SNIPPET_CHARS,
+    max_chars: int = DEFAULT_MAX_CHARS,
+) -> str:
+    """Format a Tavily search response as a short ranked list of sources.
+
+    Non-dict responses (e.g. error strings) are passed through as text.
+    """
+    if not isinstance(response, dict):
+        return str(response)
+
+    seen_urls = set()
+    seen_domains = set()
+    candidates = []
+    for position, result in enumerate(response.get("results") or []):
+        url = result.get("url") or ""
+        domain = result_domain(url)
+        key = normalise_url(url)
+        if not url or key in seen_urls or domain in seen_domains:
+            continue
+        seen_urls.add(key)
+        seen_domains.add(domain)
+        candidates.append((not is_official_domain(domain), -(result.get("score") or 0), position, result))
+    candidates.sort(key=lambda c: c[:3])
+
+    lines = []
+    answer = response.get("answer")
+    if answer:
+        lines.append(f"Summary: {_shorten(answer, snippet_chars)}")
+    for n, (_, _, _, result) in enumerate(candidates[:max_results], 1):
+        title = _shorten(result.get("title") or "Untitled", 120)
+        retrieved = result.get("retrieved")
+        suffix = f" (retrieved {retrieved})" if retrieved else ""
+        lines.append(f"{n}. {title} — {result['url']}{suffix}")
+        snippet = result.get("content")
+        if snippet:
+            lines.append(f"   {_shorten(snippet, snippet_chars)}")
+    if len(lines) == (1 if answer else 0):
+        lines.append("No results found.")
+
+    text = "\n".join(lines)
+    if len(text) > max_chars:
+        text = text[: max_chars - 1].rstrip() + "…"
+    return text
@@ -0,0 +1,179 @@
+"""Speculative prefetch of the searches a student's profile makes likely.
+
+The prompt has the model ask clarifying questions before it searches, so the
+first turn or two leave the network idle. Once the student's subject, target
+countries and intake year are known, ``profile_queries`` derives the searches
+the model will probably make. These cover entry requirements and
+scholarships per country, phrased like the prompt's own examples.
+A ``Prefetcher`` runs them on a background thread pool.
+
+Warmed responses land where the actions look first. The default search
+function is ``main.cached_search``, which stores them in the search cache and
+harvests them into the local knowledge index behind ``lookup``. Pass
+``prefetcher.search`` as the ``search`` action to also join a prefetch
+still in flight instead of issuing the same request twice:
+
+    prefetcher = Prefetcher()
+    prefetcher.prefetch_profile(profile, question)
+    query(question, agent, actions={**known_actions, "search": prefetcher.search})
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from answer_cache import intake_year
+from search_cache import normalise_query
+
+DEFAULT_WORKERS = 4
+MAX_QUERIES = 8
+DEFAULT_QUALIFICATION = "Tawjihi"
+
+# Country names as students write them -> the form used in queries
+COUNTRY_ALIASES = {
+    "uk": "UK",
+    "united kingdom": "UK",
+    "britain": "UK",
+    "england": "UK",
+    "usa": "USA",
+    "us": "USA",
+    "united states": "USA",
+    "turkiye": "Turkey",
+    "türkiye": "Turkey",
+}
+
+ENTRY_REQUIREMENTS_QUERY = "{subject} entry requirements {country} {year} {qualification} international students"
+SCHOLARSHIPS_QUERY = "scholarships for Palestinian students {subject} {country} {year}"
+GENERAL_SCHOLARSHIPS_QUERY = "scholarships for Palestinian students {subject} {year}"
+# Countries whose main scholarship route is better searched by name
+COUNTRY_SCHOLARSHIP_QUERIES = {
+    "UK": "full scholarships for Palestinian students {subject} {year} site:*.ac.uk OR site:*.edu",
+    "Germany": "DAAD scholarships Palestinian {level} {subject} Germany {year}",
+    "Turkey": "Türkiye Scholarships {level} {subject} {year} Palestinian applicants",
+}
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.replace(";", ",").replace(" and ", ",").split(",") if part.strip()]
+    return [str(part).strip() for part in value if str(part).strip()]
+
+
+def profile_countries(profile: dict) -> list:
+    countries = []
+    for field in ("target_countries", "countries", "country"):
+        for country in _as_list(profile.get(field)):
+            name = COUNTRY_ALIASES.get(country.lower(), country)
+            if name not in countries:
+                countries.append(name)
+    return countries
+
+
+def profile_queries(profile: dict, question: str = "", max_queries: int = MAX_QUERIES) -> list:
+    """The searches likely for ``profile``, most useful first; empty without a subject.
+
+    Entry requirements and a scholarship search are derived per target
+    country, or one general scholarship search when no country is known.
+    """
+    profile = profile or {}
+    subject = str(profile.get("subject") or "").strip()
+    if not subject:
+        return []
+    fields = {
+        "subject": subject,
+        "year": intake_year(question, profile),
+        "qualification": str(profile.get("qualification") or DEFAULT_QUALIFICATION),
+        "level": str(profile.get("level") or "undergraduate"),
+    }
+    countries = profile_countries(profile)
+    if not countries:
+        return [GENERAL_SCHOLARSHIPS_QUERY.format(**fields)][:max_queries]
+    queries = []
+    for country in countries:
+        queries.append(ENTRY_REQUIREMENTS_QUERY.format(country=country, **fields))
+        template = COUNTRY_SCHOLARSHIP_QUERIES.get(country, SCHOLARSHIPS_QUERY)
+        queries.append(template.format(country=country, **fields))
+    return queries[:max_queries]
+
+
+class Prefetcher:
+    """Runs speculative searches on a thread pool; ``search`` joins any still in flight."""
+
+    def __init__(self, search=None, workers: int = DEFAULT_WORKERS):
+        # main.cached_search unless given; resolved on first use so importing this module stays light
+        self._search_fn = search
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.started = 0
+        self.joined = 0
+        self.failed = 0
+
+    def _fetch(self, query: str):
+        if self._search_fn is None:
+            import main
+
+            self._search_fn = main.cached_search
+        return self._search_fn(query)
+
+    def _finished(self, key: str, future) -> None:
+        with self._lock:
+            if not future.cancelled() and future.exception() is not None:
+                self.failed += 1
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def prefetch(self, queries) -> int:
+        """Start fetching ``queries`` in the background; returns how many were not already in flight."""
+        started = 0
+        for query in queries:
+            key = normalise_query(query)
+            with self._lock:
+                if key in self._in_flight:
+                    continue
+                future = self._pool.submit(self._fetch, query)
+                self._in_flight[key] = future
+                self.started += 1
+            future.add_done_callback(lambda done, key=key: self._finished(key, done))
+            started += 1
+        return started
+
+    def prefetch_profile(self, profile: dict, question: str = "") -> list:
+        """Prefetch ``profile_queries(profile, question)``; returns the queries."""
+        queries = profile_queries(profile, question)
+        self.prefetch(queries)
+        return queries
+
+    def search(self, query: str):
+        """The search action: waits for a matching prefetch in flight, otherwise searches as usual."""
+        with self._lock:
+            future = self._in_flight.get(normalise_query(query))
+        if future is not None:
+            try:
+                response = future.result()
+            except Exception:
+                # A failed prefetch is retried as an ordinary search
+                return self._fetch(query)
+            with self._lock:
+                self.joined += 1
+            return response
+        return self._fetch(query)
+
+    def wait(self, timeout: float = None) -> None:
+        """Block until the prefetches currently in flight have finished (or ``timeout`` passes)."""
+        with self._lock:
+            futures = list(self._in_flight.values())
+        wait(futures, timeout=timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "started": self.started,
+                "in_flight": len(self._in_flight),
+                "joined": self.joined,
+                "failed": self.failed,
+            }
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,113 @@
+"""Fast detection of whether a line of user input is a question.
+
+Used to gate REPL lines (and anything else that should only run the advisor
+for actual questions). The rules, in order:
+
+1. An English question word ("what", "can", "does", ...) or an Arabic one
+   ("هل", "كم", colloquial "شو" / "وين" / "قديش", ...) anywhere as a whole
+   word makes it a question. "ما" and "أي" are ambiguous alone ("ما" is
+   also negation, "اي"/"إي" is colloquial "yes"), so they only count as
+   "ما هو" / "ما هي" / "ما هم" and as "أي" written with its hamza.
+2. A closing statement such as "no more questions?" is not a question, even
+   with a question mark.
+3. Otherwise, a trailing question mark (``?`` or the Arabic ``؟``) makes it a
+   question.
+
+All question words live in one alternation compiled at import, so each input
+is scanned once. Arabic words may carry the conjunction prefixes و/ف ("وهل",
+"فكم"), and alef/hamza spellings (أين / اين) are treated as equal.
+``classify_batch`` classifies a whole list (a log file, a batch of server
+requests) without per-call attribute lookups.
+"""
+
+import re
+
+ENGLISH_QUESTION_WORDS = (
+    "who",
+    "what",
+    "when",
+    "where",
+    "why",
+    "how",
+    "which",
+    "can",
+    "is",
+    "are",
+    "do",
+    "does",
+    "did",
+    "will",
+    "could",
+    "would",
+    "should",
+)
+
+# Modern Standard Arabic and Levantine/Palestinian question words, written with bare alef
+ARABIC_QUESTION_WORDS = (
+    "هل",
+    "ماذا",
+    "متى",
+    "امتى",
+    "اين",
+    "وين",
+    "كيف",
+    "لماذا",
+    "ليش",
+    "كم",
+    "قديش",
+    "ايش",
+    "شو",
+    "مين",
+)
+
+# Matched exactly as written (no alef folding): the bare words are not reliably questions
+ARABIC_QUESTION_PHRASES = ("ما هو", "ما هي", "ما هم", "أي")
+
+NON_QUESTIONS = ("i have no more questions", "that's all", "no more questions")
+
+# Alef/hamza variants and alef maqsura are matched in the pattern itself: folding
+# the input with str.translate first would cost more than the whole search
+_ARABIC_SPELLINGS = {"ا": "[اأإآ]", "ي": "[يى]"}
+
+
+def _arabic_pattern(word: str) -> str:
+    return "".join(_ARABIC_SPELLINGS.get(char, char) for char in word)
+
+
+# Longest first, so "أيش" is tried as a whole before "أي"
+_ARABIC_ALTERNATION = "|".join(
+    sorted(
+        [_arabic_pattern(word) for word in ARABIC_QUESTION_WORDS] + list(ARABIC_QUESTION_PHRASES),
+        key=len,
+        reverse=True,
+    )
+)
+_QUESTION_WORD_RE = re.compile(
+    r"\b(?:" + "|".join(ENGLISH_QUESTION_WORDS) + r"|[وف]?(?:" + _ARABIC_ALTERNATION + r"))\b"
+)
+
+
+def is_question(user_input: str) -> bool:
+    """True if ``user_input`` reads as a question (see module docstring for the rules)."""
+    text = user_input.strip().lower()
+    if _QUESTION_WORD_RE.search(text):
+        return True
+    if text.endswith("?") and text.startswith(NON_QUESTIONS):
+        return False
+    return text.endswith(("?", "؟"))
+
+
+def classify_batch(inputs) -> list:
+    """``is_question`` for every string in ``inputs``, in order."""
+    search = _QUESTION_WORD_RE.search
+    results = []
+    append = results.append
+    for user_input in inputs:
+        text = user_input.strip().lower()
+        if search(text):
+            append(True)
+        elif text.endswith("?") and text.startswith(NON_QUESTIONS):
+            append(False)
+        else:
+            append(text.endswith(("?", "؟")))
+    return results
@@ -0,0 +1,50 @@
+"""Thread-safe token-bucket rate limiting for upstream API calls."""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Allows ``rate`` calls per second on average, with bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float = None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take ``tokens`` if available right now; never blocks."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` now, going into debt if needed; returns how long the caller must wait.
+
+        Lets async callers wait with ``asyncio.sleep`` instead of blocking.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until ``tokens`` are available; returns the time spent waiting."""
+        delay = self.reserve(tokens)
+        if delay:
+            self.sleep(delay)
+        return delay
@@ -0,0 +1,240 @@
+"""Explicit runtime context: the clients, caches and actions a conversation runs against.
+
+``main`` keeps these in module globals set by ``load_dotenv_and_init_client``,
+so swapping one (a test's fake search client, a server's pooled connection)
+changes it for every conversation in the process. A ``Runtime`` owns the same
+things explicitly:
+
+* the OpenRouter and Tavily clients (sync and async) and the ``Upstream``
+  retry/rate-limit policies wrapped around them
+* the search cache, local knowledge index and answer cache
+* the action registries, as read-only mappings
+* shared configuration: the default model and tool schemas for new agents
+
+A Runtime cannot be modified once built, so one instance can be shared by any
+number of threads. ``replace()`` and ``with_actions()`` derive a new one
+instead. Unless given explicitly, the ``search`` and ``lookup`` actions are
+bound to the runtime's own clients and caches, so two runtimes in one process
+never see each other's state:
+
+    runtime = Runtime.from_env()
+    agent = Agent(prompt, runtime=runtime)
+    query(question, agent)
+
+``main.global_runtime()`` is the runtime behind the module-level API.
+"""
+
+import os
+from functools import partial
+from types import MappingProxyType
+
+import transport
+from calculator import safe_calculate
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+DEFAULT_MODEL = "deepseek/deepseek-r1-0528-qwen3-8b:free"
+
+_FIELDS = (
+    "client",
+    "async_client",
+    "tavily_client",
+    "async_tavily_client",
+    "openrouter_upstream",
+    "tavily_upstream",
+    "search_cache",
+    "knowledge_index",
+    "answer_cache",
+    "actions",
+    "async_actions",
+    "model",
+    "tools",
+)
+
+
+def env_rate(name: str):
+    """Requests-per-second limit from the environment; unset or 0 means unlimited."""
+    value = float(os.getenv(name) or 0)
+    return value if value > 0 else None
+
+
+class Runtime:
+    """Immutable bundle of clients, caches, upstream policies, actions and defaults shared by agents."""
+
+    __slots__ = _FIELDS + ("_bound_actions",)
+
+    def __init__(
+        self,
+        client=None,
+        async_client=None,
+        tavily_client=None,
+        async_tavily_client=None,
+        openrouter_upstream: transport.Upstream = None,
+        tavily_upstream: transport.Upstream = None,
+        search_cache=None,
+        knowledge_index=None,
+        answer_cache=None,
+        actions: dict = None,
+        async_actions: dict = None,
+        model: str = DEFAULT_MODEL,
+        tools: list = None,
+    ):
+        set_field = partial(object.__setattr__, self)
+        set_field("client", client)
+        set_field("async_client", async_client)
+        set_field("tavily_client", tavily_client)
+        set_field("async_tavily_client", async_tavily_client)
+        set_field("openrouter_upstream", openrouter_upstream or transport.Upstream("openrouter"))
+        set_field("tavily_upstream", tavily_upstream or transport.Upstream("tavily"))
+        set_field("search_cache", search_cache)
+        set_field("knowledge_index", knowledge_index)
+        set_field("answer_cache", answer_cache)
+        set_field("model", model)
+        set_field("tools", tuple(tools) if tools else None)
+        # Registries left unset are bound to this runtime (and rebound by replace())
+        set_field("_bound_actions", (actions is None, async_actions is None))
+        if actions is None:
+            actions = {"calculate": safe_calculate, "search": self.cached_search, "lookup": self.lookup_knowledge}
+        if async_actions is None:
+            async_actions = {"search": self.acached_search, "lookup": self.alookup_knowledge}
+        set_field("actions", MappingProxyType(dict(actions)))
+        set_field("async_actions", MappingProxyType(dict(async_actions)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Runtime is immutable; use replace({name}=...) instead")
+
+    def __repr__(self) -> str:
+        return f"Runtime(model={self.model!r}, actions={sorted(self.actions)})"
+
+    def replace(self, **changes) -> "Runtime":
+        """A copy of this runtime with ``changes`` applied; bound actions are rebound to the copy."""
+        unknown = set(changes) - set(_FIELDS)
+        if unknown:
+            raise TypeError(f"Unknown Runtime fields: {', '.join(sorted(unknown))}")
+        fields = {name: getattr(self, name) for name in _FIELDS}
+        bound_sync, bound_async = self._bound_actions
+        if bound_sync:
+            fields["actions"] = None
+        if bound_async:
+            fields["async_actions"] = None
+        fields.update(changes)
+        return Runtime(**fields)
+
+    def with_actions(self, **actions) -> "Runtime":
+        """A copy whose sync registry has ``actions`` added or overridden (e.g. a rate-limited search)."""
+        return self.replace(actions={**self.actions, **actions})
+
+    @classmethod
+    def from_env(cls, **overrides) -> "Runtime":
+        """Build a runtime from ``OPENROUTER_API_KEY``/``TAVILY_API_KEY`` (``.env`` supported).
+
+        Clients are created on first use. The search cache and knowledge index
+        default to ``SEARCH_CACHE_PATH`` and ``KNOWLEDGE_INDEX_PATH``; the answer
+        cache is only opened when ``ANSWER_CACHE_PATH`` is set. ``overrides``
+        replace any field, e.g. an already open cache.
+        """
+        from dotenv import load_dotenv
+
+        _ = load_dotenv()
+        api_key = os.getenv("OPENROUTER_API_KEY")
+        tavily_api_key = os.getenv("TAVILY_API_KEY")
+        if not api_key:
+            raise ValueError("OPENROUTER_API_KEY not found in .env file or environment variables.")
+        if not tavily_api_key:
+            raise ValueError("TAVILY_API_KEY not found in .env file or environment variables.")
+
+        fields = {
+            "client": transport.LazyClient(partial(transport.create_openai_client, api_key, OPENROUTER_BASE_URL)),
+            "async_client": transport.LazyClient(
+                partial(transport.create_async_openai_client, api_key, OPENROUTER_BASE_URL)
+            ),
+            "tavily_client": transport.LazyClient(partial(transport.create_tavily_client, tavily_api_key)),
+            "async_tavily_client": transport.LazyClient(partial(transport.create_async_tavily_client, tavily_api_key)),
+            "openrouter_upstream": transport.Upstream("openrouter", rate=env_rate("OPENROUTER_RATE_LIMIT")),
+            "tavily_upstream": transport.Upstream("tavily", rate=env_rate("TAVILY_RATE_LIMIT")),
+        }
+        fields.update(overrides)
+        if fields.get("search_cache") is None:
+            from search_cache import DEFAULT_CACHE_PATH, SearchCache
+
+            fields["search_cache"] = SearchCache(os.getenv("SEARCH_CACHE_PATH", DEFAULT_CACHE_PATH))
+        if fields.get("knowledge_index") is None:
+            from knowledge_index import DEFAULT_INDEX_PATH, KnowledgeIndex
+
+            fields["knowledge_index"] = KnowledgeIndex(os.getenv("KNOWLEDGE_INDEX_PATH", DEFAULT_INDEX_PATH))
+        if fields.get("answer_cache") is None and os.getenv("ANSWER_CACHE_PATH"):
+            from answer_cache import AnswerCache
+
+            fields["answer_cache"] = AnswerCache(os.getenv("ANSWER_CACHE_PATH"))
+        return cls(**fields)
+
+    def openrouter(self):
+        if self.client is None:
+            raise Exception("OpenRouter client not initialised. Call load_dotenv_and_init_client() first.")
+        return self.client
+
+    def async_openrouter(self):
+        if self.async_client is None:
+            raise Exception("Async OpenRouter client not initialised. Call load_dotenv_and_init_client() first.")
+        return self.async_client
+
+    def search_tavily(self, query: str):
+        """Search using Tavily; requires prior initialisation via load_dotenv_and_init_client."""
+        if self.tavily_client is None:
+            raise Exception("Tavily client not initialised. Call load_dotenv_and_init_client() first.")
+        response = self.tavily_upstream.call(self.tavily_client.search, query)
+        if self.knowledge_index is not None:
+            self.knowledge_index.harvest(response, query)
+        return response
+
+    def cached_search(self, query: str, bypass_cache: bool = False):
+        """Search via the result cache, falling back to search_tavily on a miss or when bypassed."""
+        if self.search_cache is None:
+            return self.search_tavily(query)
+        return self.search_cache.get_or_fetch(query, self.search_tavily, bypass=bypass_cache)
+
+    async def asearch_tavily(self, query: str):
+        """Async counterpart of search_tavily; SQLite and the sync client fallback run in worker threads."""
+        import asyncio
+
+        if self.async_tavily_client is None:
+            return await asyncio.to_thread(self.search_tavily, query)
+        response = await self.tavily_upstream.acall(self.async_tavily_client.search, query)
+        if self.knowledge_index is not None:
+            await asyncio.to_thread(self.knowledge_index.harvest, response, query)
+        return response
+
+    async def acached_search(self, query: str, bypass_cache: bool = False):
+        """Async counterpart of cached_search; the network call is awaited outside the cache lock.
+
+        Cache reads and writes run in worker threads, keeping SQLite off the event loop.
+        """
+        import asyncio
+
+        if self.search_cache is not None and not bypass_cache:
+            cached = await asyncio.to_thread(self.search_cache.get, query)
+            if cached is not None:
+                return cached
+        response = await self.asearch_tavily(query)
+        if self.search_cache is not None:
+            await asyncio.to_thread(self.search_cache.set, query, response)
+        return response
+
+    def local_lookup(self, query: str):
+        """Fresh matches for ``query`` from the local index, as a search-shaped response, or None."""
+        if self.knowledge_index is None:
+            return None
+        results = self.knowledge_index.lookup(query)
+        if not results:
+            return None
+        return {"query": query, "answer": None, "results": results, "source": "local index"}
+
+    def lookup_knowledge(self, query: str):
+        """Answer from the local index, falling back to a live (cached) search if it has nothing fresh."""
+        local = self.local_lookup(query)
+        return local if local is not None else self.cached_search(query)
+
+    async def alookup_knowledge(self, query: str):
+        import asyncio
+
+        local = await asyncio.to_thread(self.local_lookup, query)
+        return local if local is not None else await self.acached_search(query)
@@ -0,0 +1,156 @@
+"""Disk-backed cache for web search results.
+
+Entries are stored in a small SQLite database keyed on a normalised query
+string, so repeated searches survive process restarts and are served without
+a network round-trip. Each entry carries its own expiry time, and the table
+is bounded to ``max_entries`` rows with least-recently-used eviction. A hit
+only reads the database: access times are kept in memory and written out
+with the next ``set()`` (before it evicts anything) or on ``close()``.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "search_cache.db"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 1000
+
+
+def normalise_query(query: str) -> str:
+    """Normalise a search query so trivially different spellings share a cache entry.
+
+    Lower-cases the query, collapses runs of whitespace and strips a pair of
+    quotes wrapping the whole query (the model often emits
+    ``Action: search: "..."``).
+    """
+    normalised = re.sub(r"\s+", " ", query.strip()).casefold()
+    if len(normalised) >= 2 and normalised[0] == normalised[-1] and normalised[0] in "\"'":
+        normalised = normalised[1:-1].strip()
+    return normalised
+
+
+class SearchCache:
+    """SQLite-backed search result cache with per-entry TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock=time.time,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Key -> last hit time not yet written to last_access
+        self._accessed = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                response TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS search_cache_last_access ON search_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, query: str):
+        """Return the cached response for ``query``, or None on a miss or expired entry."""
+        key = normalise_query(query)
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            self.hits += 1
+        return json.loads(response)
+
+    def set(self, query: str, response, ttl: float = None) -> None:
+        """Store ``response`` for ``query``, evicting the least recently used entries if full."""
+        key = normalise_query(query)
+        now = self.clock()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        payload = json.dumps(response)
+        with self._lock:
+            self._flush_accessed()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, query, response, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, query, payload, expires_at, now),
+            )
+            self._conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM search_cache WHERE key IN "
+                    "(SELECT key FROM search_cache ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def _flush_accessed(self) -> None:
+        # Callers hold the lock and commit
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE search_cache SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def get_or_fetch(self, query: str, fetch, bypass: bool = False):
+        """Return the cached response for ``query``, calling ``fetch(query)`` on a miss.
+
+        With ``bypass=True`` the cache is not consulted, but the fresh response
+        is still stored so later lookups benefit from it.
+        """
+        if not bypass:
+            cached = self.get(query)
+            if cached is not None:
+                return cached
+        response = fetch(query)
+        self.set(query, response)
+        return response
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current number of stored entries."""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._accessed.clear()
+            self._conn.execute("DELETE FROM search_cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,319 @@
+"""Long-running multi-session HTTP server for the advisor.
+
+Hosts many concurrent ``Agent`` sessions in one asyncio process. Each session
+is keyed by an id chosen by the caller, has its own message history (persisted
+to ``<history_dir>/<session_id>.jsonl``) and its own lock, so turns within a
+session are serialised while different sessions run concurrently. All sessions
+share one ``Runtime`` holding one pooled async client per upstream (OpenRouter
+and Tavily); the server never changes ``main``'s module globals.
+
+Endpoints (JSON in, JSON out):
+    GET    /health                         -> {"status": "ok", "sessions": <n>}
+    GET    /metrics                        -> {"openrouter": {...}, "tavily": {...}}
+    POST   /sessions/<id>/messages         {"question": "..."} -> {"session_id", "answer"}
+    GET    /sessions/<id>/history          -> {"session_id", "messages"}
+    DELETE /sessions/<id>                  -> {"session_id", "deleted"}  (also deletes its history file)
+
+Run with ``python server.py --port 8000``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+from collections import OrderedDict
+from http import HTTPStatus
+
+import main
+from answer_cache import AnswerCache
+from runtime import Runtime
+
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+MAX_BODY_BYTES = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+class Session:
+    """One student's conversation: an Agent plus a lock serialising its turns."""
+
+    def __init__(self, session_id: str, agent: main.Agent):
+        self.session_id = session_id
+        self.agent = agent
+        self.lock = asyncio.Lock()
+        # Set once the saved history has been read into ``agent`` (under ``lock``, in a worker thread)
+        self.loaded = False
+
+
+class AdvisorServer:
+    """Session registry plus a minimal HTTP/1.1 front end built on asyncio streams."""
+
+    def __init__(
+        self,
+        openai_client,
+        tavily_client=None,
+        history_dir: str = "histories",
+        max_sessions: int = 1000,
+        system: str = main.prompt,
+        model: str = None,
+        max_turns: int = 5,
+        action_timeout: float = 30.0,
+        answer_cache: AnswerCache = None,
+        tools: bool = False,
+        compress_after: int = None,
+        runtime: Runtime = None,
+    ):
+        self.openai_client = openai_client
+        self.history_dir = history_dir
+        self.max_sessions = max_sessions
+        self.system = system
+        self.model = model
+        self.max_turns = max_turns
+        self.action_timeout = action_timeout
+        # Opening questions close to one already answered are served from here
+        self.answer_cache = answer_cache
+        # Offer actions as native tool calls (models without tool support fall back to Action lines)
+        self.tools = main.tools if tools else None
+        # Sessions keep only this many recent messages uncompressed in memory; None: no compression
+        self.compress_after = compress_after
+        self.sessions = OrderedDict()
+        # Session ids whose history is being deleted -> event set when it is gone; get_session waits on it
+        self._deleting = {}
+        # Caches and upstream policies come from ``runtime`` (Runtime.from_env() in serve(), main's globals
+        # otherwise); the clients and actions are the server's own
+        base = runtime if runtime is not None else main.global_runtime()
+        self.runtime = base.replace(
+            async_client=openai_client,
+            async_tavily_client=tavily_client if tavily_client is not None else base.async_tavily_client,
+            answer_cache=answer_cache,
+            tools=self.tools,
+            actions=None,
+            async_actions=None,
+        )
+        os.makedirs(history_dir, exist_ok=True)
+
+    def _history_path(self, session_id: str) -> str:
+        return os.path.join(self.history_dir, f"{session_id}.jsonl")
+
+    async def get_session(self, session_id: str) -> Session:
+        """Return the session for ``session_id``, creating (and loading history for) it if needed.
+
+        Waits while the id is being deleted, so a new session never reads the history about to go.
+        """
+        if not SESSION_ID_RE.match(session_id):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid session id")
+        while session_id in self._deleting:
+            await self._deleting[session_id].wait()
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self.sessions.move_to_end(session_id)
+        else:
+            kwargs = {"model": self.model} if self.model else {}
+            agent = main.Agent(
+                self.system,
+                history_file=self._history_path(session_id),
+                runtime=self.runtime,
+                compress_after=self.compress_after,
+                **kwargs,
+            )
+            session = Session(session_id, agent)
+            self.sessions[session_id] = session
+            self._evict_idle_sessions()
+        if not session.loaded:
+            async with session.lock:
+                if not session.loaded:
+                    await asyncio.to_thread(session.agent.load_history)
+                    session.loaded = True
+        return session
+
+    def _evict_idle_sessions(self) -> None:
+        # Histories are saved every turn, so an evicted session is reloaded from disk on return
+        while len(self.sessions) > self.max_sessions:
+            oldest_id, oldest = next(iter(self.sessions.items()))
+            if oldest.lock.locked():
+                break
+            del self.sessions[oldest_id]
+
+    async def ask(self, session_id: str, question: str):
+        """Run one question through the ReAct loop for ``session_id``."""
+        session = await self.get_session(session_id)
+        async with session.lock:
+            return await main.acached_query(
+                question,
+                session.agent,
+                cache=self.answer_cache,
+                max_turns=self.max_turns,
+                action_timeout=self.action_timeout,
+                verbose=False,
+            )
+
+    async def delete_session(self, session_id: str) -> bool:
+        """Forget ``session_id`` and delete its history file; True if there was anything to delete.
+
+        Turns already waiting on the session finish (and save) first. Requests
+        arriving meanwhile wait in ``get_session`` until the file is gone, then
+        start a fresh session.
+        """
+        if not SESSION_ID_RE.match(session_id):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid session id")
+        while session_id in self._deleting:
+            await self._deleting[session_id].wait()
+        deleted = self._deleting[session_id] = asyncio.Event()
+        try:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return await asyncio.to_thread(_remove, self._history_path(session_id))
+            async with session.lock:
+                self.sessions.pop(session_id, None)
+                await asyncio.to_thread(_remove, self._history_path(session_id))
+            return True
+        finally:
+            del self._deleting[session_id]
+            deleted.set()
+
+    async def dispatch(self, method: str, path: str, body: bytes):
+        """Route one request; returns ``(status, payload)``."""
+        parts = [p for p in path.split("?", 1)[0].split("/") if p]
+        if parts == ["health"] and method == "GET":
+            return HTTPStatus.OK, {"status": "ok", "sessions": len(self.sessions)}
+        if parts == ["metrics"] and method == "GET":
+            return HTTPStatus.OK, {
+                "openrouter": self.runtime.openrouter_upstream.stats(),
+                "tavily": self.runtime.tavily_upstream.stats(),
+            }
+        if len(parts) >= 2 and parts[0] == "sessions":
+            session_id = parts[1]
+            if parts[2:] == ["messages"] and method == "POST":
+                try:
+                    question = json.loads(body or b"{}").get("question", "")
+                except (ValueError, AttributeError):
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+                if not isinstance(question, str) or not question.strip():
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "Missing 'question'")
+                answer = await self.ask(session_id, question.strip())
+                return HTTPStatus.OK, {"session_id": session_id, "answer": answer}
+            if parts[2:] == ["history"] and method == "GET":
+                session = await self.get_session(session_id)
+                return HTTPStatus.OK, {"session_id": session_id, "messages": list(session.agent.messages)}
+            if parts[2:] == [] and method == "DELETE":
+                deleted = await self.delete_session(session_id)
+                return HTTPStatus.OK, {"session_id": session_id, "deleted": deleted}
+        raise HTTPError(HTTPStatus.NOT_FOUND, "Not found")
+
+    async def handle_connection(self, reader, writer) -> None:
+        """Serve HTTP/1.1 requests on one connection, honouring keep-alive."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    if length > MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.dispatch(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except Exception as e:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000):
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def serve(
+    host: str,
+    port: int,
+    history_dir: str,
+    max_sessions: int,
+    answer_cache_path: str = None,
+    tools: bool = False,
+    compress_after: int = None,
+) -> None:
+    # Pooled async clients, the search cache, knowledge index and rate-limited upstreams, all from the environment
+    answer_cache = AnswerCache(answer_cache_path) if answer_cache_path else None
+    runtime = Runtime.from_env(answer_cache=answer_cache, tools=main.tools if tools else None)
+    advisor = AdvisorServer(
+        runtime.async_client,
+        runtime.async_tavily_client,
+        history_dir=history_dir,
+        max_sessions=max_sessions,
+        answer_cache=runtime.answer_cache,
+        tools=tools,
+        compress_after=compress_after,
+        runtime=runtime,
+    )
+    server = await advisor.start(host, port)
+    print(f"Serving advisor on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-session advisor HTTP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--history-dir", default="histories")
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--answer-cache", help="SQLite file for cached answers to repeated questions (off by default)")
+    parser.add_argument("--tools", action="store_true", help="offer actions as native tool calls")
+    parser.add_argument(
+        "--compress-after", type=int, help="zlib-compress in-memory messages older than the last N (off by default)"
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(
+            serve(
+                args.host,
+                args.port,
+                args.history_dir,
+                args.max_sessions,
+                args.answer_cache,
+                args.tools,
+                args.compress_after,
+            )
+        )
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
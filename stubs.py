@@ -0,0 +1,122 @@
+"""Local stand-ins for the OpenRouter and Tavily clients.
+
+They implement just the client surface the advisor uses
+(``chat.completions.create`` and ``search``) and never touch the network, so
+pipelines can be run end-to-end offline. The stub model follows the prompt
+contract: it searches once for the question, then answers citing the first
+result.
+
+The replay clients serve a recorded transcript instead (see
+``fixtures/transcripts``). Each call adds the recorded latency to
+``simulated_seconds`` rather than sleeping, so runs stay deterministic and
+fast; pass ``sleep=time.sleep`` to actually wait.
+"""
+
+import json
+import os
+from types import SimpleNamespace
+
+from search_cache import normalise_query
+
+
+def _completion(content: str):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=None,
+    )
+
+
+class _StubCompletions:
+    def create(self, model, messages, temperature=None, **kwargs):
+        last = messages[-1]["content"]
+        if last.startswith("Observation"):
+            observation = last.split(":", 1)[1].strip()
+            first_line = observation.splitlines()[0] if observation else "no results"
+            return _completion(f"Answer: Based on the search results, start with {first_line}")
+        question = " ".join(last.split()[:12])
+        return _completion(f"Thought: I should search for current information.\nAction: search: {question}\nPAUSE")
+
+
+class StubOpenAI:
+    """Offline replacement for ``OpenAI``; ``chat.completions.create`` is deterministic."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=_StubCompletions())
+
+
+class StubTavilyClient:
+    """Offline replacement for ``TavilyClient``; returns one synthetic official result per query."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, query: str, **kwargs) -> dict:
+        self.calls += 1
+        slug = "-".join(query.lower().split()[:6]) or "search"
+        return {
+            "query": query,
+            "answer": None,
+            "images": [],
+            "results": [
+                {
+                    "title": f"Example University — {query[:60]}",
+                    "url": f"https://www.example.ac.uk/{slug}",
+                    "content": "Stub result for offline runs; verify details on the official page.",
+                    "score": 0.9,
+                    "raw_content": None,
+                }
+            ],
+            "response_time": 0.0,
+        }
+
+
+class ReplayOpenAI:
+    """Replays recorded model replies in order, with a simulated per-call latency."""
+
+    def __init__(self, replies, latency: float = 0.0, sleep=None):
+        self.replies = list(replies)
+        self.latency = latency
+        self.sleep = sleep
+        self.requests = []
+        self.simulated_seconds = 0.0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        if not self.replies:
+            raise RuntimeError("replay transcript exhausted")
+        self.requests.append(messages)
+        self.simulated_seconds += self.latency
+        if self.sleep is not None:
+            self.sleep(self.latency)
+        return _completion(self.replies.pop(0))
+
+
+class ReplayTavilyClient:
+    """Serves recorded Tavily responses by (normalised) query, with a simulated latency."""
+
+    def __init__(self, responses: dict, latency: float = 0.0, sleep=None):
+        self.responses = {normalise_query(query): response for query, response in responses.items()}
+        self.latency = latency
+        self.sleep = sleep
+        self.calls = 0
+        self.simulated_seconds = 0.0
+
+    def search(self, query: str, **kwargs) -> dict:
+        self.calls += 1
+        self.simulated_seconds += self.latency
+        if self.sleep is not None:
+            self.sleep(self.latency)
+        return self.responses.get(normalise_query(query), {"query": query, "results": []})
+
+
+def load_transcript(path: str) -> dict:
+    """Load a recorded transcript, resolving its searches to the Tavily fixtures they name."""
+    with open(path, "r", encoding="utf-8") as f:
+        transcript = json.load(f)
+    tavily_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(path))), "tavily")
+    responses = {}
+    for query, fixture in transcript.get("searches", {}).items():
+        with open(os.path.join(tavily_dir, fixture), "r", encoding="utf-8") as f:
+            responses[query] = json.load(f)
+    transcript["search_responses"] = responses
+    return transcript
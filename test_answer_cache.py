@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the semantic final-answer cache and cached_query
+"""
+from datetime import datetime, timezone
+
+PROFILE = {"tawjihi": "95%", "subject": "Computer Science", "name": "Lina"}
+NOW = datetime(2025, 11, 1, tzinfo=timezone.utc).timestamp()
+
+
+def make_cache(tmp_path, now=NOW, **kwargs):
+    from answer_cache import AnswerCache
+
+    clock = [now]
+    cache = AnswerCache(str(tmp_path / "answers.db"), clock=lambda: clock[0], **kwargs)
+    return cache, clock
+
+
+def test_exact_and_similar_questions_hit(tmp_path):
+    """Rephrasings of a cached question are served; unrelated questions miss"""
+    cache, _ = make_cache(tmp_path)
+    cache.set("CS scholarships in Turkey for Tawjihi 95%?", "Türkiye Scholarships.", PROFILE)
+
+    assert cache.get("cs scholarships in turkey for tawjihi 95%", PROFILE) == "Türkiye Scholarships."
+    assert cache.get("Computer science scholarships available in Turkey with Tawjihi 95", PROFILE) is not None
+    assert cache.get("Medicine entry requirements in Jordan", PROFILE) is None
+    assert cache.stats() == {"hits": 2, "similar_hits": 1, "misses": 1, "entries": 1}
+
+
+def test_numbers_and_relevant_profile_fields_must_match(tmp_path):
+    """Different grades or profiles never share an answer; irrelevant fields are ignored"""
+    cache, _ = make_cache(tmp_path)
+    cache.set("CS scholarships in Turkey for Tawjihi 95%", "answer", PROFILE)
+
+    assert cache.get("CS scholarships in Turkey for Tawjihi 85%", PROFILE) is None
+    assert cache.get("CS scholarships in Turkey for Tawjihi 95%", {**PROFILE, "subject": "Medicine"}) is None
+    assert cache.get("CS scholarships in Turkey for Tawjihi 95%", {**PROFILE, "name": "Omar"}) == "answer"
+
+
+def test_negated_questions_never_share_an_answer(tmp_path):
+    """"require" and "do not require" (or "don't") are different questions however similar the wording"""
+    cache, _ = make_cache(tmp_path)
+    cache.set("Which UK universities require IELTS for Computer Science 2027?", "IELTS list", PROFILE)
+
+    assert cache.get("Which UK universities do not require IELTS for Computer Science 2027?", PROFILE) is None
+    assert cache.get("Which UK universities don't require IELTS for Computer Science 2027?", PROFILE) is None
+    assert cache.get("Which universities in the UK require IELTS for Computer Science 2027", PROFILE) == "IELTS list"
+
+
+def test_questions_about_different_tests_or_places_never_share_an_answer(tmp_path):
+    """One differing test name, country or subject makes a different question; short questions need a closer match"""
+    cache, _ = make_cache(tmp_path)
+    cache.set("Which UK universities require IELTS for Computer Science 2027?", "IELTS list", PROFILE)
+    cache.set("UK scholarship deadlines", "deadlines", PROFILE)
+
+    assert cache.get("Which UK universities require TOEFL for Computer Science 2027?", PROFILE) is None
+    assert cache.get("Which Irish universities require IELTS for Computer Science 2027?", PROFILE) is None
+    assert cache.get("Which UK universities require IELTS for Medicine 2027?", PROFILE) is None
+    assert cache.get("UK scholarship deadline dates", PROFILE) is None
+    assert cache.get("uk scholarships deadline", PROFILE) == "deadlines"
+
+
+def test_answers_expire_when_their_intake_starts(tmp_path):
+    """TTL is capped at the start of the intake year, and intake years are kept apart"""
+    cache, clock = make_cache(tmp_path, ttl=365 * 24 * 3600)
+    cache.set("Scholarships in the UK for 2026 entry", "for 2026", PROFILE)
+    cache.set("Scholarships in the UK", "next intake", PROFILE)
+
+    assert cache.get("Scholarships in the UK for 2027 entry", PROFILE) is None
+    assert cache.get("Scholarships in the UK", {**PROFILE, "intake": "2027"}) is None
+    clock[0] = datetime(2026, 9, 2, tzinfo=timezone.utc).timestamp()
+    assert cache.get("Scholarships in the UK for 2026 entry", PROFILE) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_and_persistence(tmp_path):
+    """The cache keeps at most max_entries and its index is rebuilt from disk"""
+    from answer_cache import AnswerCache
+
+    cache, clock = make_cache(tmp_path, max_entries=2)
+    for country in ["Turkey", "Germany", "Malaysia"]:
+        clock[0] += 1
+        cache.set(f"Engineering scholarships in {country}", country, PROFILE)
+    cache.close()
+
+    reopened = AnswerCache(str(tmp_path / "answers.db"), clock=lambda: clock[0])
+    assert reopened.get("Engineering scholarships in Turkey", PROFILE) is None
+    assert reopened.get("engineering scholarships, Malaysia", PROFILE) == "Malaysia"
+
+
+def test_cached_query_skips_the_react_loop(tmp_path):
+    """A repeated opening question is answered without calling the model"""
+    import main
+
+    cache, _ = make_cache(tmp_path)
+    calls = []
+
+    class FakeAgent:
+        def __init__(self):
+            self.messages = [{"role": "system", "content": "rules"}]
+
+        def __call__(self, message):
+            calls.append(message)
+            return "Answer: Apply to the Türkiye Scholarships."
+
+        def save_history(self):
+            pass
+
+    first = main.cached_query("CS scholarships Turkey", FakeAgent(), PROFILE, cache=cache, verbose=False)
+    second_agent = FakeAgent()
+    second = main.cached_query("cs scholarships in Turkey", second_agent, PROFILE, cache=cache, verbose=False)
+
+    assert first == second == "Apply to the Türkiye Scholarships."
+    assert len(calls) == 1
+    assert second_agent.messages[-1] == {"role": "assistant", "content": "Answer: Apply to the Türkiye Scholarships."}
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tests for the async ReAct loop (aquery / Agent.aexecute) using fake clients
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+
+class FakeAsyncCompletions:
+    """Returns canned responses in order, like AsyncOpenAI().chat.completions"""
+
+    def __init__(self, responses):
+        self._responses = list(responses)
+        self.requests = []
+
+    async def create(self, model, temperature, messages):
+        self.requests.append([dict(m) for m in messages])
+        content = self._responses.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def fake_async_client(responses):
+    completions = FakeAsyncCompletions(responses)
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions)), completions
+
+
+def make_agent(system="system prompt", model="test-model"):
+    from main import Agent
+
+    agent = Agent(system, model=model)
+    agent.save_history = lambda filename="history.json": None
+    return agent
+
+
+def test_aexecute_uses_async_client():
+    """Agent.acall sends the conversation through the async client"""
+    import main
+
+    fake, completions = fake_async_client(["Answer: hello"])
+    original = main.async_client
+    try:
+        main.async_client = fake
+        agent = make_agent()
+        result = asyncio.run(agent.acall("Hi"))
+    finally:
+        main.async_client = original
+
+    assert result == "Answer: hello"
+    assert completions.requests[0][-1] == {"role": "user", "content": "Hi"}
+    assert agent.messages[-1] == {"role": "assistant", "content": "Answer: hello"}
+
+
+def test_gemma_folding_does_not_mutate_history():
+    """The Gemma system-prompt folding works on a copy of the first user message"""
+    agent = make_agent(model="google/gemma-3-27b-it:free")
+    agent.messages.append({"role": "user", "content": "Hi"})
+
+    messages = agent._request_messages()
+
+    assert messages[0]["content"] == "SYSTEM: system prompt\n\nUSER: Hi"
+    assert agent.messages[1]["content"] == "Hi"
+
+
+def test_aquery_runs_actions_concurrently():
+    """All actions in a turn are dispatched together and their observations combined"""
+    import main
+
+    async def slow_search(query):
+        await asyncio.sleep(0.2)
+        return {"results": [{"title": query}]}
+
+    fake, completions = fake_async_client(
+        [
+            "Thought: two searches\nAction: search: CS Turkey\nAction: search: CS Germany\nPAUSE",
+            "Answer: Apply to both.",
+        ]
+    )
+    original_client = main.async_client
+    original_search = main.async_known_actions["search"]
+    try:
+        main.async_client = fake
+        main.async_known_actions["search"] = slow_search
+        start = time.perf_counter()
+        answer = asyncio.run(main.aquery("Where can I study CS?", make_agent(), max_turns=3))
+        elapsed = time.perf_counter() - start
+    finally:
+        main.async_client = original_client
+        main.async_known_actions["search"] = original_search
+
+    assert answer == "Apply to both."
+    assert elapsed < 0.35
+    observation = completions.requests[1][-1]["content"]
+    assert "Observation 1 (search: CS Turkey)" in observation
+    assert "Observation 2 (search: CS Germany)" in observation
+
+
+def test_aquery_action_timeout():
+    """An action exceeding its timeout becomes an error observation instead of hanging"""
+    import main
+
+    async def hanging_search(query):
+        await asyncio.sleep(10)
+
+    fake, completions = fake_async_client(
+        ["Action: search: anything\nPAUSE", "Answer: Search was unavailable."]
+    )
+    original_client = main.async_client
+    original_search = main.async_known_actions["search"]
+    try:
+        main.async_client = fake
+        main.async_known_actions["search"] = hanging_search
+        answer = asyncio.run(main.aquery("Q?", make_agent(), action_timeout=0.05))
+    finally:
+        main.async_client = original_client
+        main.async_known_actions["search"] = original_search
+
+    assert answer == "Search was unavailable."
+    assert "timed out" in completions.requests[1][-1]["content"]
+
+
+def test_aquery_sync_action_runs_in_thread():
+    """Sync actions such as calculate are still usable from aquery"""
+    import main
+
+    fake, completions = fake_async_client(["Action: calculate: (48 + 40 + 32)\nPAUSE", "Answer: 120 points."])
+    original = main.async_client
+    try:
+        main.async_client = fake
+        answer = asyncio.run(main.aquery("UCAS for ABC?", make_agent()))
+    finally:
+        main.async_client = original
+
+    assert answer == "120 points."
+    assert completions.requests[1][-1]["content"] == "Observation: 120.0"
+
+
+def test_aquery_unknown_action_is_reported_to_the_model():
+    """An unknown action goes back as an error observation instead of ending the session"""
+    import main
+
+    fake, completions = fake_async_client(["Action: fly: to the moon\nPAUSE", "Answer: I can only search and calculate."])
+    original = main.async_client
+    try:
+        main.async_client = fake
+        answer = asyncio.run(main.aquery("Q?", make_agent(), verbose=False))
+    finally:
+        main.async_client = original
+
+    assert answer == "I can only search and calculate."
+    assert completions.requests[1][-1]["content"].startswith("Observation: Error: unknown action fly")
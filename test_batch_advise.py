@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline cohort batch-advising pipeline, run against local stub clients
+"""
+import json
+
+
+def write_cohort(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            record = {
+                "id": f"s-{i:03d}",
+                "question": f"Which Computer Science scholarships suit me? ({i})",
+                "profile": {"tawjihi": "95%", "target_countries": "UK, Turkey"},
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def stub_runner(tmp_path, openai_client=None, **kwargs):
+    import main
+    from batch_advise import BatchRunner
+    from stubs import StubOpenAI, StubTavilyClient
+
+    main.tavily_client = StubTavilyClient()
+    return BatchRunner(
+        openai_client or StubOpenAI(),
+        llm_rate=1000,
+        search_rate=1000,
+        history_dir=str(tmp_path / "histories"),
+        **kwargs,
+    )
+
+
+def test_batch_end_to_end_with_stubs(tmp_path):
+    """Every record gets an answer line, and its session history is saved"""
+    import main
+
+    cohort, output = tmp_path / "cohort.jsonl", tmp_path / "results.jsonl"
+    write_cohort(cohort, 25)
+    original = main.tavily_client
+    try:
+        summary = stub_runner(tmp_path, workers=4).run(str(cohort), str(output))
+    finally:
+        main.tavily_client = original
+
+    results = read_results(output)
+    assert summary == {"skipped": 0, "ok": 25, "no_answer": 0, "error": 0}
+    assert sorted(r["id"] for r in results) == [f"s-{i:03d}" for i in range(25)]
+    assert all("example.ac.uk" in r["answer"] for r in results)
+    assert (tmp_path / "histories" / "s-007.jsonl").exists()
+
+
+def test_batch_resumes_from_checkpoint(tmp_path):
+    """Records already answered in the output file are skipped on the next run"""
+    import main
+
+    cohort, output = tmp_path / "cohort.jsonl", tmp_path / "results.jsonl"
+    write_cohort(cohort, 6)
+    output.write_text(
+        json.dumps({"id": "s-000", "status": "ok", "answer": "done"}) + "\n"
+        + json.dumps({"id": "s-001", "status": "error", "error": "timeout"}) + "\n"
+        + '{"id": "s-002", "sta',
+        encoding="utf-8",
+    )
+    original = main.tavily_client
+    try:
+        summary = stub_runner(tmp_path, workers=2).run(str(cohort), str(output))
+    finally:
+        main.tavily_client = original
+
+    assert summary["skipped"] == 1
+    assert summary["ok"] == 5
+
+
+def test_errors_are_recorded_not_raised(tmp_path):
+    """A failing session is written as an error result and the batch carries on"""
+    import main
+    from stubs import StubOpenAI
+
+    class FlakyOpenAI(StubOpenAI):
+        def __init__(self):
+            super().__init__()
+            create = self.chat.completions.create
+
+            def flaky_create(model, messages, **kwargs):
+                if "(3)" in messages[1]["content"]:
+                    raise RuntimeError("429 Too Many Requests")
+                return create(model=model, messages=messages, **kwargs)
+
+            self.chat.completions.create = flaky_create
+
+    cohort, output = tmp_path / "cohort.jsonl", tmp_path / "results.jsonl"
+    write_cohort(cohort, 5)
+    original = main.tavily_client
+    try:
+        summary = stub_runner(tmp_path, FlakyOpenAI(), workers=3).run(str(cohort), str(output))
+    finally:
+        main.tavily_client = original
+
+    errors = [r for r in read_results(output) if r["status"] == "error"]
+    assert summary["error"] == 1 and summary["ok"] == 4
+    assert errors[0]["id"] == "s-003" and "429" in errors[0]["error"]
+
+
+def test_prefetch_warms_searches_from_each_profile(tmp_path):
+    """With prefetch on, each record's profile starts background searches and the batch still completes"""
+    import main
+
+    cohort, output = tmp_path / "cohort.jsonl", tmp_path / "results.jsonl"
+    with open(cohort, "w", encoding="utf-8") as f:
+        for i in range(3):
+            record = {"id": f"s-{i}", "question": "CS scholarships?", "profile": {"subject": "CS", "countries": "UK"}}
+            f.write(json.dumps(record) + "\n")
+    original = main.tavily_client
+    try:
+        runner = stub_runner(tmp_path, workers=2, prefetch=True)
+        summary = runner.run(str(cohort), str(output))
+        runner.prefetcher.wait()
+    finally:
+        main.tavily_client = original
+
+    assert summary["ok"] == 3
+    assert runner.prefetcher.stats()["started"] >= 2 and runner.prefetcher.stats()["failed"] == 0
+
+
+def test_prefetch_skips_cached_students_and_stops_with_the_run(tmp_path):
+    """Students answered from the answer cache start no searches, and the prefetch pool is shut down afterwards"""
+    import pytest
+
+    import main
+    from answer_cache import AnswerCache
+
+    cohort, output = tmp_path / "cohort.jsonl", tmp_path / "results.jsonl"
+    profile = {"subject": "CS", "countries": "UK"}
+    with open(cohort, "w", encoding="utf-8") as f:
+        for i in range(3):
+            f.write(json.dumps({"id": f"s-{i}", "question": "CS scholarships?", "profile": profile}) + "\n")
+    cache = AnswerCache(str(tmp_path / "answers.db"))
+    cache.set("CS scholarships?", "Chevening covers CS.", profile)
+    original = main.tavily_client
+    try:
+        runner = stub_runner(tmp_path, workers=2, prefetch=True, answer_cache=cache)
+        summary = runner.run(str(cohort), str(output))
+    finally:
+        main.tavily_client = original
+        cache.close()
+
+    assert summary["ok"] == 3 and runner.prefetcher.stats()["started"] == 0
+    with pytest.raises(RuntimeError):
+        runner.prefetcher.prefetch(["CS scholarships UK"])
+
+
+def test_lookup_falling_back_to_a_search_takes_a_search_token(tmp_path, monkeypatch):
+    """A lookup the local index cannot answer searches Tavily through the --search-rate bucket"""
+    import batch_advise
+    import main
+    from rate_limit import TokenBucket
+    from stubs import ReplayOpenAI, StubTavilyClient
+
+    acquired = []
+
+    class CountingBucket(TokenBucket):
+        def acquire(self):
+            acquired.append(self.rate)
+            return super().acquire()
+
+    monkeypatch.setattr(batch_advise, "TokenBucket", CountingBucket)
+    monkeypatch.setattr(main, "search_cache", None)
+    monkeypatch.setattr(main, "knowledge_index", None)
+    cohort, output = tmp_path / "cohort.jsonl", tmp_path / "results.jsonl"
+    cohort.write_text(json.dumps({"id": "s-0", "question": "DAAD scholarships?"}) + "\n", encoding="utf-8")
+    openai_client = ReplayOpenAI(["Thought: check\nAction: lookup: DAAD Germany\nPAUSE", "Answer: Apply to DAAD."])
+    tavily_client = StubTavilyClient()
+    monkeypatch.setattr(main, "tavily_client", tavily_client)
+    runner = batch_advise.BatchRunner(
+        openai_client, llm_rate=1000, search_rate=500, history_dir=str(tmp_path / "histories")
+    )
+    summary = runner.run(str(cohort), str(output))
+
+    assert summary["ok"] == 1 and tavily_client.calls == 1
+    assert acquired.count(500) == 1 and acquired.count(1000) == 2
+
+
+def test_token_bucket_limits_rate():
+    """The token bucket allows a burst up to capacity, then waits for refills"""
+    from rate_limit import TokenBucket
+
+    now = [0.0]
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+    assert bucket.acquire() == 0 and bucket.acquire() == 0
+    assert bucket.try_acquire() is False
+    assert bucket.acquire() == 0.5
+    assert slept == [0.5]
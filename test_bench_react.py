@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Tests for the recorded-transcript ReAct benchmark harness
+"""
+
+
+def test_replayed_transcripts_match_baseline_counts():
+    """Replaying the transcripts makes exactly the baseline number of calls and tokens"""
+    import json
+
+    from benchmarks import bench_react
+
+    metrics, report = bench_react.run_all(runs=1)
+    with open(bench_react.DEFAULT_BASELINE, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    counts = {name: m for name, m in baseline.items() if m["kind"] == "count"}
+    assert counts and bench_react.compare(metrics, counts) == []
+    assert report["queries"] == len(bench_react.load_transcripts())
+    assert {"query", "model.call", "action", "history.save"} <= set(report["stages"])
+
+
+def test_compare_flags_regressions():
+    """Counts may not grow at all; timings may grow only within the tolerance"""
+    from benchmarks.bench_react import compare
+
+    baseline = {
+        "query.model_calls": {"value": 9, "kind": "count"},
+        "execute_ms": {"value": 1.0, "kind": "time"},
+    }
+    assert compare({"query.model_calls": {"value": 9}, "execute_ms": {"value": 1.4}}, baseline, 0.5) == []
+    failures = compare({"query.model_calls": {"value": 10}, "execute_ms": {"value": 1.6}}, baseline, 0.5)
+    assert len(failures) == 2 and failures[0].startswith("query.model_calls")
+    assert compare({}, baseline) == ["query.model_calls: missing from this run", "execute_ms: missing from this run"]
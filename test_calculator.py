@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled calculator engine behind safe_calculate
+"""
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("2 + 3 * 4", 14.0),
+        ("(2 + 3) * 4", 20.0),
+        ("10 - 4 - 3", 3.0),
+        ("100 / 10 / 5", 2.0),
+        ("-5 + 3", -2.0),
+        ("2 * -3", -6.0),
+        ("-(4 + 6) / 2", -5.0),
+        ("((48 + 40) + (32))", 120.0),
+        ("--2", 2.0),
+        (".5 + 1.", 1.5),
+    ],
+)
+def test_evaluate(expression, expected):
+    """Precedence, associativity, unary minus and nesting are handled"""
+    from calculator import evaluate
+
+    assert evaluate(expression) == expected
+
+
+@pytest.mark.parametrize(
+    "expression, message",
+    [
+        ("1 / 0", "Division by zero"),
+        ("(1 + 2", "Mismatched parentheses"),
+        ("1 + 2)", "Mismatched parentheses"),
+        ("", "Empty expression"),
+        ("2 +", "Unexpected end of expression"),
+        ("2 3", "Unexpected number"),
+        ("2 ^ 3", "Unexpected character"),
+    ],
+)
+def test_errors(expression, message):
+    """Malformed expressions raise ValueError with a readable message"""
+    from calculator import evaluate
+
+    with pytest.raises(ValueError, match=message):
+        evaluate(expression)
+
+
+def test_decimal_mode_is_exact():
+    """Decimal mode avoids float rounding for fees and budgets"""
+    from calculator import evaluate
+
+    assert evaluate("0.1 + 0.2") != 0.3
+    assert evaluate("0.1 + 0.2", use_decimal=True) == Decimal("0.3")
+
+
+def test_compiled_expressions_are_cached():
+    """Compiling the same expression twice reuses the cached program"""
+    from calculator import compile_expression
+
+    assert compile_expression("(9250 + 1200) * 3") is compile_expression("(9250 + 1200) * 3")
+
+
+def test_safe_calculate_uses_engine():
+    """safe_calculate keeps its error reporting and gains unary minus and Decimal mode"""
+    from main import safe_calculate
+
+    assert safe_calculate("-5 + 10") == 5.0
+    assert safe_calculate("12,500.10 - 0.10", use_decimal=True) == Decimal("12500.00")
+    assert safe_calculate("1 / 0") == "Error calculating: Division by zero"
+    assert safe_calculate("2 ** 3").startswith("Error calculating:")
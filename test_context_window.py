@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for token-budgeted context window management
+"""
+
+
+def build_history(turns, observation_size=4000):
+    messages = [
+        {"role": "system", "content": "S" * 400},
+        {"role": "user", "content": "I have 95% in Tawjihi. Which CS programmes?"},
+    ]
+    for n in range(turns):
+        messages.append({"role": "assistant", "content": f"Thought: step {n}\nAction: search: q{n}\nPAUSE"})
+        messages.append({"role": "user", "content": f"Observation: {n} " + "x" * observation_size})
+    return messages
+
+
+def test_fit_keeps_history_intact_and_pins_prompt():
+    """Fitting never mutates the history and always keeps the system prompt and first question"""
+    from context_window import ContextWindow
+
+    messages = build_history(10)
+    snapshot = [dict(m) for m in messages]
+    fitted = ContextWindow(budget=2000).fit(messages, "any-model")
+
+    assert messages == snapshot
+    assert fitted[0] == messages[0]
+    assert fitted[1] == messages[1]
+    assert fitted[-1] is messages[-1]
+
+
+def test_old_observations_are_truncated():
+    """Observations outside the recent window are shortened; recent ones are sent whole"""
+    from context_window import ContextWindow
+
+    messages = build_history(4)
+    fitted = ContextWindow(budget=100000, keep_recent=2, observation_chars=100).fit(messages)
+
+    assert fitted[3]["content"].endswith("characters truncated]")
+    assert len(fitted[3]["content"]) < 200
+    assert fitted[-1]["content"] == messages[-1]["content"]
+    assert len(fitted) == len(messages)
+
+
+def test_budget_is_enforced_by_dropping_oldest():
+    """When truncation is not enough, the oldest unpinned messages are dropped"""
+    from context_window import ContextWindow, message_tokens
+
+    messages = build_history(30, observation_size=400)
+    window = ContextWindow(budget=1500, keep_recent=4)
+    fitted = window.fit(messages)
+
+    assert sum(message_tokens(m) for m in fitted) <= 1500
+    assert fitted[-4:] == messages[-4:]
+    assert window.stats()["last_tokens_sent"] <= 1500
+
+
+def test_per_model_budgets():
+    """Budgets are looked up per model with a default fallback"""
+    from context_window import DEFAULT_TOKEN_BUDGET, ContextWindow
+
+    window = ContextWindow(model_budgets={"small-model": 500})
+    assert window.budget_for("small-model") == 500
+    assert window.budget_for("unknown-model") == DEFAULT_TOKEN_BUDGET
+    assert ContextWindow(budget=42).budget_for("small-model") == 42
+
+
+def test_agent_reports_tokens_sent_per_turn():
+    """Agent requests go through the context window, whose metrics show the savings"""
+    from main import Agent
+
+    agent = Agent("S" * 400, model="test-model")
+    agent.messages = build_history(20)
+    sent = agent._request_messages()
+    stats = agent.context_window.stats()
+
+    assert len(sent) <= len(agent.messages)
+    assert stats["turns"] == 1
+    assert stats["tokens_saved"] > 0
+    assert list(agent.context_window.tokens_per_turn) == [stats["tokens_sent"]]
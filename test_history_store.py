@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the append-only JSONL conversation history store
+"""
+import json
+
+
+def test_sync_appends_only_new_messages(tmp_path):
+    """Each sync writes just the messages added since the previous one"""
+    from history_store import JSONLHistoryStore
+
+    path = tmp_path / "history.jsonl"
+    store = JSONLHistoryStore(str(path))
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "Hi"}]
+    store.sync(messages)
+    size_after_first = path.stat().st_size
+
+    messages.append({"role": "assistant", "content": "Answer: hello"})
+    store.sync(messages)
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == messages
+    assert path.stat().st_size - size_after_first == len(lines[-1]) + 1
+
+
+def test_shortened_history_is_compacted(tmp_path):
+    """Replacing the history with a shorter one rewrites the file"""
+    from history_store import JSONLHistoryStore
+
+    path = str(tmp_path / "history.jsonl")
+    store = JSONLHistoryStore(path)
+    store.sync([{"role": "user", "content": str(n)} for n in range(5)])
+    store.sync([{"role": "user", "content": "only"}])
+
+    assert JSONLHistoryStore(path).load() == [{"role": "user", "content": "only"}]
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    """A partially written final line from a crash does not break loading"""
+    from history_store import JSONLHistoryStore
+
+    path = tmp_path / "history.jsonl"
+    path.write_text('{"role": "user", "content": "Hi"}\n{"role": "assis', encoding="utf-8")
+
+    assert JSONLHistoryStore(str(path)).load() == [{"role": "user", "content": "Hi"}]
+
+
+def test_agent_round_trip_and_legacy_json(tmp_path):
+    """Agent persists to JSONL by default and still reads/writes legacy .json files"""
+    from main import Agent
+
+    path = str(tmp_path / "history.jsonl")
+    agent = Agent("sys", history_file=path)
+    agent.messages.append({"role": "user", "content": "مرحبا"})
+    agent.save_history()
+    agent.messages.append({"role": "assistant", "content": "Answer: hello"})
+    agent.save_history()
+
+    restored = Agent("sys", history_file=path)
+    restored.load_history()
+    assert restored.messages == agent.messages
+
+    legacy = str(tmp_path / "history.json")
+    agent.save_history(legacy)
+    from_legacy = Agent("sys")
+    from_legacy.load_history(legacy)
+    assert from_legacy.messages == agent.messages
+
+
+def test_fresh_agent_overwrites_existing_file(tmp_path):
+    """Saving without loading first replaces the file, as the legacy format did"""
+    from main import Agent
+
+    path = str(tmp_path / "history.jsonl")
+    first = Agent("sys", history_file=path)
+    first.messages.append({"role": "user", "content": "old"})
+    first.save_history()
+
+    second = Agent("sys", history_file=path)
+    second.save_history()
+
+    restored = Agent("", history_file=path)
+    restored.load_history()
+    assert restored.messages == [{"role": "system", "content": "sys"}]
+
+
+def test_long_system_prompt_is_stored_once_by_hash(tmp_path):
+    """Histories reference a shared prompt file instead of repeating the prompt inline"""
+    from history_store import JSONLHistoryStore, prompt_digest
+
+    prompt = "You are a university advisor. " * 20
+    messages = [{"role": "system", "content": prompt}, {"role": "user", "content": "Hi"}]
+    stores = [JSONLHistoryStore(str(tmp_path / f"session-{n}.jsonl")) for n in range(2)]
+    for store in stores:
+        store.sync(messages)
+
+    first_line = json.loads((tmp_path / "session-0.jsonl").read_text(encoding="utf-8").splitlines()[0])
+    assert first_line == {"role": "system", "content_ref": f"sha256:{prompt_digest(prompt)}"}
+    assert [p.name for p in (tmp_path / "prompts").iterdir()] == [f"{prompt_digest(prompt)}.txt"]
+    assert stores[0].stats()["prompt_bytes_saved"] > len(prompt) - 100
+    assert JSONLHistoryStore(str(tmp_path / "session-1.jsonl")).load() == messages
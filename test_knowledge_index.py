@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the local programme/scholarship index and the lookup action
+"""
+import json
+import os
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "tavily")
+DAY = 24 * 60 * 60
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def seeded_index(tmp_path, **kwargs):
+    from knowledge_index import KnowledgeIndex
+
+    clock = [1_800_000_000.0]
+    index = KnowledgeIndex(str(tmp_path / "index.db"), clock=lambda: clock[0], **kwargs)
+    for name in sorted(os.listdir(FIXTURES)):
+        index.harvest(load_fixture(name))
+    return index, clock
+
+
+def test_lookup_ranks_official_pages_with_freshness(tmp_path):
+    """Harvested pages are found offline, official domains first, with retrieval dates"""
+    index, clock = seeded_index(tmp_path)
+    clock[0] += 3 * DAY
+
+    results = index.lookup('Computer Science entry requirements Turkey site:*.edu.tr')
+    assert results and results[0]["official"]
+    assert all(r["retrieved"] == "2027-01-15" and r["age_days"] == 3 for r in results)
+    assert any("metu.edu.tr" in r["url"] for r in results)
+    assert index.lookup("veterinary medicine Japan") == []
+
+
+def test_duplicate_urls_are_replaced_not_duplicated(tmp_path):
+    """Re-harvesting a page updates it in place"""
+    index, _ = seeded_index(tmp_path)
+    pages = index.stats()["pages"]
+    index.harvest(load_fixture("daad_germany.json"))
+    assert index.stats()["pages"] == pages
+
+
+def test_stale_pages_are_not_served_and_can_be_refreshed(tmp_path):
+    """Expired pages are skipped until refresh re-runs the searches that found them"""
+    index, clock = seeded_index(tmp_path, ttl=10 * DAY)
+    clock[0] += 11 * DAY
+    assert index.lookup("DAAD scholarships Germany") == []
+    assert len(index.stale_queries()) == 3
+
+    searched = []
+
+    def search(query):
+        searched.append(query)
+        return load_fixture("daad_germany.json") if "DAAD" in query else {"results": []}
+
+    assert index.refresh(search) == 4
+    assert len(searched) == 3
+    assert index.lookup("DAAD scholarships Germany")[0]["retrieved"] == "2027-01-26"
+
+
+def test_lookup_action_prefers_index_then_falls_back_to_search(tmp_path):
+    """The lookup action answers locally when it can and harvests live results otherwise"""
+    import main
+
+    index, _ = seeded_index(tmp_path)
+    searches = []
+
+    class FakeTavily:
+        def search(self, query):
+            searches.append(query)
+            return {"query": query, "results": [{"title": "Vet school", "url": "https://vet.ac.jp/", "content": "Veterinary medicine in Japan"}]}
+
+    saved = (main.knowledge_index, main.tavily_client, main.search_cache)
+    main.knowledge_index, main.tavily_client, main.search_cache = index, FakeTavily(), None
+    try:
+        local = main.known_actions["lookup"]("DAAD scholarships Germany")
+        live = main.known_actions["lookup"]("veterinary medicine Japan")
+        again = main.known_actions["lookup"]("veterinary medicine Japan")
+    finally:
+        main.knowledge_index, main.tavily_client, main.search_cache = saved
+
+    assert local["source"] == "local index" and searches == ["veterinary medicine Japan"]
+    assert "source" not in live and again["source"] == "local index"
+    assert "(retrieved " in main.shape_observation("lookup", local)
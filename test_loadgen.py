@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for the record/replay/synthetic backends and the load generator
+"""
+import os
+
+TRANSCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "transcripts", "germany_daad.json")
+
+
+def test_latency_specs():
+    """Fixed, uniform and lognormal specs parse and sample in range; malformed specs are rejected"""
+    import pytest
+
+    from backends import Latency
+
+    assert Latency.parse("0.8").sample() == 0.8 == Latency.parse("fixed:0.8").sample()
+    uniform = Latency.parse("uniform:0.5,1.5", seed=1)
+    assert all(0.5 <= uniform.sample() <= 1.5 for _ in range(100))
+    lognormal = Latency.parse("lognormal:1.2,0.5", seed=1)
+    samples = sorted(lognormal.sample() for _ in range(1001))
+    assert 1.0 < samples[500] < 1.4 and samples[-1] > 2.4
+    for spec in ("uniform:1", "gamma:1,2", "fast"):
+        with pytest.raises(ValueError):
+            Latency.parse(spec)
+
+
+def test_latency_parameters_must_be_positive(capsys):
+    """Negative, infinite or out-of-order parameters and a zero lognormal median fail at parse time, not mid-run"""
+    import pytest
+
+    from backends import Latency
+    from loadgen import main_cli
+
+    for spec in ("-0.5", "uniform:-1,1", "uniform:2,1", "lognormal:0,0.5", "lognormal:1,-0.5", "fixed:inf", "nan"):
+        with pytest.raises(ValueError):
+            Latency.parse(spec)
+    assert Latency.parse("lognormal:1.2,0", seed=1).sample() == pytest.approx(1.2)
+    with pytest.raises(SystemExit):
+        main_cli(["--model-latency", "lognormal:0,0.5"])
+    assert "median above zero" in capsys.readouterr().err
+
+
+def test_model_and_search_latencies_get_their_own_seeds(monkeypatch):
+    """One --seed still gives the model and search distributions different draws"""
+    import pytest
+
+    import loadgen
+
+    created = []
+
+    def record_clients(backend, recording, model_latency, search_latency, time_scale):
+        created.extend([model_latency, search_latency])
+        raise SystemExit
+
+    monkeypatch.setattr(loadgen, "create_backend_clients", record_clients)
+    with pytest.raises(SystemExit):
+        loadgen.main_cli(["--model-latency", "uniform:0,1", "--search-latency", "uniform:0,1", "--seed", "7"])
+    model, search = created
+    assert [model.sample() for _ in range(3)] != [search.sample() for _ in range(3)]
+
+
+def test_recorded_exchanges_replay_with_their_latencies(tmp_path):
+    """A recording made through query() is served back from disk, waiting as long as each call took"""
+    import main
+    from backends import RecordedOpenAI, RecordedTavilyClient, Recording
+    from loadgen import offline_runtime, record_transcripts
+    from stubs import load_transcript
+
+    path = str(tmp_path / "recording.jsonl")
+    recording = Recording(path)
+    record_transcripts([TRANSCRIPT], recording)
+    recording.close()
+
+    transcript = load_transcript(TRANSCRIPT)
+    waits = []
+    replayed = Recording(path)
+    openai_client = RecordedOpenAI(replayed, sleep=waits.append)
+    tavily_client = RecordedTavilyClient(replayed, sleep=waits.append)
+    runtime = offline_runtime(openai_client, tavily_client)
+    agent = main.Agent(main.prompt, history_file=str(tmp_path / "h.jsonl"), runtime=runtime)
+
+    answer = main.query(transcript["question"], agent, verbose=False)
+    assert answer == transcript["replies"][-1].split("Answer: ", 1)[1]
+    assert openai_client.misses == tavily_client.misses == 0
+    assert sorted(set(waits)) == [transcript["search_latency"], transcript["model_latency"]]
+
+    # A conversation that was never recorded is answered by the synthetic stubs instead
+    agent = main.Agent(main.prompt, history_file=str(tmp_path / "h2.jsonl"), runtime=runtime)
+    assert "example.ac.uk" in main.query("Which universities in Jordan teach nursing?", agent, verbose=False)
+    assert openai_client.misses == 2 and tavily_client.misses == 1
+
+
+def test_offline_backends_stream_each_reply_as_one_chunk(tmp_path):
+    """query(stream=True) runs on the synthetic backend, each reply arriving whole after its latency"""
+    import main
+    from backends import create_backend_clients
+    from loadgen import offline_runtime
+
+    runtime = offline_runtime(*create_backend_clients("synthetic"))
+    agent = main.Agent(main.prompt, history_file=str(tmp_path / "h.jsonl"), runtime=runtime)
+    answer = main.query("Which universities in Jordan teach nursing?", agent, verbose=False, stream=True)
+    assert "example.ac.uk" in answer
+
+
+def test_recorded_seconds_are_a_stubs_simulated_latency(tmp_path):
+    """Recording a stub stores the latency it simulates, not that plus any real sleep or bookkeeping"""
+    import time
+
+    from backends import RecordingTavilyClient, Recording
+    from stubs import ReplayTavilyClient
+
+    recording = Recording()
+    inner = ReplayTavilyClient({"daad germany": {"results": []}}, latency=0.02, sleep=time.sleep)
+    RecordingTavilyClient(inner, recording).search("DAAD Germany")
+    assert [record["seconds"] for record in recording.searches.values()] == [0.02]
+
+
+def test_load_generator_reports_throughput_and_percentiles(capsys):
+    """Concurrent synthetic students all get answers, and the summary carries throughput and p50/p95/p99"""
+    from loadgen import main_cli
+
+    summary = main_cli(["--students", "8", "--questions-per-student", "2", "--time-scale", "0.001", "--seed", "3"])
+    assert summary["questions"] == summary["answered"] == 16
+    assert summary["model_calls"] == 32 and summary["search_calls"] == 16
+    assert summary["throughput_qps"] > 0 and 0 < summary["p50_s"] <= summary["p95_s"] <= summary["p99_s"]
+    assert "16 questions from 8 students on the synthetic backend" in capsys.readouterr().out
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the compact in-memory message store
+"""
+
+
+def test_store_behaves_like_a_list_of_dicts():
+    """Append, extend, index, slice, delete and compare exactly as the list Agent used to hold"""
+    import json
+
+    from message_store import MessageStore
+
+    messages = [
+        {"role": "system", "content": "rules"},
+        {"role": "user", "content": "Hi"},
+        {
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [{"id": "c1", "type": "function", "function": {"name": "calculate", "arguments": "48 + 40"}}],
+        },
+        {"role": "tool", "tool_call_id": "c1", "content": "88.0"},
+    ]
+    store = MessageStore(messages[:2])
+    store.extend(messages[2:])
+    assert store == messages and len(store) == 4
+    assert store[-1] == messages[-1] and store[1:3] == messages[1:3]
+    assert json.loads(json.dumps(list(store))) == messages
+
+    del store[-2:]
+    store.append({"role": "assistant", "content": "Answer: hi"})
+    store[1] = {"role": "user", "content": "Hello"}
+    assert [m["content"] for m in store] == ["rules", "Hello", "Answer: hi"]
+    assert store != messages
+
+
+def test_long_contents_are_shared_across_sessions():
+    """The same system prompt or observation in two sessions is held once, and freed with the last session"""
+    import gc
+    import json
+
+    from message_store import MessageStore, shared_stats
+
+    prompt = "You are an advisor. " * 50
+    observation = "Observation: DAAD scholarship deadlines are in October. " * 10
+    messages = [{"role": "system", "content": prompt}, {"role": "user", "content": observation}]
+    # Decoded separately, as histories loaded from disk or replies received from an API are
+    first = MessageStore(json.loads(json.dumps(messages)))
+    second = MessageStore(json.loads(json.dumps(messages)))
+    before = shared_stats()["contents"]
+    assert first._records[0].body is second._records[0].body
+    assert first._records[1].body is second._records[1].body
+
+    del first, second
+    gc.collect()
+    assert shared_stats()["contents"] <= before - 2
+
+
+def test_cold_turns_are_compressed_and_read_back(tmp_path):
+    """With compress_after, older unique turns are stored compressed; the agent still sees and saves them intact"""
+    from main import Agent
+    from history_store import JSONLHistoryStore
+
+    agent = Agent("rules", history_file=str(tmp_path / "history.jsonl"), compress_after=2)
+    turns = [f"Observation: result {n} " + "Tawjihi 95% accepted. " * 20 for n in range(4)]
+    for turn in turns:
+        agent.messages.append({"role": "user", "content": turn})
+    records = agent.messages._records
+
+    assert [type(record.body).__name__ for record in records] == ["str", "_Shared", "_Packed", "_Shared", "_Shared"]
+    assert [m["content"] for m in agent.messages] == ["rules"] + turns
+    agent.save_history()
+    assert JSONLHistoryStore(agent.history_file).load() == agent.messages
+
+
+def test_context_window_decodes_only_what_it_sends(monkeypatch):
+    """fit() over a store gives what it gives over a list, reading back only the messages within budget"""
+    import message_store
+    from context_window import ContextWindow
+    from message_store import MessageStore
+
+    messages = [{"role": "system", "content": "rules"}, {"role": "user", "content": "Budget?"}]
+    for n in range(40):
+        messages.append({"role": "assistant", "content": f"Thought: step {n}\nAction: search: fees {n}\nPAUSE"})
+        messages.append({"role": "user", "content": f"Observation: fees {n} " + "€9,000 a year. " * 60})
+    store = MessageStore(messages, compress_after=4)
+
+    decoded = []
+    decode = message_store._decode
+    monkeypatch.setattr(message_store, "_decode", lambda record: decoded.append(record) or decode(record))
+    fitted = ContextWindow(budget=3000).fit(store)
+    assert fitted == ContextWindow(budget=3000).fit(messages)
+    assert len(fitted) < len(messages) // 2 and len(decoded) <= len(fitted) + 1
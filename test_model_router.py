@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Tests for latency-aware model routing, fallback and hedging using fake clients
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+
+class LatencyCompletions:
+    """Fake chat.completions whose per-model latency and failures are scripted"""
+
+    def __init__(self, latencies, failing=()):
+        self.latencies = latencies
+        self.failing = set(failing)
+        self.calls = []
+
+    def create(self, model, messages, **kwargs):
+        self.calls.append((model, messages))
+        time.sleep(self.latencies.get(model, 0))
+        if model in self.failing:
+            raise RuntimeError(f"{model} unavailable")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"Answer: {model}"))])
+
+
+def fake_client(latencies, failing=()):
+    completions = LatencyCompletions(latencies, failing)
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions)), completions
+
+
+def test_adapters_fold_system_prompt_for_gemma_only():
+    """Gemma models get the system prompt folded into the first user turn"""
+    from model_router import adapt_messages
+
+    messages = [{"role": "system", "content": "rules"}, {"role": "user", "content": "hi"}]
+    folded = adapt_messages("google/gemma-3-27b-it:free", messages)
+    assert folded == [{"role": "user", "content": "SYSTEM: rules\n\nUSER: hi"}]
+    assert adapt_messages("deepseek/deepseek-r1-0528-qwen3-8b:free", messages) is messages
+    assert messages[0]["role"] == "system"
+
+
+def test_anthropic_and_gemini_system_prompts_are_marked_cacheable():
+    """The system prompt becomes a cache_control text part; Gemma folds reuse the same string"""
+    from model_router import CACHE_CONTROL, adapt_messages
+
+    messages = [{"role": "system", "content": "rules"}, {"role": "user", "content": "hi"}]
+    for model in ("anthropic/claude-3.5-haiku", "google/gemini-2.0-flash-001"):
+        system = adapt_messages(model, messages)[0]
+        assert system["content"] == [{"type": "text", "text": "rules", "cache_control": CACHE_CONTROL}]
+    assert messages[0]["content"] == "rules"
+
+    first = adapt_messages("google/gemma-3-27b-it:free", messages)[0]["content"]
+    assert adapt_messages("google/gemma-3-27b-it:free", messages)[0]["content"] is first
+
+
+def test_router_prefers_fastest_healthy_model():
+    """After sampling every candidate, the lowest-p50 model is picked first"""
+    from main import Agent
+    from model_router import ModelRouter
+
+    client, completions = fake_client({"slow": 0.03, "fast": 0.0})
+    router = ModelRouter(["slow", "fast"])
+    agent = Agent("system", client=client, router=router)
+    agent.save_history = lambda filename=None: None
+
+    answers = [agent("question") for _ in range(4)]
+    assert [model for model, _ in completions.calls[:2]] == ["slow", "fast"]
+    assert answers[2:] == ["Answer: fast", "Answer: fast"]
+    assert agent.last_model == "fast"
+    stats = router.stats()["models"]
+    assert stats["slow"]["p50"] > stats["fast"]["p50"] and stats["fast"]["samples"] == 3
+
+
+def test_router_falls_back_and_demotes_failing_model():
+    """A failing model falls through to the next one and is then ranked last"""
+    from model_router import ModelRouter
+
+    client, completions = fake_client({}, failing={"primary"})
+    router = ModelRouter(["primary", "backup"])
+    prepare = lambda model: [{"role": "user", "content": "hi"}]
+
+    model, _ = router.complete(client.chat.completions.create, prepare)
+    assert model == "backup"
+    assert router.ranked() == ["backup", "primary"]
+    assert router.stats()["models"]["primary"]["error_rate"] == 1.0
+
+
+def test_hedging_races_second_model_after_deadline():
+    """A request slower than hedge_after is raced against the next model, which wins"""
+    from model_router import ModelRouter
+
+    client, completions = fake_client({"primary": 0.5, "backup": 0.0})
+    router = ModelRouter(["primary", "backup"], hedge_after=0.05)
+    prepare = lambda model: [{"role": "user", "content": "hi"}]
+
+    start = time.perf_counter()
+    model, completion = router.complete(client.chat.completions.create, prepare)
+    assert model == "backup" and completion.choices[0].message.content == "Answer: backup"
+    assert time.perf_counter() - start < 0.4
+    assert router.stats()["hedges"] == 1
+
+
+def test_concurrent_hedged_requests_do_not_queue_behind_each_other():
+    """Many requests in flight at once all start straight away; none of them is hedged for time spent queued"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from model_router import ModelRouter
+
+    client, completions = fake_client({"primary": 0.2, "backup": 0.2})
+    router = ModelRouter(["primary", "backup"], hedge_after=0.3)
+    prepare = lambda model: [{"role": "user", "content": "hi"}]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=24) as callers:
+        results = list(callers.map(lambda _: router.complete(client.chat.completions.create, prepare), range(24)))
+    assert time.perf_counter() - start < 0.5
+    assert {model for model, _ in results} == {"primary"} and router.stats()["hedges"] == 0
+
+
+def test_async_hedging_cancels_the_loser():
+    """acomplete returns the first reply and cancels the slower request"""
+    from model_router import ModelRouter
+
+    cancelled = []
+
+    async def create(model, messages, **kwargs):
+        try:
+            await asyncio.sleep(1.0 if model == "primary" else 0.0)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return model
+
+    router = ModelRouter(["primary", "backup"], hedge_after=0.02)
+
+    async def run():
+        result = await router.acomplete(create, lambda model: [])
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == ("backup", "backup")
+    assert cancelled == ["primary"]
+
+
+def test_demoted_model_recovers_after_a_successful_probe():
+    """Once probe_after has passed, one request tries the demoted model first; success makes it healthy again"""
+    from model_router import ModelRouter
+
+    now = [0.0]
+    client, completions = fake_client({}, failing={"primary"})
+    router = ModelRouter(["primary", "backup"], probe_after=30.0, clock=lambda: now[0])
+    prepare = lambda model: [{"role": "user", "content": "hi"}]
+
+    assert router.complete(client.chat.completions.create, prepare)[0] == "backup"
+    now[0] = 20.0
+    assert router.ranked() == ["backup", "primary"]
+
+    # A failed probe falls back, and the next probe waits another probe_after
+    now[0] = 31.0
+    assert router.complete(client.chat.completions.create, prepare)[0] == "backup"
+    assert [model for model, _ in completions.calls[-2:]] == ["primary", "backup"]
+    now[0] = 50.0
+    assert router.ranked() == ["backup", "primary"]
+
+    completions.failing.clear()
+    now[0] = 62.0
+    assert router.ranked()[0] == "primary" and router.ranked() == ["backup", "primary"]
+    now[0] = 93.0
+    assert router.complete(client.chat.completions.create, prepare)[0] == "primary"
+    assert router.ranked()[0] == "primary" and router.stats()["models"]["primary"]["error_rate"] == 0.0
+
+
+def test_hedged_request_is_fitted_on_the_calling_thread_and_counted_once():
+    """Hedges prepare their messages on the caller's thread, and the context window counts the request once"""
+    import threading
+
+    from main import Agent
+    from model_router import ModelRouter
+
+    client, completions = fake_client({"primary": 0.3, "backup": 0.0})
+    router = ModelRouter(["primary", "backup"], hedge_after=0.02)
+    agent = Agent("system", client=client, router=router)
+    agent.save_history = lambda filename=None: None
+    fit, threads = agent.context_window.fit, []
+
+    def recording_fit(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return fit(*args, **kwargs)
+
+    agent.context_window.fit = recording_fit
+    assert agent("question") == "Answer: backup"
+    assert threads == [threading.current_thread()] * 2
+    stats = agent.context_window.stats()
+    assert stats["turns"] == 1 and list(agent.context_window.tokens_per_turn) == [stats["tokens_sent"]]
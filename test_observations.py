@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for compact observation formatting of search results
+"""
+import glob
+import json
+import os
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "tavily")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_official_domains_ranked_first():
+    """*.ac.uk / *.edu / *.gov results come before other sources"""
+    from observations import format_search_results
+
+    text = format_search_results(load_fixture("cs_scholarships_uk.json"))
+    lines = [line for line in text.splitlines() if line[:1].isdigit()]
+
+    assert "ed.ac.uk" in lines[0]
+    assert lines.index(next(l for l in lines if "studyabroad-blog.com" in l)) > lines.index(
+        next(l for l in lines if "ed.ac.uk" in l)
+    )
+
+
+def test_duplicate_urls_and_domains_removed():
+    """Repeated URLs and further results from an already-listed domain are dropped"""
+    from observations import format_search_results
+
+    text = format_search_results(load_fixture("cs_entry_requirements_turkey.json"), max_results=10)
+
+    assert text.count("turkey-study-agency.com") == 1
+    assert text.count("ucl.ac.uk") <= 1
+    assert text.startswith("Summary: Most Turkish universities")
+
+
+def test_output_is_capped_and_smaller_than_repr():
+    """The formatted text respects max_chars and is far smaller than the raw response"""
+    from observations import format_search_results
+
+    for path in glob.glob(os.path.join(FIXTURE_DIR, "*.json")):
+        with open(path, encoding="utf-8") as f:
+            response = json.load(f)
+        text = format_search_results(response, max_chars=600)
+        assert len(text) <= 600
+        assert len(text) < len(repr(response)) / 2
+
+
+def test_non_dict_and_empty_responses():
+    """Error strings pass through; empty result lists are reported plainly"""
+    from observations import format_search_results
+
+    assert format_search_results("Error running search: boom") == "Error running search: boom"
+    assert format_search_results({"results": []}) == "No results found."
+
+
+def test_query_uses_registered_formatter():
+    """query() sends the formatted search observation, and other actions unchanged"""
+    from main import known_actions, query
+
+    original_search = known_actions["search"]
+    sent = []
+
+    class MockAgent:
+        def __init__(self):
+            self._responses = ["Action: search: CS UK\nPAUSE", "Answer: done"]
+
+        def __call__(self, message):
+            sent.append(message)
+            return self._responses.pop(0)
+
+        def save_history(self, filename=None):
+            pass
+
+    try:
+        known_actions["search"] = lambda q: load_fixture("cs_scholarships_uk.json")
+        query("CS in the UK?", MockAgent())
+    finally:
+        known_actions["search"] = original_search
+
+    assert sent[1].startswith("Observation: 1. ")
+    assert "'score'" not in sent[1]
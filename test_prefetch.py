@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for speculative search prefetching from the student profile
+"""
+import threading
+import time
+
+
+class SlowSearch:
+    """Fake search taking ``delay`` seconds per call; counts calls per query and can fail once"""
+
+    def __init__(self, delay=0.0, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, query):
+        with self._lock:
+            self.calls.append(query)
+        time.sleep(self.delay)
+        if query in self.fail:
+            self.fail.discard(query)
+            raise ConnectionError("upstream dropped")
+        return {"query": query, "results": [{"title": f"Result for {query}", "url": "https://example.ac.uk"}]}
+
+
+def test_profile_queries_follow_the_recorded_search_phrasing():
+    """Queries per country match how the model phrases searches; no subject means nothing to prefetch"""
+    from prefetch import profile_queries
+
+    profile = {"subject": "Computer Science", "target_countries": "Turkey and united kingdom", "intake": "Fall 2026"}
+    queries = profile_queries(profile)
+    assert queries[0] == "Computer Science entry requirements Turkey 2026 Tawjihi international students"
+    assert "full scholarships for Palestinian students Computer Science 2026 site:*.ac.uk OR site:*.edu" in queries
+    assert len(queries) == 4
+    assert profile_queries({"subject": "Medicine"}, "Medicine options for 2027?") == [
+        "scholarships for Palestinian students Medicine 2027"
+    ]
+    assert profile_queries({"tawjihi": "95%"}) == []
+
+
+def test_search_joins_a_prefetch_in_flight():
+    """A search for a query already being prefetched waits for it instead of fetching again"""
+    from prefetch import Prefetcher
+
+    fetch = SlowSearch(delay=0.2)
+    prefetcher = Prefetcher(search=fetch)
+    try:
+        assert prefetcher.prefetch(["DAAD scholarships Germany", "daad  scholarships germany", "METU fees"]) == 2
+        response = prefetcher.search('"DAAD scholarships Germany"')
+        assert response["query"] == "DAAD scholarships Germany" and len(fetch.calls) == 2
+        prefetcher.wait()
+        assert prefetcher.stats() == {"started": 2, "in_flight": 0, "joined": 1, "failed": 0}
+    finally:
+        prefetcher.close()
+
+
+def test_failed_prefetch_is_retried_as_a_normal_search():
+    """A prefetch that failed does not fail the action; the search is simply made again"""
+    from prefetch import Prefetcher
+
+    fetch = SlowSearch(delay=0.05, fail={"Bilkent fees"})
+    prefetcher = Prefetcher(search=fetch)
+    try:
+        prefetcher.prefetch(["Bilkent fees"])
+        assert prefetcher.search("Bilkent fees")["query"] == "Bilkent fees"
+        assert fetch.calls == ["Bilkent fees", "Bilkent fees"]
+    finally:
+        prefetcher.close()
+
+
+def test_warmed_searches_are_served_from_the_cache_during_query(tmp_path):
+    """Searches warmed during the clarifying turn reach the model with no further upstream call"""
+    import main
+    from prefetch import Prefetcher
+    from search_cache import SearchCache
+    from stubs import ReplayOpenAI
+
+    query = "Computer Science entry requirements Turkey 2026 Tawjihi international students"
+    fetch = SlowSearch(delay=0.1)
+    saved = (main.tavily_client, main.search_cache, main.knowledge_index)
+    main.tavily_client = type("Fake", (), {"search": staticmethod(fetch)})()
+    main.search_cache, main.knowledge_index = SearchCache(str(tmp_path / "cache.db")), None
+    prefetcher = Prefetcher()
+    try:
+        prefetcher.prefetch_profile({"subject": "Computer Science", "countries": ["Turkey"], "intake_year": 2026})
+        replies = [f"Thought: check requirements\nAction: search: {query}\nPAUSE", "Answer: METU and Bilkent"]
+        # The first model turn takes 0.2s, long enough for the 0.1s prefetch to land
+        model = ReplayOpenAI(replies, latency=0.2, sleep=time.sleep)
+        agent = main.Agent("system", history_file=str(tmp_path / "history.jsonl"), client=model)
+        actions = {**main.known_actions, "search": prefetcher.search}
+        answer = main.query("CS in Turkey?", agent, verbose=False, actions=actions)
+    finally:
+        prefetcher.close()
+        main.search_cache.close()
+        main.tavily_client, main.search_cache, main.knowledge_index = saved
+
+    assert answer == "METU and Bilkent"
+    assert fetch.calls.count(query) == 1 and len(fetch.calls) == 2
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the precompiled question classifier
+"""
+
+
+def test_english_question_words_match_as_whole_words():
+    """Question words count anywhere in the input, but not inside other words"""
+    from question_classifier import is_question
+
+    assert is_question("I got 95 in tawjihi, which universities accept me")
+    assert is_question("  Could you list DAAD scholarships ")
+    assert not is_question("Whatever, thanks")
+    assert not is_question("I need help with my application")
+
+
+def test_closing_statements_and_question_marks():
+    """A closing statement is not a question even with '?'; otherwise a trailing '?' is"""
+    from question_classifier import is_question
+
+    assert not is_question("I have no more questions?")
+    assert not is_question("that's all?")
+    assert is_question("Scholarships for medicine in Jordan?")
+    assert not is_question("Goodbye")
+
+
+def test_arabic_question_markers():
+    """Arabic question words, colloquial forms, prefixes, hamza spellings and '؟' are recognised"""
+    from question_classifier import is_question
+
+    assert is_question("هل توجد منح للطلاب الفلسطينيين")
+    assert is_question("شو الجامعات اللي بتقبل معدل 92")
+    assert is_question("وين أدرس الطب")
+    assert is_question("أين تقع الجامعة")
+    assert is_question("فكم الرسوم")
+    assert is_question("منح دراسة الهندسة في تركيا؟")
+    assert not is_question("ماجستير في الهندسة")
+    assert not is_question("شكرا كتير")
+
+
+def test_ambiguous_arabic_words_need_an_unambiguous_form():
+    """Negation "ما" and colloquial "yes" ("اي"/"إي") are statements; "ما هي" and "أي" with hamza are questions"""
+    from question_classifier import is_question
+
+    assert not is_question("ما عندي شهادة توجيهي")
+    assert not is_question("ما درست كيمياء")
+    assert not is_question("اي والله بدي ادرس طب")
+    assert not is_question("إي تمام")
+    assert is_question("ما هي شروط القبول")
+    assert is_question("وما هو الحد الأدنى للمعدل")
+    assert is_question("أي جامعة أفضل للطب")
+    assert is_question("ما الفرق بين الجامعتين؟")
+
+
+def test_batch_matches_single_calls():
+    """classify_batch gives the same answers as is_question, in input order"""
+    from question_classifier import classify_batch, is_question
+
+    inputs = ["What is UCAS?", "Thank you", "كم الرسوم؟", "no more questions?", "Does METU accept tawjihi"]
+    assert classify_batch(inputs) == [is_question(text) for text in inputs] == [True, False, True, False, True]
+    assert classify_batch(iter([])) == []
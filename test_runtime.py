@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for the explicit Runtime context and thread-safe Agent sessions
+"""
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+
+class EchoModel:
+    """Thread-safe fake OpenRouter client: searches for each question, then answers with the observation"""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        with self._lock:
+            self.calls += 1
+        # Yield mid-request so concurrent sessions interleave as much as possible
+        time.sleep(random.random() / 1000)
+        last = messages[-1]["content"]
+        if last.startswith("Observation"):
+            content = f"Answer: {last}"
+        else:
+            content = f"Thought: look it up\nAction: search: {last}\nPAUSE"
+        message = SimpleNamespace(content=content, tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class EchoSearch:
+    def search(self, query, **kwargs):
+        time.sleep(random.random() / 1000)
+        result = {"title": query, "url": "https://example.ac.uk", "content": "Tawjihi accepted."}
+        return {"query": query, "results": [result]}
+
+
+def test_runtime_is_immutable_and_derives_copies():
+    """Fields cannot be reassigned; replace() rebinds the default actions to the new runtime's clients"""
+    from runtime import Runtime
+
+    first = Runtime(tavily_client=EchoSearch())
+    try:
+        first.tavily_client = None
+        raise AssertionError("Runtime accepted an assignment")
+    except AttributeError:
+        pass
+    second = first.replace(tavily_client=SimpleNamespace(search=lambda query, **kw: {"query": "other", "results": []}))
+    assert first.actions["search"]("DAAD")["query"] == "DAAD"
+    assert second.actions["search"]("DAAD")["query"] == "other"
+
+    limited = first.with_actions(search=lambda query: "limited")
+    assert limited.actions["search"]("x") == "limited" and first.actions["search"]("x")["query"] == "x"
+    assert limited.actions["calculate"]("2 + 2") == 4.0
+    try:
+        limited.actions["search"] = None
+        raise AssertionError("action registry accepted an assignment")
+    except TypeError:
+        pass
+
+
+def test_building_a_runtime_does_not_import_main():
+    """runtime.py stands on its own: constructing one leaves main (and its .env loading) unimported"""
+    import subprocess
+    import sys
+
+    script = "import sys, runtime\nruntime.Runtime().actions['calculate']('1 + 1')\nprint('main' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "False"
+
+
+def test_hundreds_of_concurrent_sessions_do_not_interleave(tmp_path):
+    """300 sessions, each asked two questions from different threads at once, keep whole turns together"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    import main
+    from history_store import JSONLHistoryStore
+    from runtime import Runtime
+
+    model = EchoModel()
+    runtime = Runtime(client=model, tavily_client=EchoSearch())
+    agents = [
+        main.Agent("system", history_file=str(tmp_path / f"session-{n}.jsonl"), runtime=runtime) for n in range(300)
+    ]
+    jobs = [(agent, f"session {n} question {q}") for n, agent in enumerate(agents) for q in "ab"]
+    random.shuffle(jobs)
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        answers = list(pool.map(lambda job: (job[1], main.query(job[1], job[0], verbose=False)), jobs))
+
+    for question, answer in answers:
+        assert question in answer and answer.count("question") == 1
+    assert model.calls == 4 * len(agents) and main.tavily_client is None
+    for n, agent in enumerate(agents):
+        # Each question's four messages are contiguous: question, action, observation, answer
+        turns = [agent.messages[i : i + 4] for i in range(1, 9, 4)]
+        assert sorted(turn[0]["content"] for turn in turns) == [f"session {n} question a", f"session {n} question b"]
+        for question, action, observation, answer in turns:
+            assert question["content"] in action["content"] and question["content"] in observation["content"]
+            assert answer["content"] == f"Answer: {observation['content']}"
+        assert JSONLHistoryStore(agent.history_file).load() == agent.messages
+
+
+def test_async_search_keeps_sqlite_off_the_event_loop(tmp_path):
+    """Search-cache reads and writes, index lookups and harvesting run in worker threads under asyncio"""
+    import asyncio
+
+    from knowledge_index import KnowledgeIndex
+    from runtime import Runtime
+    from search_cache import SearchCache
+
+    calls = []
+
+    def on_thread(name, fn):
+        def wrapper(*args, **kwargs):
+            calls.append((name, threading.current_thread() is threading.main_thread()))
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    class AsyncSearch:
+        async def search(self, query, **kwargs):
+            return EchoSearch().search(query)
+
+    search_cache, index = SearchCache(str(tmp_path / "cache.db")), KnowledgeIndex(str(tmp_path / "index.db"))
+    for store, name in ((search_cache, "get"), (search_cache, "set"), (index, "lookup"), (index, "harvest")):
+        setattr(store, name, on_thread(name, getattr(store, name)))
+    runtime = Runtime(async_tavily_client=AsyncSearch(), search_cache=search_cache, knowledge_index=index)
+
+    async def run():
+        await runtime.alookup_knowledge("nursing in Jordan")
+        return await runtime.acached_search("nursing in Jordan")
+
+    assert asyncio.run(run())["results"][0]["url"] == "https://example.ac.uk"
+    assert sorted({name for name, _ in calls}) == ["get", "harvest", "lookup", "set"]
+    assert not any(on_main for _, on_main in calls)
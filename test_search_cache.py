@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for the disk-backed search result cache
+"""
+
+
+class FakeTavilyClient:
+    """Offline stand-in for TavilyClient that counts search calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    def search(self, query):
+        self.calls.append(query)
+        return {"query": query, "results": [{"title": f"Result for {query}", "url": "https://example.ac.uk"}]}
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalise_query():
+    """Whitespace, case and wrapping quotes do not create separate cache entries"""
+    from search_cache import normalise_query
+
+    assert normalise_query('  "Full Scholarships   Palestinian students" ') == "full scholarships palestinian students"
+    assert normalise_query("CS  2026") == normalise_query("cs 2026")
+
+
+def test_hit_and_miss_counters(tmp_path):
+    """A repeated query is served from the cache and counted as a hit"""
+    from search_cache import SearchCache
+
+    fake = FakeTavilyClient()
+    cache = SearchCache(str(tmp_path / "cache.db"))
+
+    first = cache.get_or_fetch("CS scholarships 2026", fake.search)
+    second = cache.get_or_fetch("cs scholarships  2026", fake.search)
+
+    assert first == second
+    assert fake.calls == ["CS scholarships 2026"]
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    """Expired entries are treated as misses and refetched"""
+    from search_cache import SearchCache
+
+    fake = FakeTavilyClient()
+    clock = FakeClock()
+    cache = SearchCache(str(tmp_path / "cache.db"), ttl=60, clock=clock)
+
+    cache.get_or_fetch("medicine Turkey", fake.search)
+    clock.now += 59
+    cache.get_or_fetch("medicine Turkey", fake.search)
+    clock.now += 2
+    cache.get_or_fetch("medicine Turkey", fake.search)
+
+    assert len(fake.calls) == 2
+
+
+def test_lru_eviction(tmp_path):
+    """The least recently used entry is evicted once max_entries is exceeded"""
+    from search_cache import SearchCache
+
+    clock = FakeClock()
+    cache = SearchCache(str(tmp_path / "cache.db"), max_entries=2, clock=clock)
+
+    cache.set("a", {"n": 1})
+    clock.now += 1
+    cache.set("b", {"n": 2})
+    clock.now += 1
+    assert cache.get("a") == {"n": 1}  # "a" is now more recent than "b"
+    clock.now += 1
+    cache.set("c", {"n": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+    assert cache.stats()["entries"] == 2
+
+
+def test_bypass_refreshes_entry(tmp_path):
+    """Bypassing skips the lookup but still stores the fresh response"""
+    from search_cache import SearchCache
+
+    fake = FakeTavilyClient()
+    cache = SearchCache(str(tmp_path / "cache.db"))
+
+    cache.get_or_fetch("IELTS requirements", fake.search)
+    cache.get_or_fetch("IELTS requirements", fake.search, bypass=True)
+    cache.get_or_fetch("IELTS requirements", fake.search)
+
+    assert len(fake.calls) == 2
+    assert cache.hits == 1
+
+
+def test_cache_survives_restart(tmp_path):
+    """Entries written by one cache instance are visible to a new one on the same file"""
+    from search_cache import SearchCache
+
+    path = str(tmp_path / "cache.db")
+    cache = SearchCache(path)
+    cache.set("DAAD scholarships", {"results": []})
+    cache.close()
+
+    reopened = SearchCache(path)
+    assert reopened.get("daad scholarships") == {"results": []}
+
+
+def test_hits_do_not_write_and_their_recency_survives_restart(tmp_path):
+    """A hit only reads; access times reach disk with the next set or on close, so LRU order is kept"""
+    from search_cache import SearchCache
+
+    clock = FakeClock()
+    path = str(tmp_path / "cache.db")
+    cache = SearchCache(path, max_entries=2, clock=clock)
+    cache.set("a", {"n": 1})
+    clock.now += 1
+    cache.set("b", {"n": 2})
+    clock.now += 1
+    changes = cache._conn.total_changes
+    assert cache.get("a") == {"n": 1}
+    assert cache._conn.total_changes == changes
+    cache.close()
+
+    reopened = SearchCache(path, max_entries=2, clock=clock)
+    clock.now += 1
+    reopened.set("c", {"n": 3})
+    assert reopened.get("b") is None and reopened.get("a") == {"n": 1}
+
+
+def test_search_action_uses_cache(tmp_path):
+    """known_actions['search'] goes through the cache in front of search_tavily"""
+    import main
+    from search_cache import SearchCache
+
+    fake = FakeTavilyClient()
+    original_client, original_cache = main.tavily_client, main.search_cache
+    try:
+        main.tavily_client = fake
+        main.search_cache = SearchCache(str(tmp_path / "cache.db"))
+
+        main.known_actions["search"]("Chevening eligibility")
+        main.known_actions["search"]("Chevening eligibility")
+        main.cached_search("Chevening eligibility", bypass_cache=True)
+
+        assert fake.calls == ["Chevening eligibility", "Chevening eligibility"]
+        assert main.search_cache.stats()["hits"] == 1
+    finally:
+        main.tavily_client, main.search_cache = original_client, original_cache
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Tests for the multi-session advisor server using a stubbed OpenRouter client
+"""
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+
+
+class EchoCompletions:
+    """Answers with the last user message after a small random delay, so interleaving shows up as cross-talk"""
+
+    async def create(self, model, temperature, messages):
+        await asyncio.sleep(random.uniform(0, 0.01))
+        content = f"Answer: echo {messages[-1]['content']}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def echo_client():
+    return SimpleNamespace(chat=SimpleNamespace(completions=EchoCompletions()))
+
+
+async def http_request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, data = raw.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    return status, json.loads(data)
+
+
+def test_many_sessions_without_cross_talk(tmp_path):
+    """Hundreds of concurrent sessions each see only their own conversation"""
+    from server import AdvisorServer
+
+    async def run():
+        advisor = AdvisorServer(echo_client(), history_dir=str(tmp_path), system="sys")
+        session_ids = [f"student-{n}" for n in range(300)]
+        answers = await asyncio.gather(
+            *(advisor.ask(sid, f"question from {sid}") for sid in session_ids)
+        )
+        return advisor, session_ids, answers
+
+    advisor, session_ids, answers = asyncio.run(run())
+
+    for sid, answer in zip(session_ids, answers):
+        assert answer == f"echo question from {sid}"
+        messages = advisor.sessions[sid].agent.messages
+        assert [m["role"] for m in messages] == ["system", "user", "assistant"]
+        assert messages[1]["content"] == f"question from {sid}"
+    assert (tmp_path / "student-7.jsonl").exists()
+
+
+def test_turns_in_one_session_are_serialised(tmp_path):
+    """Concurrent questions to the same session append whole turns, never interleaved"""
+    from server import AdvisorServer
+
+    async def run():
+        advisor = AdvisorServer(echo_client(), history_dir=str(tmp_path), system="sys")
+        await asyncio.gather(*(advisor.ask("same", f"q{n}") for n in range(20)))
+        return advisor.sessions["same"].agent.messages
+
+    messages = asyncio.run(run())[1:]
+    for user, assistant in zip(messages[::2], messages[1::2]):
+        assert user["role"] == "user" and assistant["role"] == "assistant"
+        assert assistant["content"] == f"Answer: echo {user['content']}"
+
+
+def test_http_endpoints(tmp_path):
+    """The HTTP front end routes questions, history and deletion per session"""
+    from server import AdvisorServer
+
+    async def run():
+        advisor = AdvisorServer(echo_client(), history_dir=str(tmp_path), system="sys")
+        server = await advisor.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            results = [
+                await http_request(port, "POST", "/sessions/abc/messages", {"question": "Hi?"}),
+                await http_request(port, "GET", "/sessions/abc/history"),
+                await http_request(port, "GET", "/health"),
+                await http_request(port, "POST", "/sessions/abc/messages", {}),
+                await http_request(port, "POST", "/sessions/bad.id/messages", {"question": "x"}),
+                await http_request(port, "DELETE", "/sessions/abc"),
+                await http_request(port, "GET", "/nowhere"),
+            ]
+        return results
+
+    answer, history, health, missing, bad_id, deleted, not_found = asyncio.run(run())
+
+    assert answer == (200, {"session_id": "abc", "answer": "echo Hi?"})
+    assert history[0] == 200 and len(history[1]["messages"]) == 3
+    assert health == (200, {"status": "ok", "sessions": 1})
+    assert missing[0] == 400
+    assert bad_id[0] == 400
+    assert deleted == (200, {"session_id": "abc", "deleted": True})
+    assert not_found[0] == 404
+
+
+def test_evicted_session_reloads_history(tmp_path):
+    """Sessions evicted for capacity pick up their saved history when they return"""
+    from server import AdvisorServer
+
+    async def run():
+        advisor = AdvisorServer(echo_client(), history_dir=str(tmp_path), system="sys", max_sessions=2)
+        await advisor.ask("a", "first")
+        await advisor.ask("b", "second")
+        await advisor.ask("c", "third")
+        evicted = "a" not in advisor.sessions
+        return evicted, (await advisor.get_session("a")).agent.messages
+
+    evicted, messages = asyncio.run(run())
+    assert evicted
+    assert messages[1]["content"] == "first"
+
+
+def test_server_runtime_comes_from_the_environment(tmp_path, monkeypatch):
+    """A from_env runtime keeps its caches and rate-limited upstreams; the server only swaps in its clients"""
+    from runtime import Runtime
+    from server import AdvisorServer
+
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setenv("TAVILY_API_KEY", "test-key")
+    monkeypatch.setenv("OPENROUTER_RATE_LIMIT", "3")
+    monkeypatch.setenv("SEARCH_CACHE_PATH", str(tmp_path / "search.sqlite"))
+    monkeypatch.setenv("KNOWLEDGE_INDEX_PATH", str(tmp_path / "index.sqlite"))
+    runtime = Runtime.from_env()
+
+    client = echo_client()
+    advisor = AdvisorServer(client, history_dir=str(tmp_path / "histories"), runtime=runtime)
+    assert advisor.runtime.async_client is client
+    assert advisor.runtime.async_tavily_client is runtime.async_tavily_client
+    assert advisor.runtime.search_cache is runtime.search_cache is not None
+    assert advisor.runtime.knowledge_index is runtime.knowledge_index is not None
+    assert advisor.runtime.openrouter_upstream.bucket is not None
+
+
+def test_delete_waits_for_the_running_turn_and_removes_the_history_file(tmp_path):
+    """DELETE lets a running turn finish, then removes the session's file; the id then starts afresh"""
+    from server import AdvisorServer
+
+    release = None
+
+    class GatedCompletions(EchoCompletions):
+        async def create(self, model, temperature, messages):
+            if messages[-1]["content"] == "slow":
+                await release.wait()
+            return await super().create(model, temperature, messages)
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        client = SimpleNamespace(chat=SimpleNamespace(completions=GatedCompletions()))
+        advisor = AdvisorServer(client, history_dir=str(tmp_path), system="sys", max_sessions=1)
+        await advisor.ask("old", "first")
+        await advisor.ask("other", "evicts old")
+        turn = asyncio.ensure_future(advisor.ask("busy", "slow"))
+        await asyncio.sleep(0.05)
+        deleting = asyncio.ensure_future(advisor.delete_session("busy"))
+        await asyncio.sleep(0.05)
+        waited = not deleting.done()
+        release.set()
+        answer, deleted = await turn, await deleting
+        gone = not (tmp_path / "busy.jsonl").exists()
+        await advisor.ask("busy", "again")
+        results = (await advisor.delete_session("old"), await advisor.delete_session("never"))
+        return waited, answer, deleted, gone, advisor.sessions["busy"].agent.messages, results
+
+    waited, answer, deleted, gone, messages, (evicted_deleted, never_deleted) = asyncio.run(run())
+    assert waited and answer == "echo slow" and deleted and gone
+    assert [m["content"] for m in messages[1:]] == ["again", "Answer: echo again"]
+    assert evicted_deleted and not (tmp_path / "old.jsonl").exists()
+    assert never_deleted is False
+
+
+def test_request_during_a_delete_starts_a_fresh_session(tmp_path):
+    """A question arriving while DELETE waits for a running turn never sees, or saves into, the deleted history"""
+    import main
+    from server import AdvisorServer
+
+    release = None
+
+    class GatedCompletions(EchoCompletions):
+        async def create(self, model, temperature, messages):
+            if messages[-1]["content"] == "first":
+                await release.wait()
+            return await super().create(model, temperature, messages)
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        client = SimpleNamespace(chat=SimpleNamespace(completions=GatedCompletions()))
+        advisor = AdvisorServer(client, history_dir=str(tmp_path), system="sys")
+        await advisor.ask("s", "zero")
+        first = asyncio.ensure_future(advisor.ask("s", "first"))
+        await asyncio.sleep(0.05)
+        deleting = asyncio.ensure_future(advisor.delete_session("s"))
+        second = asyncio.ensure_future(advisor.ask("s", "second"))
+        await asyncio.sleep(0.05)
+        waiting = not second.done()
+        release.set()
+        await asyncio.gather(first, deleting, second)
+        return waiting, (await advisor.get_session("s")).agent.messages
+
+    waiting, messages = asyncio.run(run())
+    assert waiting
+    assert [m["content"] for m in messages] == ["sys", "second", "Answer: echo second"]
+    reloaded = main.Agent("sys", history_file=str(tmp_path / "s.jsonl"))
+    reloaded.load_history()
+    assert [m["role"] for m in reloaded.messages] == ["system", "user", "assistant"]
+
+
+def test_history_saves_and_answer_cache_stay_off_the_event_loop(tmp_path, monkeypatch):
+    """Loading and saving history and reading or writing the SQLite answer cache run in worker threads"""
+    import threading
+
+    import main
+    from answer_cache import AnswerCache
+    from server import AdvisorServer
+
+    threads = []
+
+    def on_thread(fn):
+        def wrapper(*args, **kwargs):
+            threads.append((fn.__name__, threading.current_thread() is threading.main_thread()))
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(main.Agent, "save_history", on_thread(main.Agent.save_history))
+    monkeypatch.setattr(main.Agent, "load_history", on_thread(main.Agent.load_history))
+    monkeypatch.setattr(AnswerCache, "get", on_thread(AnswerCache.get))
+    monkeypatch.setattr(AnswerCache, "set", on_thread(AnswerCache.set))
+    cache = AnswerCache(str(tmp_path / "answers.db"))
+
+    async def run():
+        advisor = AdvisorServer(echo_client(), history_dir=str(tmp_path), system="sys", answer_cache=cache)
+        return [await advisor.ask(session_id, "Which scholarships suit me?") for session_id in ("a", "b")]
+
+    try:
+        assert asyncio.run(run()) == ["echo Which scholarships suit me?"] * 2
+    finally:
+        cache.close()
+    assert sorted({name for name, _ in threads}) == ["get", "load_history", "save_history", "set"]
+    assert not any(on_main for _, on_main in threads)
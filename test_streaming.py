@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests for streamed model output with early action dispatch, using fake streaming clients
+"""
+import asyncio
+from types import SimpleNamespace
+
+
+def chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeStream:
+    """Iterable of chunks that records how many were consumed and whether it was closed"""
+
+    def __init__(self, pieces):
+        self._pieces = list(pieces)
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self._pieces:
+            self.consumed += 1
+            yield chunk(piece)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAsyncStream(FakeStream):
+    async def __aiter__(self):
+        for piece in self._pieces:
+            self.consumed += 1
+            yield chunk(piece)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeStreamingCompletions:
+    def __init__(self, replies, stream_cls=FakeStream):
+        self._replies = list(replies)
+        self._stream_cls = stream_cls
+        self.streams = []
+
+    def _next(self, stream):
+        assert stream is True
+        s = self._stream_cls(self._replies.pop(0))
+        self.streams.append(s)
+        return s
+
+    def create(self, model, temperature, messages, stream=False):
+        return self._next(stream)
+
+
+class FakeAsyncStreamingCompletions(FakeStreamingCompletions):
+    async def create(self, model, temperature, messages, stream=False):
+        return self._next(stream)
+
+
+def streaming_agent(replies, async_mode=False):
+    from main import Agent
+
+    if async_mode:
+        completions = FakeAsyncStreamingCompletions(replies, FakeAsyncStream)
+        agent = Agent("sys", async_client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    else:
+        completions = FakeStreamingCompletions(replies)
+        agent = Agent("sys", client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    agent.save_history = lambda filename=None: None
+    return agent, completions
+
+
+def test_stream_stops_at_first_complete_action_line():
+    """Generation is abandoned once an Action line is complete; the reply is closed with PAUSE"""
+    agent, completions = streaming_agent(
+        [["Thought: look", " it up\nAction: sea", "rch: CS UK\n", "PAUSE", " and more", " wasted tokens"]]
+    )
+
+    result = agent.stream("Q?")
+
+    assert result == "Thought: look it up\nAction: search: CS UK\nPAUSE"
+    assert completions.streams[0].consumed == 3
+    assert completions.streams[0].closed
+    assert agent.messages[-1]["content"] == result
+
+
+def test_answer_text_is_streamed_live():
+    """Answer turns are passed to on_text piece by piece and returned in full"""
+    agent, _ = streaming_agent([["Ans", "wer: Consider ", "UCL and ", "Edinburgh."]])
+    pieces = []
+
+    result = agent.stream("Q?", on_text=pieces.append)
+
+    assert result == "Answer: Consider UCL and Edinburgh."
+    assert "".join(pieces) == result
+    assert len(pieces) == 3
+
+
+def test_thought_text_is_not_streamed():
+    """Non-answer turns are not shown live"""
+    agent, _ = streaming_agent([["Thought: hmm\n", "Action: calculate: 1 + 1\n"]])
+    pieces = []
+
+    agent.stream("Q?", on_text=pieces.append)
+
+    assert pieces == []
+
+
+def test_query_stream_mode_dispatches_action():
+    """query(stream=True) runs the early-dispatched action and returns the streamed answer"""
+    from main import query
+
+    agent, completions = streaming_agent(
+        [
+            ["Thought: add\nAction: calculate: (48 + 40 + 32)\n", "PAUSE"],
+            ["Answer: ", "120 points."],
+        ]
+    )
+
+    answer = query("UCAS for ABC?", agent, stream=True)
+
+    assert answer == "120 points."
+    assert agent.messages[-2]["content"] == "Observation: 120.0"
+    assert completions.streams[0].consumed == 1
+
+
+def test_aquery_stream_mode():
+    """aquery(stream=True) uses the async streaming client"""
+    from main import aquery
+
+    agent, completions = streaming_agent(
+        [["Action: calculate: 2 * 3\n", "PAUSE\nAction: calculate: 9"], ["Answer: 6"]],
+        async_mode=True,
+    )
+
+    answer = asyncio.run(aquery("Q?", agent, stream=True, verbose=False))
+
+    assert answer == "6"
+    assert completions.streams[0].closed
+    assert agent.messages[-2]["content"] == "Observation: 6.0"
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Tests for the native tool-calling protocol using fake clients
+"""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+
+def reply(content=None, calls=()):
+    """A completion whose message has ``content`` and ``(name, arguments)`` tool calls"""
+    tool_calls = [
+        SimpleNamespace(id=f"call_{n}", type="function", function=SimpleNamespace(name=name, arguments=arguments))
+        for n, (name, arguments) in enumerate(calls)
+    ]
+    message = SimpleNamespace(content=content, tool_calls=tool_calls or None)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeCompletions:
+    """Returns scripted completions (or raises scripted errors) and records each request"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        next_reply = self.replies.pop(0)
+        if isinstance(next_reply, Exception):
+            raise next_reply
+        return next_reply
+
+    async def acreate(self, **kwargs):
+        return self.create(**kwargs)
+
+
+def make_agent(tmp_path, replies, model="tool-model"):
+    import main
+
+    completions = FakeCompletions(replies)
+    sync = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    async_ = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=completions.acreate)))
+    agent = main.Agent(
+        "system",
+        model=model,
+        history_file=str(tmp_path / "history.jsonl"),
+        client=sync,
+        async_client=async_,
+        tools=main.tools,
+    )
+    return agent, completions
+
+
+def slow_actions(delay):
+    def search(query):
+        time.sleep(delay)
+        return f"results for {query}"
+
+    return {"search": search, "calculate": lambda expression: "42"}
+
+
+def test_parse_tool_calls_accepts_objects_and_bare_strings():
+    """A single-argument JSON object yields its value; non-JSON arguments pass through"""
+    from tool_calls import ToolCall, assistant_message, parse_tool_calls
+
+    message = reply(calls=[("search", json.dumps({"query": "DAAD"})), ("calculate", "48 + 40")]).choices[0].message
+    assert parse_tool_calls(message) == [
+        ToolCall("call_0", "search", "DAAD"),
+        ToolCall("call_1", "calculate", "48 + 40"),
+    ]
+    entry = assistant_message(message)
+    assert entry["content"] == "" and [c["function"]["name"] for c in entry["tool_calls"]] == ["search", "calculate"]
+
+
+def test_tool_query_dispatches_a_turns_calls_in_parallel(tmp_path):
+    """Two tool calls in one turn run concurrently and return as tool messages tied to their ids"""
+    from main import query
+
+    calls = [("search", '{"query": "METU"}'), ("search", '{"query": "Bilkent"}')]
+    agent, completions = make_agent(tmp_path, [reply(calls=calls), reply("Answer: both accept Tawjihi")])
+
+    start = time.perf_counter()
+    answer = query("Turkish options?", agent, verbose=False, actions=slow_actions(0.2))
+    elapsed = time.perf_counter() - start
+
+    assert answer == "both accept Tawjihi" and elapsed < 0.35
+    first, second = completions.requests
+    assert first["tools"] and first["messages"][0]["content"].endswith("Answer: <your final answer> and no tool calls.")
+    tool_results = [m for m in second["messages"] if m["role"] == "tool"]
+    assert [(m["tool_call_id"], m["content"]) for m in tool_results] == [
+        ("call_0", "results for METU"),
+        ("call_1", "results for Bilkent"),
+    ]
+
+
+def test_unknown_tool_is_reported_not_fatal(tmp_path):
+    """An unknown tool name goes back to the model as an error result and the session continues"""
+    from main import query
+
+    agent, completions = make_agent(tmp_path, [reply(calls=[("browse", '{"url": "x"}')]), reply("A plain answer")])
+    assert query("Anything?", agent, verbose=False) == "A plain answer"
+    error = completions.requests[1]["messages"][-1]
+    assert error["role"] == "tool" and error["content"].startswith("Error: unknown action browse")
+
+
+def test_text_action_lines_still_work_in_tool_mode(tmp_path):
+    """A model that answers tool turns with Action lines has them dispatched as text observations"""
+    from main import query
+
+    agent, completions = make_agent(tmp_path, [reply("Action: calculate: 6 * 7\nPAUSE"), reply("Answer: 42")])
+    assert query("6 * 7?", agent, verbose=False) == "42"
+    assert completions.requests[1]["messages"][-1] == {"role": "user", "content": "Observation: 42.0"}
+
+
+def test_model_rejecting_tools_falls_back_to_text_protocol(tmp_path):
+    """A 404 'no endpoints support tool use' switches the model to the text protocol for good"""
+    import tool_calls
+    from main import query
+
+    error = Exception("Error code: 404 - No endpoints found that support tool use")
+    error.status_code = 404
+    model = "no-tools-model"
+    agent, completions = make_agent(tmp_path, [error, reply("Answer: hello")], model=model)
+
+    assert query("Hi?", agent, verbose=False) == "hello"
+    assert "tools" in completions.requests[0] and "tools" not in completions.requests[1]
+    assert not tool_calls.supports_tools(model) and not agent.uses_tools()
+    assert [m["content"] for m in agent.messages if m["role"] == "user"] == ["Hi?"]
+
+
+def test_atool_query_runs_tool_calls_concurrently(tmp_path):
+    """The async loop gathers a turn's tool calls instead of running them one by one"""
+    import main
+
+    async def slow_search(query):
+        await asyncio.sleep(0.2)
+        return f"results for {query}"
+
+    calls = [("search", '{"query": "a"}'), ("search", '{"query": "b"}'), ("calculate", '{"expression": "1 + 1"}')]
+    agent, completions = make_agent(tmp_path, [reply(calls=calls), reply("Answer: done")])
+    saved = main.async_known_actions
+    main.async_known_actions = {"search": slow_search}
+    try:
+        start = time.perf_counter()
+        answer = asyncio.run(main.aquery("Compare?", agent, verbose=False))
+        elapsed = time.perf_counter() - start
+    finally:
+        main.async_known_actions = saved
+
+    assert answer == "done" and elapsed < 0.35
+    contents = [m["content"] for m in completions.requests[1]["messages"] if m["role"] == "tool"]
+    assert contents[2] == "2.0" and len(contents) == 3
+
+
+def test_context_window_keeps_tool_results_with_their_call():
+    """Dropping an assistant tool-call turn for budget also drops its tool results"""
+    from context_window import ContextWindow, message_tokens
+
+    call = {"id": "c1", "type": "function", "function": {"name": "search", "arguments": '{"query": "x"}'}}
+    messages = [
+        {"role": "system", "content": "s"},
+        {"role": "user", "content": "q"},
+        {"role": "assistant", "content": "", "tool_calls": [call]},
+        {"role": "tool", "tool_call_id": "c1", "content": "r" * 400},
+        {"role": "assistant", "content": "a" * 400},
+        {"role": "user", "content": "follow-up"},
+    ]
+    assert message_tokens(messages[2]) > message_tokens({"role": "assistant", "content": ""})
+    fitted = ContextWindow(budget=140).fit(messages)
+    assert [m["role"] for m in fitted] == ["system", "user", "assistant", "user"]
+    assert fitted[2]["content"] == "a" * 400
+
+
+def test_running_out_of_turns_on_a_tool_turn_keeps_the_history_valid(tmp_path):
+    """Tool results from the last turn are still recorded, so a follow-up question is accepted"""
+    from history_store import JSONLHistoryStore
+    from main import atool_query, query
+
+    calls = [("calculate", '{"expression": "48 + 40"}')]
+    agent, completions = make_agent(tmp_path, [reply(calls=calls), reply(calls=calls), reply("Answer: 88")])
+
+    def answered(messages):
+        ids = {m["tool_call_id"] for m in messages if m["role"] == "tool"}
+        return all(call["id"] in ids for m in messages for call in m.get("tool_calls") or ())
+
+    assert query("Points?", agent, max_turns=1, verbose=False) is None
+    assert agent.messages[-1] == {"role": "tool", "tool_call_id": "call_0", "content": "88.0"}
+    assert answered(JSONLHistoryStore(agent.history_file).load())
+
+    assert asyncio.run(atool_query("Again?", agent, max_turns=1, verbose=False)) is None
+    assert agent.messages[-1]["role"] == "tool"
+    assert query("And now?", agent, verbose=False) == "88"
+    assert all(answered(request["messages"]) for request in completions.requests)
+    assert agent.uses_tools()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for span tracing of the ReAct loop using fake clients
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+
+def fake_client(responses):
+    """Sync and async fake OpenRouter clients returning canned replies with token usage"""
+    replies = list(responses)
+
+    def completion():
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+        content = replies.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    async def acreate(**kwargs):
+        return completion()
+
+    sync = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: completion())))
+    async_ = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=acreate)))
+    return sync, async_
+
+
+def run_traced(tmp_path, fn):
+    import tracing
+
+    tracer = tracing.enable(tracing.Tracer(str(tmp_path / "trace.jsonl")))
+    try:
+        result = fn()
+    finally:
+        tracing.disable()
+        tracer.close()
+    return result, tracer
+
+
+def make_agent(tmp_path):
+    from main import Agent
+
+    sync, async_ = fake_client(["Thought: add\nAction: calculate: 2 + 3\nPAUSE", "Answer: 5"])
+    return Agent("system", history_file=str(tmp_path / "history.jsonl"), client=sync, async_client=async_)
+
+
+def test_disabled_tracing_is_a_shared_noop():
+    """With tracing off, span() returns the same no-op object and records nothing"""
+    import tracing
+
+    assert tracing.active_tracer() is None
+    with tracing.span("model.call", model="x") as span:
+        span.set(prompt_tokens=1)
+    assert span is tracing.NOOP_SPAN and tracing.span("parse") is span
+
+
+def test_query_records_nested_spans_with_usage(tmp_path):
+    """query() records model calls, parsing, actions and history saves under one root span"""
+    from main import query
+
+    agent = make_agent(tmp_path)
+    answer, tracer = run_traced(tmp_path, lambda: query("What is 2 + 3?", agent, verbose=False))
+
+    assert answer == "5"
+    names = [span.name for span in tracer.spans]
+    assert names.count("model.call") == 2 and names.count("history.save") == 2
+    assert names.count("action") == 1 and names.count("parse") == 2 and names[-1] == "query"
+    root = tracer.spans[-1]
+    assert root.attributes == {"stream": False, "turns": 2, "answered": True}
+    assert all(span.parent_id == root.span_id for span in tracer.spans[:-1])
+    assert {span.trace_id for span in tracer.spans} == {root.trace_id}
+
+    summary = tracer.summary()
+    assert summary["model.call"]["prompt_tokens"] == 200 and summary["model.call"]["completion_tokens"] == 40
+    assert summary["action"]["count"] == 1 and summary["query"]["p95_ms"] >= summary["query"]["p50_ms"]
+
+
+def test_trace_file_uses_otlp_span_layout(tmp_path):
+    """Spans are streamed to JSONL as OTLP/JSON records as they finish"""
+    from main import query
+
+    agent = make_agent(tmp_path)
+    run_traced(tmp_path, lambda: query("What is 2 + 3?", agent, verbose=False))
+
+    with open(tmp_path / "trace.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    model_call = next(r for r in records if r["name"] == "model.call")
+    assert len(model_call["traceId"]) == 32 and len(model_call["spanId"]) == 16
+    assert int(model_call["endTimeUnixNano"]) >= int(model_call["startTimeUnixNano"])
+    assert {"key": "prompt_tokens", "value": {"intValue": "100"}} in model_call["attributes"]
+    assert model_call["status"] == {"code": 1} and "parentSpanId" in model_call
+    assert "parentSpanId" not in records[-1]
+
+
+def test_aquery_concurrent_actions_share_the_root_span(tmp_path):
+    """Actions gathered concurrently in aquery are children of its query span"""
+    from main import Agent, aquery
+
+    sync, async_ = fake_client(["Action: calculate: 1 + 1\nAction: calculate: 2 * 2\nPAUSE", "Answer: done"])
+    agent = Agent("system", history_file=str(tmp_path / "history.jsonl"), client=sync, async_client=async_)
+    answer, tracer = run_traced(tmp_path, lambda: asyncio.run(aquery("Sums?", agent, verbose=False)))
+
+    assert answer == "done"
+    root = tracer.spans[-1]
+    actions = [span for span in tracer.spans if span.name == "action"]
+    assert len(actions) == 2 and all(span.parent_id == root.span_id for span in actions)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Tests for the upstream transport layer (retries, rate limiting, circuit breaker),
+run against a local stub HTTP server
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETION = {
+    "id": "cmpl-1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [
+        {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "Answer: hello"}}
+    ],
+}
+SEARCH = {"query": "q", "results": [{"title": "T", "url": "https://example.ac.uk/", "content": "c"}]}
+
+
+class StubUpstream:
+    """Serves scripted ``(status, headers, body)`` responses in order and records connections"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                stub.requests.append(self.path)
+                stub.connections.add(self.client_address)
+                status, headers, body = stub.responses.pop(0) if stub.responses else (200, {}, {})
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_openai_429_is_retried_after_retry_after():
+    """A 429 from OpenRouter is retried after the Retry-After delay, not surfaced"""
+    from transport import Upstream, create_openai_client
+
+    stub = StubUpstream([(429, {"Retry-After": "2"}, {"error": "rate limited"}), (200, {}, COMPLETION)])
+    slept = []
+    try:
+        client = create_openai_client("key", stub.url)
+        upstream = Upstream("openrouter", sleep=slept.append)
+        completion = upstream.call(client.chat.completions.create, model="stub", messages=[])
+    finally:
+        stub.close()
+
+    assert completion.choices[0].message.content == "Answer: hello"
+    assert len(stub.requests) == 2 and slept[0] >= 2.0
+    stats = upstream.stats()
+    assert stats["retries"] == 1 and stats["throttled"] == 1 and stats["successes"] == 1
+
+
+def test_tavily_pooled_session_retries_and_reuses_connection():
+    """Tavily 5xx errors are retried, and calls share one keep-alive connection"""
+    from transport import Upstream, create_tavily_client
+
+    stub = StubUpstream([(503, {}, {}), (200, {}, SEARCH), (200, {}, SEARCH)])
+    try:
+        client = create_tavily_client("tvly-key", api_base_url=stub.url)
+        upstream = Upstream("tavily", sleep=lambda seconds: None)
+        first = upstream.call(client.search, "q")
+        second = upstream.call(client.search, "q")
+    finally:
+        stub.close()
+
+    assert first["results"] == second["results"] == SEARCH["results"]
+    assert stub.requests == ["/search"] * 3
+    assert len(stub.connections) == 1
+
+
+def test_client_errors_are_not_retried():
+    """A 400 is raised straight away and does not count against the circuit breaker"""
+    import openai
+
+    from transport import Upstream, create_openai_client
+
+    stub = StubUpstream([(400, {}, {"error": {"message": "bad request"}})])
+    upstream = Upstream("openrouter", sleep=lambda seconds: None)
+    try:
+        client = create_openai_client("key", stub.url)
+        try:
+            upstream.call(client.chat.completions.create, model="stub", messages=[])
+            assert False, "expected BadRequestError"
+        except openai.BadRequestError:
+            pass
+    finally:
+        stub.close()
+
+    assert len(stub.requests) == 1
+    assert upstream.stats()["retries"] == 0 and upstream.breaker.failures == 0
+
+
+def test_circuit_breaker_opens_then_recovers():
+    """Repeated transient failures open the circuit; one trial call after the timeout closes it"""
+    from transport import CircuitBreaker, CircuitOpenError, Upstream
+
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    upstream = Upstream("tavily", max_attempts=1, breaker=breaker)
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise ConnectionError("connection reset")
+
+    for _ in range(2):
+        try:
+            upstream.call(fail)
+        except ConnectionError:
+            pass
+    assert breaker.state == "open"
+    try:
+        upstream.call(fail)
+        assert False, "expected CircuitOpenError"
+    except CircuitOpenError:
+        pass
+    assert len(calls) == 2
+
+    now[0] = 10.0
+    assert breaker.state == "half-open"
+    assert upstream.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+    assert upstream.stats()["circuit_rejections"] == 1
+
+
+def test_cancelled_half_open_trial_does_not_wedge_the_circuit():
+    """A trial call that is cancelled (or interrupted) releases the half-open slot for the next call"""
+    import asyncio
+
+    from transport import CircuitBreaker, Upstream
+
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    upstream = Upstream("openrouter", max_attempts=1, breaker=breaker)
+    breaker.record_failure()
+    now[0] = 10.0
+
+    async def cancelled_trial():
+        task = asyncio.create_task(upstream.acall(asyncio.sleep, 60))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancelled_trial())
+    assert breaker.state == "half-open"
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    try:
+        upstream.call(interrupted)
+    except KeyboardInterrupt:
+        pass
+    assert upstream.call(lambda: "ok") == "ok" and breaker.state == "closed"
+
+
+def test_async_call_retries_and_rate_limits():
+    """acall retries transient errors and spaces calls through the token bucket"""
+    import asyncio
+
+    from transport import Upstream
+
+    class Throttled(Exception):
+        status_code = 429
+
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise Throttled()
+        return len(attempts)
+
+    upstream = Upstream("openrouter", rate=1000, base_delay=0.001)
+    assert asyncio.run(upstream.acall(flaky)) == 2
+    stats = upstream.stats()
+    assert stats["calls"] == 2 and stats["retries"] == 1 and stats["throttled"] == 1
+
+
+def test_lazy_client_builds_once_on_first_use():
+    """LazyClient calls its factory only when an attribute is first needed, and only once"""
+    from types import SimpleNamespace
+
+    from transport import LazyClient
+
+    built = []
+
+    def factory():
+        built.append(1)
+        return SimpleNamespace(search=lambda query: {"query": query})
+
+    client = LazyClient(factory)
+    assert not client.loaded and built == []
+    assert client.search("q") == {"query": "q"} and client.search("r") == {"query": "r"}
+    assert client.loaded and built == [1]
+
+
+def test_importing_main_and_initialising_skips_the_sdks(tmp_path):
+    """Importing main loads no SDK; initialising the clients still defers openai/tavily to first use"""
+    import os
+    import subprocess
+    import sys
+
+    script = (
+        "import sys, main\n"
+        "before = sorted(m for m in ('openai', 'tavily', 'dotenv', 'httpx', 'asyncio') if m in sys.modules)\n"
+        "main.load_dotenv_and_init_client()\n"
+        "after = sorted(m for m in ('openai', 'tavily', 'httpx') if m in sys.modules)\n"
+        "print(before, after)\n"
+    )
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(
+        os.environ,
+        OPENROUTER_API_KEY="k",
+        TAVILY_API_KEY="k",
+        SEARCH_CACHE_PATH=str(tmp_path / "cache.db"),
+        KNOWLEDGE_INDEX_PATH=str(tmp_path / "index.db"),
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=tmp_path, env={**env, "PYTHONPATH": root}, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[] []"
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for early termination and turn budgeting in the ReAct loop
+"""
+
+
+def make_agent(tmp_path, replies):
+    from main import Agent
+    from stubs import ReplayOpenAI
+
+    model = ReplayOpenAI(replies)
+    return Agent("system", history_file=str(tmp_path / "history.jsonl"), client=model), model
+
+
+def test_near_miss_syntax_is_repaired():
+    """Markdown, odd separators and call syntax still yield the action; Answer after a Thought is found"""
+    from turn_control import read_actions, read_answer
+
+    actions = {"search": None, "calculate": None}
+    reply = "Thought: check\n**Action:** Search - DAAD Germany\nPAUSE"
+    assert read_actions(reply, actions) == [("search", "DAAD Germany")]
+    assert read_actions("Action: calculate(48 + 40) PAUSE", actions) == [("calculate", "48 + 40")]
+    assert read_actions("Action plan: search for fees", actions) == []
+    assert read_actions("Action: fly: to the moon", actions) == [("fly", "to the moon")]
+    assert read_answer("Thought: I have enough.\n**Final Answer:** Apply to METU.\nGood luck!") == (
+        "Apply to METU.\nGood luck!"
+    )
+    assert read_answer("Thought: still thinking") is None
+
+
+def test_query_repairs_action_and_serves_repeats_from_memo(tmp_path):
+    """A near-miss action runs without a retry turn, and repeating it does not call the action again"""
+    from main import query
+
+    calls = []
+
+    def search(text):
+        calls.append(text)
+        return f"results for {text}"
+
+    replies = [
+        "Thought: search\nAction: Search - DAAD Germany\nPAUSE",
+        'Thought: again\nAction: search: "daad  germany"\nPAUSE',
+        "Thought: enough\nAnswer: Apply for DAAD.",
+    ]
+    agent, model = make_agent(tmp_path, replies)
+    answer = query("Germany?", agent, verbose=False, actions={"search": search})
+
+    assert answer == "Apply for DAAD." and calls == ["DAAD Germany"] and len(model.requests) == 3
+    repeated = model.requests[2][-1]["content"]
+    assert repeated.startswith("Observation: results for DAAD Germany\n(You already ran search")
+
+
+def test_last_turn_is_forced_to_answer(tmp_path):
+    """With one turn left the model is told to answer, instead of the loop ending at max turns"""
+    from main import query
+    from turn_control import FORCE_ANSWER_NOTE
+
+    replies = ["Action: calculate: 48 + 40\nPAUSE", "Answer: 88 UCAS points."]
+    agent, model = make_agent(tmp_path, replies)
+    assert query("Points?", agent, max_turns=2, verbose=False) == "88 UCAS points."
+    assert not model.requests[0][-1]["content"].endswith(FORCE_ANSWER_NOTE)
+    assert model.requests[1][-1]["content"] == f"Observation: 88.0\n\n{FORCE_ANSWER_NOTE}"
+
+    agent, model = make_agent(tmp_path, ["Action: calculate: 1 + 1\nPAUSE", "Action: calculate: 2 + 2\nPAUSE"])
+    assert query("Points?", agent, max_turns=2, verbose=False) is None
+    assert len(model.requests) == 2
+
+
+def test_time_and_token_budgets_judge_the_average_turn():
+    """The budget is nearly spent once the average turn so far would overrun it within two more turns"""
+    from turn_control import TurnBudget
+
+    now = [0.0]
+    budget = TurnBudget(max_turns=10, max_seconds=10.0, clock=lambda: now[0])
+    assert not budget.nearly_spent()
+    now[0] = 3.0
+    budget.charge(100)
+    assert not budget.nearly_spent()
+    now[0] = 4.0
+    budget.charge(100)
+    assert not budget.nearly_spent() and not budget.exhausted()
+    now[0] = 6.0
+    assert budget.nearly_spent()
+    now[0] = 10.0
+    assert budget.exhausted()
+
+    tokens = TurnBudget(max_turns=10, max_tokens=1000)
+    tokens.charge(400)
+    assert tokens.nearly_spent() and not tokens.exhausted()
+
+
+def test_answer_is_not_hijacked_by_a_prose_action_bullet(tmp_path):
+    """A reply with an Answer is final even when a later bullet looks like a near-miss Action line"""
+    from main import query
+    from turn_control import read_reply
+
+    reply = "Answer: DAAD mostly funds postgraduates.\n- **Action:** search the DAAD database for Bachelor awards"
+    assert read_reply(reply, {"search": None}) == ([], reply.split("Answer: ", 1)[1])
+
+    calls = []
+    agent, model = make_agent(tmp_path, [reply])
+    answer = query("DAAD?", agent, verbose=False, actions={"search": calls.append})
+    assert answer.startswith("DAAD mostly funds postgraduates.") and calls == [] and len(model.requests) == 1
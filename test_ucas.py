@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for UCAS tariff tables and batch grade conversion
+"""
+import io
+
+
+def test_points_for_each_qualification():
+    """Single conversions cover A-level, AS-level, BTEC and qualification aliases"""
+    from ucas import points_for
+
+    assert points_for("A-level", "A*") == 56
+    assert points_for("a level", "b") == 40
+    assert points_for("AS", "A") == 20
+    assert points_for("BTEC", "D*") == 56
+    assert points_for("IB", "7") == 0
+    assert points_for("A-level", "Z") == 0
+
+
+def test_tawjihi_banding():
+    """Tawjihi percentages map onto indicative bands, with band edges inclusive"""
+    from ucas import tawjihi_points
+
+    assert tawjihi_points(95) == 144
+    assert tawjihi_points("94.9%") == 136
+    assert tawjihi_points("85") == 128
+    assert tawjihi_points(64.5) == 0
+    assert tawjihi_points("n/a") == 0
+
+
+def test_batch_points_matches_single_conversion():
+    """batch_points returns one value per row, equal to points_for"""
+    from ucas import batch_points, points_for
+
+    qualifications = ["A-level", "AS-level", "BTEC", "Tawjihi", "unknown"]
+    grades = ["A", "B", "M", "91%", "A"]
+
+    assert list(batch_points(qualifications, grades)) == [
+        points_for(q, g) for q, g in zip(qualifications, grades)
+    ]
+
+
+def test_batch_totals_from_csv():
+    """CSV rows are summed per applicant in one pass"""
+    from ucas import batch_totals, read_grade_rows
+
+    data = io.StringIO(
+        "applicant_id,qualification,grade\n"
+        "s1,A-level,A*\n"
+        "s1,A-level,A\n"
+        "s2,Tawjihi,96\n"
+        "s1,AS-level,C\n"
+        "s3,BTEC,D\n"
+    )
+
+    assert batch_totals(read_grade_rows(data)) == {"s1": 116, "s2": 144, "s3": 48}
+
+
+def test_calculate_ucas_total_honours_subject_type():
+    """calculate_ucas_total passes subject_type through instead of assuming A-level"""
+    from main import calculate_ucas_total, get_ucas_points
+
+    assert get_ucas_points("D*", "BTEC") == 56
+    assert "Total UCAS points: 104" in calculate_ucas_total("Business D*, IT D", "BTEC")
+    assert "Total UCAS points: 120" in calculate_ucas_total("Maths A, Physics B, English C")
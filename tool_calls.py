@@ -0,0 +1,111 @@
+"""Native function calling ("tools") as an alternative to the text action protocol.
+
+In the text protocol the model writes ``Action: <name>: <input>`` lines, which
+are found with ``action_re``. With the tools protocol, actions are offered
+as OpenAI-style ``tools``. The model replies with structured ``tool_calls``,
+several per turn if it likes, and each result goes back as a ``tool``
+message tied to its call id. Nothing has to be parsed out of free text, and
+one turn can gather everything the next answer needs.
+
+Models without tool support keep the text protocol. Some are listed in
+``TEXT_ONLY_MODELS``; others are found at runtime from the error they return
+when offered tools (``is_tools_unsupported``) and remembered for the rest of
+the process (``mark_text_only``).
+"""
+
+import json
+from collections import namedtuple
+
+# Appended to the system prompt for tool turns, overriding its Action-line contract
+TOOL_PROTOCOL_NOTE = (
+    "Tool calling is enabled for this conversation: instead of writing Action lines, "
+    "call the provided tools. Call several tools in the same turn when they are independent "
+    "(for example, searches for different universities). When you have enough information, "
+    "reply with Answer: <your final answer> and no tool calls."
+)
+
+# Model id fragments known to lack OpenAI-style tool calling
+TEXT_ONLY_MODELS = ["gemma"]
+
+# Models that rejected tools at runtime
+_rejected_tools = set()
+
+ToolCall = namedtuple("ToolCall", ["id", "name", "input"])
+
+
+def tool_schema(name: str, description: str, parameter: str, parameter_description: str) -> dict:
+    """An OpenAI ``tools`` entry for an action taking one string argument."""
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {parameter: {"type": "string", "description": parameter_description}},
+                "required": [parameter],
+            },
+        },
+    }
+
+
+def build_tools(specs: dict) -> list:
+    """Tool schemas from ``{action: (description, parameter, parameter_description)}``."""
+    return [tool_schema(name, *spec) for name, spec in specs.items()]
+
+
+def supports_tools(model: str) -> bool:
+    if model in _rejected_tools:
+        return False
+    lowered = model.lower()
+    return not any(fragment in lowered for fragment in TEXT_ONLY_MODELS)
+
+
+def mark_text_only(model: str) -> None:
+    """Use the text protocol for ``model`` from now on."""
+    _rejected_tools.add(model)
+
+
+def is_tools_unsupported(exc: BaseException) -> bool:
+    """True if ``exc`` is an API error refusing the ``tools`` parameter (OpenRouter answers 404)."""
+    status = getattr(exc, "status_code", None)
+    return status in (400, 404, 422) and "tool" in str(exc).lower()
+
+
+def parse_tool_calls(message) -> list:
+    """The ``ToolCall``s of a completion message, with each call's single argument as ``input``.
+
+    Arguments that are not a JSON object (some models send the bare string)
+    are passed through as they are.
+    """
+    calls = []
+    for call in getattr(message, "tool_calls", None) or []:
+        arguments = call.function.arguments or ""
+        try:
+            parsed = json.loads(arguments)
+        except ValueError:
+            parsed = arguments
+        if isinstance(parsed, dict):
+            parsed = next(iter(parsed.values()), "") if len(parsed) == 1 else json.dumps(parsed)
+        calls.append(ToolCall(call.id, call.function.name, str(parsed)))
+    return calls
+
+
+def assistant_message(message) -> dict:
+    """The history entry for a completion message, keeping its tool calls for the follow-up request."""
+    entry = {"role": "assistant", "content": message.content or ""}
+    calls = getattr(message, "tool_calls", None)
+    if calls:
+        entry["tool_calls"] = [
+            {
+                "id": call.id,
+                "type": "function",
+                "function": {"name": call.function.name, "arguments": call.function.arguments or ""},
+            }
+            for call in calls
+        ]
+    return entry
+
+
+def tool_message(call: ToolCall, observation) -> dict:
+    return {"role": "tool", "tool_call_id": call.id, "content": str(observation)}
@@ -0,0 +1,210 @@
+"""Lightweight tracing of the ReAct loop.
+
+Code under measurement opens spans with ``tracing.span(name, **attributes)``:
+
+    with tracing.span("model.call", model=model) as span:
+        completion = ...
+        span.set(prompt_tokens=completion.usage.prompt_tokens)
+
+Tracing is off by default, and then ``span`` returns a shared no-op object,
+so instrumented code pays only a function call and a ``None`` check. Call
+``enable()`` to start recording into a ``Tracer``. A tracer keeps finished
+spans in memory, and can also append each one to a JSONL file as it finishes,
+in the OpenTelemetry (OTLP/JSON) span layout. Spans nest through
+``contextvars``, so parent/child links hold across threads started with a
+copied context and across asyncio tasks.
+
+Spans recorded by the advisor:
+
+* ``query``: one ReAct run (``query`` / ``aquery``)
+* ``model.call``: each chat completion, with ``model`` and token usage
+* ``parse``: extracting actions from a reply
+* ``action``: each action dispatch, with ``action``
+* ``history.save``: persisting the conversation
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+
+from model_router import percentile
+
+_tracer = None
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """One timed operation; use as a context manager."""
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "start_ns",
+        "end_ns",
+        "error",
+        "_token",
+    )
+
+    def __init__(self, tracer, name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span_id = os.urandom(8).hex()
+        self.error = None
+        self.end_ns = None
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.finish(self)
+        return False
+
+    def set(self, **attributes) -> None:
+        """Add or overwrite attributes (e.g. token counts known only after the call)."""
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds."""
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_otlp(self) -> dict:
+        """This span as an OpenTelemetry OTLP/JSON span record."""
+        record = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id is not None:
+            record["parentSpanId"] = self.parent_id
+        return record
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """Collects finished spans; optionally streams them to a JSONL file."""
+
+    def __init__(self, path: str = None, max_spans: int = 100_000):
+        self.path = path
+        self.max_spans = max_spans
+        self.spans = []
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    def finish(self, span: Span) -> None:
+        line = json.dumps(span.to_otlp()) + "\n" if self.path else None
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            if line is not None and self._file is not None:
+                self._file.write(line)
+                self._file.flush()
+
+    def export_jsonl(self, path: str) -> int:
+        """Write every recorded span to ``path`` as OTLP/JSON lines; returns the count."""
+        with self._lock:
+            spans = list(self.spans)
+        with open(path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_otlp()) + "\n")
+        return len(spans)
+
+    def summary(self) -> dict:
+        """Per span name: count, errors, total, p50 and p95 in milliseconds, plus token totals."""
+        with self._lock:
+            spans = list(self.spans)
+        by_name = {}
+        for span in spans:
+            by_name.setdefault(span.name, []).append(span)
+        summary = {}
+        for name, group in sorted(by_name.items()):
+            durations = [span.duration * 1e3 for span in group]
+            stage = {
+                "count": len(group),
+                "errors": sum(1 for span in group if span.error),
+                "total_ms": round(sum(durations), 3),
+                "p50_ms": round(percentile(durations, 50), 3),
+                "p95_ms": round(percentile(durations, 95), 3),
+            }
+            for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+                tokens = [span.attributes[key] for span in group if key in span.attributes]
+                if tokens:
+                    stage[key] = sum(tokens)
+            summary[name] = stage
+        return summary
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def span(name: str, **attributes):
+    """A span for ``name`` on the active tracer, or the no-op span when tracing is off."""
+    if _tracer is None:
+        return NOOP_SPAN
+    return Span(_tracer, name, attributes)
+
+
+def enable(tracer: Tracer = None) -> Tracer:
+    """Start recording spans into ``tracer`` (a new in-memory one by default); returns it."""
+    global _tracer
+    _tracer = tracer if tracer is not None else Tracer()
+    return _tracer
+
+
+def disable() -> None:
+    global _tracer
+    _tracer = None
+
+
+def active_tracer():
+    return _tracer
@@ -0,0 +1,364 @@
+"""Resilient, instrumented access to the upstream APIs (OpenRouter and Tavily).
+
+Every upstream call goes through an ``Upstream``, which applies, in order:
+
+1. a circuit breaker: after ``failure_threshold`` consecutive failures, calls
+   fail fast with ``CircuitOpenError`` for ``reset_timeout`` seconds, then a
+   single trial call decides whether to close the circuit again;
+2. an optional token-bucket rate limit (``rate`` calls per second);
+3. retries of transient errors (429, 5xx, timeouts, dropped connections)
+   with full-jitter exponential backoff, honouring ``Retry-After`` headers.
+
+``create_openai_client`` and ``create_tavily_client`` build SDK clients on a
+tuned keep-alive connection pool with the SDKs' own retries disabled, so this
+layer is the only one retrying.
+
+The SDKs are imported inside the factories, and ``LazyClient`` defers even
+that until a client is first used, so importing this module (or ``main``)
+stays cheap.
+"""
+
+import random
+import threading
+import time
+
+from rate_limit import TokenBucket
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# Exception class names (anywhere in the MRO) treated as transient network failures,
+# covering httpx/openai, requests and tavily without importing any of them
+TRANSIENT_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "ConnectError",
+    "ConnectionError",
+    "ConnectTimeout",
+    "ReadTimeout",
+    "RemoteProtocolError",
+    "Timeout",
+    "TimeoutError",
+    "TimeoutException",
+}
+
+POOL_MAX_CONNECTIONS = 100
+POOL_MAX_KEEPALIVE = 20
+POOL_KEEPALIVE_EXPIRY = 30.0
+REQUEST_TIMEOUT = 60.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+def status_code_of(exc: BaseException):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def retry_after_seconds(exc: BaseException):
+    """Seconds requested by a ``Retry-After`` header on the error's response, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(exc: BaseException) -> bool:
+    status = status_code_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(exc).__mro__)
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open trial -> closed (or open again)."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial_in_flight = False
+
+    def abandon(self) -> None:
+        """Forget a call that ended with no outcome (cancelled or interrupted), so the next call can be the trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class Upstream:
+    """Retry, rate-limit and circuit-breaker policy plus metrics for one upstream API."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = None,
+        burst: float = None,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        breaker: CircuitBreaker = None,
+        sleep=time.sleep,
+        rng: random.Random = None,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst, sleep=sleep) if rate else None
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "throttled": 0,
+            "circuit_rejections": 0,
+            "rate_limit_wait": 0.0,
+            "backoff_wait": 0.0,
+            "latency_total": 0.0,
+        }
+
+    def _count(self, key: str, amount=1) -> None:
+        with self._metrics_lock:
+            self.metrics[key] += amount
+
+    def backoff_delay(self, attempt: int, exc: BaseException) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After when it asks for longer."""
+        delay = self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def _before_attempt(self) -> float:
+        """Check the breaker and take a rate-limit token; returns how long to wait first."""
+        if not self.breaker.allow():
+            self._count("circuit_rejections")
+            raise CircuitOpenError(f"{self.name} circuit is open; not calling upstream")
+        self._count("calls")
+        if self.bucket is None:
+            return 0.0
+        wait = self.bucket.reserve()
+        if wait:
+            self._count("rate_limit_wait", wait)
+        return wait
+
+    def _after_failure(self, attempt: int, exc: BaseException):
+        """Record a failed attempt; returns the backoff delay, or None if it should not be retried."""
+        self._count("failures")
+        if status_code_of(exc) == 429:
+            self._count("throttled")
+        if not is_transient(exc):
+            # The upstream answered (e.g. a 400 or a bad key), so it is not unhealthy
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.backoff_delay(attempt, exc)
+        self._count("retries")
+        self._count("backoff_wait", delay)
+        return delay
+
+    def _after_success(self, started: float) -> None:
+        self.breaker.record_success()
+        self._count("successes")
+        self._count("latency_total", time.perf_counter() - started)
+
+    def call(self, fn, *args, **kwargs):
+        """Call ``fn(*args, **kwargs)`` under this upstream's policy."""
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self._before_attempt()
+            try:
+                if wait:
+                    self.sleep(wait)
+                started = time.perf_counter()
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                delay = self._after_failure(attempt, exc)
+                if delay is None:
+                    raise
+                self.sleep(delay)
+                continue
+            except BaseException:
+                # KeyboardInterrupt and the like: a half-open trial left in flight would block every later call
+                self.breaker.abandon()
+                raise
+            self._after_success(started)
+            return result
+
+    async def acall(self, fn, *args, **kwargs):
+        """Async counterpart of ``call`` for coroutine functions; waits with asyncio.sleep."""
+        import asyncio
+
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self._before_attempt()
+            try:
+                if wait:
+                    await asyncio.sleep(wait)
+                started = time.perf_counter()
+                result = await fn(*args, **kwargs)
+            except Exception as exc:
+                delay = self._after_failure(attempt, exc)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled (a client disconnect, a losing hedge): the trial has no outcome, so release it
+                self.breaker.abandon()
+                raise
+            self._after_success(started)
+            return result
+
+    def stats(self) -> dict:
+        with self._metrics_lock:
+            stats = dict(self.metrics)
+        stats["circuit"] = self.breaker.state
+        stats["mean_latency"] = stats["latency_total"] / stats["successes"] if stats["successes"] else 0.0
+        return stats
+
+
+def _pool_limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def create_openai_client(api_key: str, base_url: str):
+    """Sync OpenAI client on a keep-alive pool, with SDK retries left to ``Upstream``."""
+    from openai import DefaultHttpxClient, OpenAI
+
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        max_retries=0,
+        http_client=DefaultHttpxClient(limits=_pool_limits(), timeout=REQUEST_TIMEOUT),
+    )
+
+
+def create_async_openai_client(api_key: str, base_url: str):
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(limits=_pool_limits(), timeout=REQUEST_TIMEOUT),
+    )
+
+
+def create_tavily_client(api_key: str, api_base_url: str = None):
+    """Sync Tavily client reusing one keep-alive ``requests`` session."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from tavily import TavilyClient
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAX_KEEPALIVE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return TavilyClient(api_key, api_base_url=api_base_url, session=session)
+
+
+def create_async_tavily_client(api_key: str, api_base_url: str = None):
+    import httpx
+    from tavily import AsyncTavilyClient
+
+    return AsyncTavilyClient(
+        api_key,
+        api_base_url=api_base_url,
+        client=httpx.AsyncClient(limits=_pool_limits(), timeout=REQUEST_TIMEOUT),
+    )
+
+
+class LazyClient:
+    """Stand-in for an SDK client that builds it with ``factory`` on first attribute access.
+
+    Keeps the OpenAI/Tavily SDKs (and httpx/pydantic under them) out of
+    startup: they are imported only when the first request is made.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._client is not None
+
+    def resolve(self):
+        """The underlying client, building it if needed."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
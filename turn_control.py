@@ -0,0 +1,174 @@
+"""Adaptive turn control for the ReAct loop.
+
+Without it, ``query()`` spends up to ``max_turns`` full model round-trips on
+every question and gives up as soon as a reply strays from the exact format.
+The helpers here let the loop end sooner and waste less:
+
+* ``read_reply`` (and ``read_actions``/``read_answer``) accept near-miss
+  syntax that is unambiguous: ``**Action:** Search: ...``, ``Action: search - ...``,
+  ``Action: search("...")``, and an ``Answer:`` that follows a Thought line
+  or is written ``Final Answer:``. The reply is repaired locally instead of
+  being lost or sent back to the model for another round-trip.
+* ``ObservationMemo`` serves an action repeated with the same input from the
+  observation it already produced, with a note asking the model to move on.
+* ``TurnBudget`` tracks turns, wall-clock time and tokens for one question.
+  When what is left fits at most one more turn, the loop adds
+  ``FORCE_ANSWER_NOTE`` to the next message, so the last turn yields an
+  answer instead of "Max turns reached".
+"""
+
+import re
+import time
+
+FORCE_ANSWER_NOTE = (
+    "You have reached the limit for this question. Do not call any more actions: "
+    "reply now with Answer: followed by your best advice from the information gathered so far."
+)
+REPEATED_ACTION_NOTE = (
+    "(You already ran {action}: {action_input} and this is the same result. "
+    "Use it, try a different action, or give your Answer.)"
+)
+
+# The exact protocol line, as written in the prompt
+ACTION_RE = re.compile(r"^Action: (\w+): (.*)$")
+# Markdown emphasis, quoting and list markers models put around protocol keywords
+_MARKUP = r"[\s*_>#`-]*"
+_NEAR_MISS_ACTION_RE = re.compile(
+    rf"^{_MARKUP}action{_MARKUP}:?{_MARKUP}([A-Za-z_]+){_MARKUP}(?::|-|–|=|\(|\s)\s*(.+?)\s*$",
+    re.IGNORECASE,
+)
+_ANSWER_RE = re.compile(rf"^{_MARKUP}(?:final\s+)?answer{_MARKUP}:{_MARKUP}", re.IGNORECASE)
+
+
+def _clean_input(text: str, call_syntax: bool) -> str:
+    text = text.strip()
+    if text.endswith("PAUSE"):
+        text = text[: -len("PAUSE")].rstrip()
+    if call_syntax and text.endswith(")"):
+        text = text[:-1].rstrip()
+    return text
+
+
+def repair_action(line: str, actions) -> tuple:
+    """``(action, input)`` for a near-miss Action line naming one of ``actions``, otherwise None."""
+    match = _NEAR_MISS_ACTION_RE.match(line)
+    if match is None:
+        return None
+    names = {name.lower(): name for name in actions}
+    action = names.get(match.group(1).lower())
+    if action is None:
+        return None
+    action_input = _clean_input(match.group(2), call_syntax="(" in line[match.end(1) : match.start(2)])
+    return (action, action_input) if action_input else None
+
+
+def _exact_actions(reply: str) -> list:
+    if "Action: " not in reply:
+        return []
+    return [m.groups() for m in map(ACTION_RE.match, reply.split("\n")) if m]
+
+
+def _repaired_actions(reply: str, actions) -> list:
+    return [pair for pair in (repair_action(line, actions) for line in reply.split("\n")) if pair is not None]
+
+
+def read_reply(reply: str, actions, forced: bool = False) -> tuple:
+    """``(action pairs, answer)`` for one model reply; at most one of them is set.
+
+    Exact Action lines win (even for unknown actions, which the loop reports
+    back to the model), then an Answer. Only a reply with neither is scanned
+    for near-miss Action lines, and only those naming a known action count,
+    so prose such as "**Action:** search the DAAD database" under an answer
+    never replaces it. When ``forced``, only the answer is read.
+    """
+    if not forced:
+        exact = _exact_actions(reply)
+        if exact:
+            return exact, None
+    answer = read_answer(reply)
+    if answer is not None or forced:
+        return [], answer
+    return _repaired_actions(reply, actions), None
+
+
+def read_actions(reply: str, actions) -> list:
+    """The ``(action, input)`` pairs in ``reply``; see ``read_reply``."""
+    return read_reply(reply, actions)[0]
+
+
+def read_answer(reply: str):
+    """The final answer in ``reply``: text after the first ``Answer:`` line (near misses allowed), or None."""
+    if reply.startswith("Answer: "):
+        return reply.split("Answer: ", 1)[1]
+    lines = reply.split("\n")
+    for n, line in enumerate(lines):
+        match = _ANSWER_RE.match(line)
+        if match:
+            answer = "\n".join([line[match.end() :]] + lines[n + 1 :]).strip()
+            return answer or None
+    return None
+
+
+def _memo_key(action: str, action_input: str) -> tuple:
+    normalised = " ".join(action_input.split()).casefold()
+    if len(normalised) >= 2 and normalised[0] == normalised[-1] and normalised[0] in "\"'":
+        normalised = normalised[1:-1].strip()
+    return action, normalised
+
+
+class ObservationMemo:
+    """Observations already produced for one question, keyed by action and normalised input."""
+
+    def __init__(self):
+        self._observations = {}
+        self.hits = 0
+
+    def get(self, action: str, action_input: str):
+        """The repeated observation with a note for the model, or None if this action is new."""
+        observation = self._observations.get(_memo_key(action, action_input))
+        if observation is None:
+            return None
+        self.hits += 1
+        return f"{observation}\n{REPEATED_ACTION_NOTE.format(action=action, action_input=action_input)}"
+
+    def set(self, action: str, action_input: str, observation) -> None:
+        self._observations[_memo_key(action, action_input)] = observation
+
+
+class TurnBudget:
+    """The turns, wall-clock seconds and tokens one question may spend (None: no limit)."""
+
+    def __init__(self, max_turns: int = 5, max_seconds: float = None, max_tokens: int = None, clock=time.monotonic):
+        self.max_turns = max_turns
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.clock = clock
+        self.started = clock()
+        self.turns = 0
+        self.tokens = 0
+
+    def charge(self, tokens: int) -> None:
+        """Record one completed turn that used ``tokens`` (prompt plus reply)."""
+        self.turns += 1
+        self.tokens += tokens
+
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    def exhausted(self) -> bool:
+        """True once any limit has been reached."""
+        return (
+            self.turns >= self.max_turns
+            or (self.max_seconds is not None and self.elapsed() >= self.max_seconds)
+            or (self.max_tokens is not None and self.tokens >= self.max_tokens)
+        )
+
+    def nearly_spent(self) -> bool:
+        """True when what is left fits at most one more turn, judged by the average turn so far."""
+        if self.turns + 2 > self.max_turns:
+            return True
+        if not self.turns:
+            return False
+        if self.max_seconds is not None and self.elapsed() * (self.turns + 2) / self.turns > self.max_seconds:
+            return True
+        return self.max_tokens is not None and self.tokens * (self.turns + 2) / self.turns > self.max_tokens
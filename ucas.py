@@ -0,0 +1,118 @@
+"""UCAS tariff tables and batch grade conversion.
+
+The tariff tables are built once at import. ``points_for`` converts a single
+(qualification, grade) pair; ``batch_points`` and ``batch_totals`` convert
+whole columns or applicant record sets in one pass, for bulk eligibility
+screening. Rows can be read from CSV with ``read_grade_rows``.
+
+Tawjihi results are percentages rather than tariff grades. They are mapped
+onto indicative A-level-profile UCAS totals via ``TAWJIHI_BANDS``; universities
+publish their own equivalences, so these bands are for screening only and
+should be confirmed against official pages.
+"""
+
+import csv
+from array import array
+from bisect import bisect_right
+
+UCAS_POINTS = {
+    "A-level": {"A*": 56, "A": 48, "B": 40, "C": 32, "D": 24, "E": 16},
+    "AS-level": {"A": 20, "B": 16, "C": 12, "D": 10, "E": 6},
+    "BTEC": {"D*": 56, "D": 48, "M": 32, "P": 16},
+}
+
+# Minimum Tawjihi percentage -> indicative UCAS total (A-level profile in comments)
+TAWJIHI_BANDS = [
+    (65.0, 96),  # CCC
+    (70.0, 104),  # BCC
+    (75.0, 112),  # BBC
+    (80.0, 120),  # BBB
+    (85.0, 128),  # ABB
+    (90.0, 136),  # AAB
+    (95.0, 144),  # AAA
+]
+
+QUALIFICATION_ALIASES = {
+    "a-level": "A-level",
+    "a level": "A-level",
+    "alevel": "A-level",
+    "a2": "A-level",
+    "as-level": "AS-level",
+    "as level": "AS-level",
+    "aslevel": "AS-level",
+    "as": "AS-level",
+    "btec": "BTEC",
+    "tawjihi": "Tawjihi",
+    "tawjihi percentage": "Tawjihi",
+    "psc": "Tawjihi",
+}
+
+# Flattened (qualification, grade) -> points lookup
+_POINTS_BY_KEY = {
+    (qualification, grade): points
+    for qualification, grades in UCAS_POINTS.items()
+    for grade, points in grades.items()
+}
+_TAWJIHI_THRESHOLDS = array("d", (threshold for threshold, _ in TAWJIHI_BANDS))
+_TAWJIHI_POINTS = array("H", (0,) + tuple(points for _, points in TAWJIHI_BANDS))
+
+
+def normalise_qualification(qualification: str) -> str:
+    """Map a free-text qualification name onto a canonical key (unknown names pass through)."""
+    key = qualification.strip()
+    return QUALIFICATION_ALIASES.get(key.lower(), key)
+
+
+def tawjihi_points(percentage) -> int:
+    """Indicative UCAS total for a Tawjihi percentage such as ``95``, ``"95%"`` or ``"92.5"``."""
+    try:
+        value = float(str(percentage).strip().rstrip("%"))
+    except ValueError:
+        return 0
+    return _TAWJIHI_POINTS[bisect_right(_TAWJIHI_THRESHOLDS, value)]
+
+
+def points_for(qualification: str, grade: str) -> int:
+    """UCAS points for one grade; 0 for unknown qualifications or grades."""
+    qualification = normalise_qualification(qualification)
+    if qualification == "Tawjihi":
+        return tawjihi_points(grade)
+    return _POINTS_BY_KEY.get((qualification, grade.strip().upper()), 0)
+
+
+def batch_points(qualifications, grades) -> array:
+    """Convert parallel sequences of qualifications and grades to an array of points."""
+    memo = {}
+    out = array("H")
+    append = out.append
+    for key in zip(qualifications, grades):
+        points = memo.get(key)
+        if points is None:
+            points = memo[key] = points_for(*key)
+        append(points)
+    return out
+
+
+def batch_totals(rows) -> dict:
+    """Sum points per applicant from ``(applicant_id, qualification, grade)`` rows in one pass."""
+    # Applicant records repeat a handful of (qualification, grade) spellings, so
+    # each distinct pair is normalised and looked up only once
+    memo = {}
+    totals = {}
+    get_total = totals.get
+    for applicant_id, qualification, grade in rows:
+        key = (qualification, grade)
+        points = memo.get(key)
+        if points is None:
+            points = memo[key] = points_for(qualification, grade)
+        totals[applicant_id] = get_total(applicant_id, 0) + points
+    return totals
+
+
+def read_grade_rows(f):
+    """Yield ``(applicant_id, qualification, grade)`` rows from a CSV file object.
+
+    The CSV must have ``applicant_id``, ``qualification`` and ``grade`` columns.
+    """
+    for record in csv.DictReader(f):
+        yield record["applicant_id"], record["qualification"], record["grade"]